@@ -0,0 +1,141 @@
+"""
+Flask CLI commands for operational tasks.
+
+Usage:
+    flask --app main vectors backfill --dimensions 256
+    flask --app main vectors prune
+    flask --app main documents backfill
+    flask --app main summaries backfill
+    flask --app main snapshots export corpus.snap [--since 42]
+    flask --app main snapshots import corpus.snap
+"""
+from __future__ import annotations
+
+import click
+from flask import Flask
+from flask.cli import AppGroup
+
+from config import settings
+from app.application.snapshot_service import export_snapshot, import_snapshot
+from app.application.summary_service import backfill_summaries
+from app.infrastructure.tenants import list_tenant_ids, normalize_tenant_id
+from app.infrastructure.vector_store import (
+    backfill_document_registry,
+    backfill_search_vectors,
+    prune_search_vectors,
+)
+
+vectors_cli = AppGroup("vectors", help="Migrate the indexed search vectors.")
+documents_cli = AppGroup("documents", help="Maintain the document registry.")
+summaries_cli = AppGroup("summaries", help="Manage document summary nodes.")
+snapshots_cli = AppGroup("snapshots", help="Export and import corpus snapshots.")
+
+
+def _tenants(tenant_ids: tuple[str, ...]) -> list[str]:
+    if tenant_ids:
+        return [normalize_tenant_id(tenant_id) for tenant_id in tenant_ids]
+    # Archived tenants have no vector index; rerun with --tenant after
+    # restoring them.
+    return list_tenant_ids()
+
+
+_tenant_option = click.option(
+    "--tenant", "tenant_ids", multiple=True,
+    help="Tenant to process (repeatable). Defaults to every active tenant.",
+)
+_batch_option = click.option("--batch-size", default=500, show_default=True)
+_pause_option = click.option(
+    "--pause", default=0.0, show_default=True,
+    help="Seconds to sleep between batches, to limit load on the cluster.",
+)
+
+
+@vectors_cli.command("backfill")
+@click.option("--dimensions", type=int, required=True,
+              help="Target SEARCH_DIMENSIONS (0 = full vector).")
+@_tenant_option
+@_batch_option
+@_pause_option
+def backfill_command(dimensions: int, tenant_ids: tuple[str, ...], batch_size: int, pause: float) -> None:
+    """Step 1: index and write the new search field next to the current one."""
+    if dimensions < 0 or dimensions > settings.embedding_dimensions:
+        raise click.BadParameter(
+            f"must be between 0 and {settings.embedding_dimensions}", param_hint="--dimensions"
+        )
+    for tenant_id in _tenants(tenant_ids):
+        count = backfill_search_vectors(
+            dimensions, tenant_id=tenant_id, batch_size=batch_size, pause=pause
+        )
+        click.echo(f"{tenant_id}: {count} chunk(s) backfilled")
+    click.echo(f"Set SEARCH_DIMENSIONS={dimensions}, restart the app, then run `flask vectors prune`.")
+
+
+@vectors_cli.command("prune")
+@_tenant_option
+@_batch_option
+@_pause_option
+def prune_command(tenant_ids: tuple[str, ...], batch_size: int, pause: float) -> None:
+    """Step 2: drop search fields other than the configured SEARCH_DIMENSIONS."""
+    for tenant_id in _tenants(tenant_ids):
+        dropped = prune_search_vectors(tenant_id=tenant_id, batch_size=batch_size, pause=pause)
+        click.echo(f"{tenant_id}: removed {', '.join(dropped) or 'nothing'}")
+
+
+@documents_cli.command("backfill")
+@_tenant_option
+def documents_backfill_command(tenant_ids: tuple[str, ...]) -> None:
+    """Register documents ingested before the document registry existed."""
+    for tenant_id in _tenants(tenant_ids):
+        count = backfill_document_registry(tenant_id=tenant_id)
+        click.echo(f"{tenant_id}: {count} document(s) registered")
+
+
+@summaries_cli.command("backfill")
+@_tenant_option
+def summaries_backfill_command(tenant_ids: tuple[str, ...]) -> None:
+    """Summarize documents ingested before SUMMARIES_ENABLED was set."""
+    for tenant_id in _tenants(tenant_ids):
+        count = backfill_summaries(tenant_id=tenant_id)
+        click.echo(f"{tenant_id}: {count} document(s) summarized")
+
+
+@snapshots_cli.command("export")
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+@click.option("--tenant", "tenant_id", default=None, help="Tenant to export. Defaults to the default tenant.")
+@click.option("--since", default=0, show_default=True,
+              help="Only export changes after this corpus version (0 = full snapshot).")
+def snapshot_export_command(path: str, tenant_id: str | None, since: int) -> None:
+    """Write a tenant's chunks, vectors and registry to PATH."""
+    try:
+        info = export_snapshot(path, tenant_id=normalize_tenant_id(tenant_id), since=since)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(
+        f"{info.tenant_id}: versions {info.base_version}-{info.version}, {info.chunks} chunk(s), "
+        f"{info.deleted} deletion(s), {info.documents} document(s)"
+    )
+    click.echo(f"Next delta: --since {info.version}")
+
+
+@snapshots_cli.command("import")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--tenant", "tenant_id", default=None,
+              help="Tenant to load into. Defaults to the tenant the snapshot was taken from.")
+def snapshot_import_command(path: str, tenant_id: str | None) -> None:
+    """Load a snapshot from PATH without re-embedding anything."""
+    try:
+        info = import_snapshot(path, tenant_id=tenant_id)
+    except ValueError as exc:
+        raise click.ClickException(str(exc)) from exc
+    click.echo(
+        f"{info.tenant_id}: now at snapshot version {info.version} "
+        f"({info.chunks} chunk(s), {info.deleted} deletion(s))"
+    )
+
+
+def register_cli(app: Flask) -> None:
+    """Attach CLI command groups to the Flask app."""
+    app.cli.add_command(vectors_cli)
+    app.cli.add_command(documents_cli)
+    app.cli.add_command(summaries_cli)
+    app.cli.add_command(snapshots_cli)
@@ -9,6 +9,8 @@ import traceback
 from flask import Flask, jsonify
 from werkzeug.exceptions import HTTPException
 
+from app.domain.errors import InvalidRequest, UnknownTenant
+
 logger = logging.getLogger(__name__)
 
 
@@ -41,6 +43,14 @@ def register_error_handlers(app: Flask) -> None:
     def too_many_requests(error: HTTPException):
         return jsonify({"error": "Too many requests. Please try again later."}), 429
 
-    @app.errorhandler(ValueError)
-    def value_error(error: ValueError):
+    @app.errorhandler(PermissionError)
+    def permission_error(error: PermissionError):
+        return jsonify({"error": str(error)}), 403
+
+    @app.errorhandler(InvalidRequest)
+    def invalid_request(error: InvalidRequest):
         return jsonify({"error": str(error)}), 400
+
+    @app.errorhandler(UnknownTenant)
+    def unknown_tenant(error: UnknownTenant):
+        return jsonify({"error": str(error)}), 404
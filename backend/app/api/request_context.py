@@ -0,0 +1,41 @@
+"""
+Per-request correlation id.
+
+Taken from the ``X-Request-ID`` header when a proxy or client sends a
+sane one, generated otherwise; it tags every log line written while the
+request is handled and is echoed back in the response header.
+"""
+from __future__ import annotations
+
+import re
+import uuid
+
+from flask import Flask, Response, g, request
+
+from app.infrastructure.logging_pipeline import request_id_var
+
+_REQUEST_ID_RE = re.compile(r"^[A-Za-z0-9._:-]{1,64}$")
+
+
+def _bind_request_id() -> None:
+    incoming = request.headers.get("X-Request-ID", "")
+    request_id = incoming if _REQUEST_ID_RE.match(incoming) else uuid.uuid4().hex[:16]
+    g.request_id_token = request_id_var.set(request_id)
+
+
+def _echo_request_id(response: Response) -> Response:
+    response.headers["X-Request-ID"] = request_id_var.get()
+    return response
+
+
+def _unbind_request_id(_error: BaseException | None) -> None:
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        request_id_var.reset(token)
+
+
+def register_request_context(app: Flask) -> None:
+    """Bind a correlation id to every request."""
+    app.before_request(_bind_request_id)
+    app.after_request(_echo_request_id)
+    app.teardown_request(_unbind_request_id)
@@ -6,18 +6,38 @@ routes simply validate input, call services, and return JSON.
 """
 from __future__ import annotations
 
+import hmac
 import logging
 import os
 import tempfile
+from typing import Callable
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, g, jsonify, request, send_file, send_from_directory
 from pydantic import ValidationError
 from werkzeug.utils import secure_filename
 
-from app.application.document_service import ingest_pdf, ingest_plain_text
+from app.application.conversation_memory import forget_session
+from app.application.document_service import (
+    delete_document,
+    ingest_pdf,
+    ingest_plain_text,
+    list_documents,
+    update_pdf,
+)
 from app.application.rag_graph import query_rag
-from app.domain.models import QueryRequest
+from app.application.snapshot_service import export_snapshot, import_snapshot
+from app.application.tenant_service import (
+    archive_tenant,
+    ensure_provisioned,
+    evict_tenant,
+    get_tenant_info,
+    provision_tenant,
+    restore_tenant,
+)
+from app.domain.models import DocumentListResponse, DocumentUploadResponse, QueryRequest
 from app.api.rate_limiter import check_rate_limit, get_remaining
+from app.infrastructure import metrics, profiler
+from app.infrastructure.tenants import normalize_tenant_id
 from config import settings
 
 logger = logging.getLogger(__name__)
@@ -32,6 +52,57 @@ def _client_ip() -> str:
     return request.headers.get("X-Forwarded-For", request.remote_addr or "unknown").split(",")[0].strip()
 
 
+def _tenant_id() -> str:
+    """Tenant for this request, from the ``X-Tenant-ID`` header; must exist."""
+    tenant_id = normalize_tenant_id(request.headers.get("X-Tenant-ID"))
+    ensure_provisioned(tenant_id)
+    return tenant_id
+
+
+def _require_admin():
+    """Return an error response unless the request carries the admin token."""
+    if not settings.admin_api_token:
+        return jsonify({"error": "Admin endpoints are disabled."}), 403
+    token = request.headers.get("X-Admin-Token", "")
+    if not hmac.compare_digest(token.encode(), settings.admin_api_token.encode()):
+        return jsonify({"error": "Invalid admin token."}), 403
+    return None
+
+
+# ── Request Profiling ────────────────────────────────────────────────
+
+
+@api_bp.before_request
+def _start_request_profile():
+    """Profile this request with cProfile if an admin sent ``X-Profile: 1``."""
+    if request.headers.get("X-Profile") != "1":
+        return None
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    g.profiler = profiler.start_request_profile()
+    return None
+
+
+@api_bp.after_request
+def _finish_request_profile(response):
+    if request.headers.get("X-Profile") == "1" and "X-Profile" not in response.headers:
+        active = g.pop("profiler", None)
+        response.headers["X-Profile"] = (
+            profiler.finish_request_profile(active, request.endpoint or "unknown")
+            if active is not None else "skipped"
+        )
+    return response
+
+
+@api_bp.teardown_request
+def _abandon_request_profile(_error):
+    # Only reached with a live profiler if after_request never ran.
+    active = g.pop("profiler", None)
+    if active is not None:
+        profiler.finish_request_profile(active, request.endpoint or "unknown")
+
+
 # ── Health Check ─────────────────────────────────────────────────────
 
 
@@ -57,6 +128,18 @@ def rate_limit_status():
     }), 200
 
 
+# ── Metrics ──────────────────────────────────────────────────────────
+
+
+@api_bp.route("/metrics", methods=["GET"])
+def metrics_snapshot():
+    """Return this worker's in-process counters (token usage, cache hits, ...)."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    return jsonify(metrics.snapshot()), 200
+
+
 # ── Query Endpoint ───────────────────────────────────────────────────
 
 
@@ -64,7 +147,12 @@ def rate_limit_status():
 def query():
     """
     POST /api/query
-    Body: { "question": "...", "provider": "openai" | "anthropic" }
+    Body: {
+        "question": "...",
+        "provider": "openai" | "anthropic",
+        "filters": { "file_hash": "...", "source": "...", "page_from": 0, "page_to": 9 },  # optional
+        "session_id": "..."  # optional; continues a chat session
+    }
     """
     # Rate limit check
     ip = _client_ip()
@@ -77,21 +165,46 @@ def query():
     try:
         req = QueryRequest(**data)
     except ValidationError as exc:
-        return jsonify({"error": "Validation error", "detail": exc.errors()}), 422
+        return jsonify({"error": "Validation error", "detail": exc.errors(include_context=False)}), 422
 
     logger.info("Query request: question=%s provider=%s", req.question[:60], req.provider)
-    response = query_rag(question=req.question, provider=req.provider)
+    response = query_rag(
+        question=req.question,
+        provider=req.provider,
+        filters=req.filters,
+        tenant_id=_tenant_id(),
+        session_id=req.session_id,
+    )
     return jsonify(response.model_dump()), 200
 
 
+@api_bp.route("/sessions/<session_id>", methods=["DELETE"])
+def delete_session_route(session_id: str):
+    """DELETE /api/sessions/<session_id> — forget a chat session's history."""
+    forget_session(session_id, tenant_id=_tenant_id())
+    return "", 204
+
+
+# ── Document Listing ─────────────────────────────────────────────────
+
+
+@api_bp.route("/documents", methods=["GET"])
+def get_documents():
+    """
+    GET /api/documents
+    Lists ingested documents from the registry (no chunk scan).
+    """
+    response = DocumentListResponse(documents=list_documents(tenant_id=_tenant_id()))
+    return jsonify(response.model_dump(mode="json")), 200
+
+
 # ── Document Upload ──────────────────────────────────────────────────
 
 
-@api_bp.route("/documents/upload", methods=["POST"])
-def upload_document():
+def _handle_pdf_upload(ingest: Callable[[str], DocumentUploadResponse | None]):
     """
-    POST /api/documents/upload
-    Multipart form-data with a "file" field (PDF).
+    Validate the multipart "file" field, save it to a temp dir, run
+    ``ingest`` on the saved path, then clean up.
     """
     # Rate limit check
     ip = _client_ip()
@@ -125,7 +238,9 @@ def upload_document():
     tmp_path = os.path.join(tmp_dir, filename)
     try:
         file.save(tmp_path)
-        result = ingest_pdf(tmp_path)
+        result = ingest(tmp_path)
+        if result is None:
+            return jsonify({"error": "Document not found."}), 404
         status_code = 200 if result.already_existed else 201
         return jsonify(result.model_dump()), status_code
     finally:
@@ -136,6 +251,40 @@ def upload_document():
             os.rmdir(tmp_dir)
 
 
+@api_bp.route("/documents/upload", methods=["POST"])
+def upload_document():
+    """
+    POST /api/documents/upload
+    Multipart form-data with a "file" field (PDF).
+    """
+    tenant_id = _tenant_id()
+    return _handle_pdf_upload(lambda path: ingest_pdf(path, tenant_id=tenant_id))
+
+
+@api_bp.route("/documents/<file_hash>", methods=["PUT"])
+def replace_document(file_hash: str):
+    """
+    PUT /api/documents/<file_hash>
+    Multipart form-data with a "file" field (PDF) holding the new version.
+    Only chunks whose content changed are re-embedded.
+    """
+    tenant_id = _tenant_id()
+    return _handle_pdf_upload(
+        lambda path: update_pdf(path, replaces=file_hash, tenant_id=tenant_id)
+    )
+
+
+@api_bp.route("/documents/<file_hash>", methods=["DELETE"])
+def delete_document_route(file_hash: str):
+    """
+    DELETE /api/documents/<file_hash>
+    Removes the document from retrieval; storage is reclaimed in the background.
+    """
+    if not delete_document(file_hash, tenant_id=_tenant_id()):
+        return jsonify({"error": "Document not found."}), 404
+    return "", 204
+
+
 # ── Plain Text Import ───────────────────────────────────────────────
 
 
@@ -158,5 +307,155 @@ def upload_text():
         return jsonify({"error": "No text provided."}), 400
 
     source = data.get("source", "user_input")
-    result = ingest_plain_text(text, source=source)
+    result = ingest_plain_text(text, source=source, tenant_id=_tenant_id())
     return jsonify(result.model_dump()), 201
+
+
+# ── Tenant Administration ────────────────────────────────────────────
+
+
+@api_bp.route("/tenants/<tenant_id>", methods=["GET"])
+def tenant_status(tenant_id: str):
+    """GET /api/tenants/<tenant_id> — status, corpus version, document count."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    info = get_tenant_info(normalize_tenant_id(tenant_id))
+    if info is None:
+        return jsonify({"error": "Tenant not found."}), 404
+    return jsonify(info.model_dump()), 200
+
+
+@api_bp.route("/tenants/<tenant_id>", methods=["PUT"])
+def tenant_create(tenant_id: str):
+    """PUT /api/tenants/<tenant_id> — create a tenant and its vector index."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    info, created = provision_tenant(normalize_tenant_id(tenant_id))
+    return jsonify(info.model_dump()), 201 if created else 200
+
+
+@api_bp.route("/tenants/<tenant_id>/archive", methods=["POST"])
+def tenant_archive(tenant_id: str):
+    """POST /api/tenants/<tenant_id>/archive — keep data, stop serving it."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    info = archive_tenant(normalize_tenant_id(tenant_id))
+    if info is None:
+        return jsonify({"error": "Tenant not found."}), 404
+    return jsonify(info.model_dump()), 200
+
+
+@api_bp.route("/tenants/<tenant_id>/restore", methods=["POST"])
+def tenant_restore(tenant_id: str):
+    """POST /api/tenants/<tenant_id>/restore — return an archived tenant to service."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    info = restore_tenant(normalize_tenant_id(tenant_id))
+    if info is None:
+        return jsonify({"error": "Tenant not found."}), 404
+    return jsonify(info.model_dump()), 200
+
+
+@api_bp.route("/tenants/<tenant_id>", methods=["DELETE"])
+def tenant_evict(tenant_id: str):
+    """DELETE /api/tenants/<tenant_id> — permanently delete a tenant's data."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    if not evict_tenant(normalize_tenant_id(tenant_id)):
+        return jsonify({"error": "Tenant not found."}), 404
+    return "", 204
+
+
+@api_bp.route("/tenants/<tenant_id>/snapshot", methods=["GET"])
+def tenant_snapshot_export(tenant_id: str):
+    """
+    GET /api/tenants/<tenant_id>/snapshot?since=<corpus_version>
+    Downloads a snapshot file; ``since`` > 0 exports only the changes.
+    """
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    tenant_id = normalize_tenant_id(tenant_id)
+    since = request.args.get("since", 0, type=int)
+
+    fd, path = tempfile.mkstemp(suffix=".snap")
+    os.close(fd)
+    try:
+        info = export_snapshot(path, tenant_id=tenant_id, since=since)
+        response = send_file(
+            path,
+            mimetype="application/octet-stream",
+            as_attachment=True,
+            download_name=f"{tenant_id}-{info.base_version}-{info.version}.snap",
+        )
+    except BaseException:
+        os.remove(path)
+        raise
+    response.headers["X-Snapshot-Version"] = str(info.version)
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
+
+@api_bp.route("/tenants/<tenant_id>/snapshot", methods=["POST"])
+def tenant_snapshot_import(tenant_id: str):
+    """
+    POST /api/tenants/<tenant_id>/snapshot
+    Multipart form-data with a "file" field holding a snapshot.
+    """
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    if "file" not in request.files:
+        return jsonify({"error": "No file provided. Use form field 'file'."}), 400
+
+    fd, path = tempfile.mkstemp(suffix=".snap")
+    os.close(fd)
+    try:
+        request.files["file"].save(path)
+        info = import_snapshot(path, tenant_id=normalize_tenant_id(tenant_id))
+    finally:
+        os.remove(path)
+    return jsonify(info.model_dump()), 200
+
+
+# ── Profiling ────────────────────────────────────────────────────────
+
+
+@api_bp.route("/admin/profile", methods=["POST"])
+def start_profile():
+    """
+    POST /api/admin/profile?seconds=10
+    Samples the worker serving this request in the background; the
+    collapsed-stack file is listed under /api/admin/profiles when done.
+    """
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    started = profiler.start_sampling(request.args.get("seconds", 10.0, type=float))
+    if started is None:
+        return jsonify({"error": "A profile is already running in this worker."}), 409
+    name, seconds = started
+    return jsonify({"profile": name, "seconds": seconds, "pid": os.getpid()}), 202
+
+
+@api_bp.route("/admin/profiles", methods=["GET"])
+def list_profiles():
+    """GET /api/admin/profiles — sampling and request profiles on this host."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    return jsonify({"profiles": profiler.list_outputs()}), 200
+
+
+@api_bp.route("/admin/profiles/<name>", methods=["GET"])
+def download_profile(name: str):
+    """GET /api/admin/profiles/<name> — download a profile file."""
+    denied = _require_admin()
+    if denied is not None:
+        return denied
+    return send_from_directory(profiler.profile_dir().resolve(), name, as_attachment=True)
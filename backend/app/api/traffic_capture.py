@@ -0,0 +1,147 @@
+"""
+Traffic capture — anonymized request shapes for load replay.
+
+When ``CAPTURE_ENABLED`` is set, every query and upload request appends
+one JSON line to ``CAPTURE_PATH``:
+
+    {"t": 1718000000.123, "endpoint": "query", "status": 200, "ms": 842.1,
+     "client": "3f9a…", "question_chars": 74, "q": "b1c2…",
+     "provider": "openai", "filters": false, "session": "77de…"}
+
+Nothing a user typed is stored: questions are reduced to their length
+and a keyed hash (so repeated questions replay as repeats), and client
+IPs, tenants and session ids are keyed hashes too. Uploads record only
+their size in bytes.
+
+Lines are queued and written by a background thread, so capture adds no
+I/O to the request path; when the queue is full, records are dropped
+and counted in ``capture.dropped``. Each batch is a single append, so
+several workers can share one file.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import queue
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from flask import Flask, Response, g, request
+
+from config import settings
+from app.infrastructure import metrics
+
+logger = logging.getLogger(__name__)
+
+# Flask endpoint → name in the capture log.
+CAPTURED_ENDPOINTS: dict[str, str] = {
+    "api.query": "query",
+    "api.upload_document": "upload",
+    "api.upload_text": "text",
+}
+
+_WRITE_BATCH = 500
+
+# Without CAPTURE_SALT, ids are only stable within one worker process.
+_salt = (settings.capture_salt or secrets.token_hex(16)).encode()
+_queue: queue.Queue[str] = queue.Queue(maxsize=settings.capture_queue_size)
+_writer: threading.Thread | None = None
+_lock = threading.Lock()
+
+
+def anonymize(value: str) -> str:
+    """Short keyed hash of an identifier or text."""
+    return hashlib.blake2b(value.encode(), key=_salt, digest_size=8).hexdigest()
+
+
+def _write_loop(path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    while True:
+        lines = [_queue.get()]
+        while len(lines) < _WRITE_BATCH:
+            try:
+                lines.append(_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            os.write(fd, "".join(lines).encode())
+        except OSError:
+            metrics.increment("capture.dropped", len(lines))
+            logger.warning("Could not write traffic capture.", exc_info=True)
+
+
+def _enqueue(record: dict[str, Any]) -> None:
+    global _writer  # noqa: PLW0603
+    with _lock:
+        # Started lazily: threads do not survive gunicorn's fork.
+        if _writer is None:
+            _writer = threading.Thread(
+                target=_write_loop, args=(Path(settings.capture_path),),
+                name="traffic-capture", daemon=True,
+            )
+            _writer.start()
+    try:
+        _queue.put_nowait(json.dumps(record, separators=(",", ":")) + "\n")
+    except queue.Full:
+        metrics.increment("capture.dropped")
+
+
+def _request_shape(endpoint: str) -> dict[str, Any]:
+    """Anonymized description of the request body."""
+    if endpoint == "query":
+        data = request.get_json(silent=True) or {}
+        question = str(data.get("question", ""))
+        session_id = data.get("session_id")
+        return {
+            "question_chars": len(question),
+            "q": anonymize(" ".join(question.lower().split())),
+            "provider": data.get("provider"),
+            "filters": bool(data.get("filters")),
+            "session": anonymize(str(session_id)) if session_id else None,
+        }
+    if endpoint == "text":
+        data = request.get_json(silent=True) or {}
+        return {"text_chars": len(str(data.get("text", "")))}
+    return {"bytes": request.content_length or 0}
+
+
+def _start_capture() -> None:
+    if request.endpoint in CAPTURED_ENDPOINTS:
+        g.capture_started = (time.time(), time.perf_counter())
+
+
+def _finish_capture(response: Response) -> Response:
+    started = g.pop("capture_started", None)
+    if started is None:
+        return response
+    endpoint = CAPTURED_ENDPOINTS[request.endpoint]
+    try:
+        client = request.headers.get("X-Forwarded-For", request.remote_addr or "unknown")
+        tenant = request.headers.get("X-Tenant-ID")
+        _enqueue({
+            "t": round(started[0], 3),
+            "endpoint": endpoint,
+            "status": response.status_code,
+            "ms": round((time.perf_counter() - started[1]) * 1000, 1),
+            "client": anonymize(client.split(",")[0].strip()),
+            "tenant": anonymize(tenant) if tenant else None,
+            **_request_shape(endpoint),
+        })
+    except Exception:
+        logger.warning("Could not capture request.", exc_info=True)
+    return response
+
+
+def register_traffic_capture(app: Flask) -> None:
+    """Record query and upload traffic if ``CAPTURE_ENABLED`` is set."""
+    if not settings.capture_enabled:
+        return
+    app.before_request(_start_capture)
+    app.after_request(_finish_capture)
+    logger.info("Capturing query and upload traffic to %s.", settings.capture_path)
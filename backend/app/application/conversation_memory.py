@@ -0,0 +1,129 @@
+"""
+Conversation memory — bounded history for multi-turn chat sessions.
+
+A session's graph state keeps the last ``memory_turns`` exchanges verbatim
+plus a rolling summary of everything older. When a turn falls out of the
+window it is folded into the summary by the cheap summary model, so the
+prompt and the work per turn stay the same size however long the
+conversation gets.
+"""
+from __future__ import annotations
+
+import logging
+import re
+
+from config import settings
+from app.infrastructure import metrics
+from app.infrastructure.checkpoints import delete_session
+from app.infrastructure.llm_factory import get_llm
+from app.infrastructure.tenants import normalize_tenant_id
+
+logger = logging.getLogger(__name__)
+
+Turn = dict[str, str]
+
+FOLD_PROMPT = """Update the running summary of a conversation between a user and a research assistant with the new exchanges below.
+Keep the topics, facts, names and open questions the user may refer back to. Use at most {words} words.
+
+Current summary:
+{summary}
+
+New exchanges:
+{turns}
+
+Updated summary:"""
+
+# Questions that point back at the previous answer ("why is that?", "give
+# an example of it") and name at most one subject of their own are
+# searched together with the previous question. "What is the mitochondria
+# and what is their function?" names its own subject and is not.
+_FOLLOW_UP_MAX_CONTENT_WORDS = 1
+_FOLLOW_UP_WORDS = frozenset(
+    "it its this that these those they them their above previous earlier "
+    "same more further elaborate expand example examples also else".split()
+)
+_FUNCTION_WORDS = frozenset(
+    "a an the and or but of to in on for with by as at from about into than then "
+    "is are was were be been being do does did can could should would will may might "
+    "what which who whom whose why how when where "
+    "i me my we our you your he she his her one ones "
+    "give show tell explain describe mean means there here any some other so not "
+    "please again".split()
+)
+_WORD_RE = re.compile(r"[a-z0-9']+")
+
+
+def is_follow_up(question: str) -> bool:
+    """Heuristic: does the question only make sense after the previous turn?"""
+    words = _WORD_RE.findall(question.lower())
+    if not any(word in _FOLLOW_UP_WORDS for word in words):
+        return False
+    content = [w for w in words if w not in _FOLLOW_UP_WORDS and w not in _FUNCTION_WORDS]
+    return len(content) <= _FOLLOW_UP_MAX_CONTENT_WORDS
+
+
+def standalone_question(question: str, history: list[Turn]) -> str:
+    """
+    Search query for ``question``: follow-ups get the previous question
+    prepended so retrieval sees what "it" refers to.
+    """
+    if history and is_follow_up(question):
+        return f"{history[-1]['question']} {question}"
+    return question
+
+
+def _format_turns(turns: list[Turn]) -> str:
+    return "\n\n".join(f"User: {t['question']}\nAssistant: {t['answer']}" for t in turns)
+
+
+def format_conversation(summary: str, history: list[Turn]) -> str:
+    """Render the summary and recent turns for the generation prompt."""
+    parts = []
+    if summary:
+        parts.append(f"Summary of the earlier conversation: {summary}")
+    if history:
+        parts.append(_format_turns(history))
+    return "\n\n".join(parts)
+
+
+def fold_turns(summary: str, turns: list[Turn]) -> str:
+    """Return ``summary`` updated with ``turns`` (one cheap LLM call)."""
+    llm = get_llm(settings.summary_provider, model=settings.summary_model)
+    prompt = FOLD_PROMPT.format(
+        words=settings.memory_summary_words,
+        summary=summary or "(empty)",
+        turns=_format_turns(turns),
+    )
+    return llm.invoke(prompt).text.strip()
+
+
+def remember(
+    question: str,
+    answer: str,
+    history: list[Turn],
+    summary: str,
+) -> tuple[list[Turn], str]:
+    """
+    Append a turn and fold whatever falls out of the window into the summary.
+
+    Returns the new ``(history, summary)``. If folding fails the turns are
+    kept (up to twice the window) and folded on a later turn.
+    """
+    window = max(settings.memory_turns, 1)
+    history = [*history, {"question": question, "answer": answer}]
+    overflow = len(history) - window
+    if overflow <= 0:
+        return history, summary
+
+    try:
+        summary = fold_turns(summary, history[:overflow])
+        metrics.increment("memory.folded_turns", overflow)
+        return history[overflow:], summary
+    except Exception:
+        logger.warning("Could not fold conversation turns into the summary.", exc_info=True)
+        return history[-2 * window:], summary
+
+
+def forget_session(session_id: str, *, tenant_id: str | None = None) -> None:
+    """Delete a chat session's history and summary."""
+    delete_session(normalize_tenant_id(tenant_id), session_id)
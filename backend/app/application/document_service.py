@@ -4,77 +4,333 @@ Document ingestion service — application layer orchestration.
 from __future__ import annotations
 
 import logging
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
-from app.domain.models import DocumentUploadResponse
+from config import settings
+from app.application.summary_service import assign_sections, summarize_document
+from app.application.tenant_service import ensure_active
+from app.domain.models import DocumentInfo, DocumentUploadResponse
+from app.infrastructure.tenants import bump_corpus_version, normalize_tenant_id, record_stub_expiry
 from app.infrastructure.pdf_parser import (
     load_pdf,
     compute_file_hash,
+    compute_text_hash,
     chunk_documents,
     create_plain_text_documents,
+    tag_chunk_hashes,
 )
 from app.infrastructure.vector_store import (
-    get_vector_store,
+    backfill_document_registry,
+    carry_document_metadata,
+    compact_tombstones,
+    document_exists,
+    expire_deletion_stubs,
+    get_live_chunk_hashes,
+    get_summary_nodes,
+    has_tombstones,
+    list_documents as list_registered_documents,
+    register_document,
+    retag_chunks,
     store_documents,
+    tombstone_chunks,
+    unregister_document,
 )
 
 logger = logging.getLogger(__name__)
 
 
-def _file_hash_exists(file_hash: str) -> bool:
+def _file_hash_exists(file_hash: str, tenant_id: str | None = None) -> bool:
     """Check whether a document with this hash is already in the store."""
     try:
-        collection = get_vector_store()._collection
-        existing = collection.distinct("metadata.file_hash")
-        return file_hash in existing
+        return document_exists(file_hash, tenant_id=tenant_id)
     except Exception:
         logger.warning("Could not check for duplicate file hash.", exc_info=True)
         return False
 
 
-def ingest_pdf(file_path: str | Path) -> DocumentUploadResponse:
+def _build_summaries(
+    sections: list | None,
+    file_hash: str,
+    source: str,
+    tenant_id: str,
+    replaces: str | None = None,
+) -> bool:
     """
-    Full pipeline: load PDF → deduplicate → chunk → embed → store.
+    Build summary nodes for a document; returns True if it is summarized.
+
+    Summaries are an optimization, so failures are logged and the document
+    is simply searched without them. Summaries of a replaced document that
+    are not carried over are retired.
+    """
+    if sections is not None:
+        try:
+            summarize_document(
+                sections, file_hash=file_hash, source=source, tenant_id=tenant_id, replaces=replaces
+            )
+            return True
+        except Exception:
+            logger.warning("Could not summarize %s; it will be searched without summaries.",
+                           source, exc_info=True)
+    if replaces:
+        stale = get_summary_nodes(replaces, tenant_id=tenant_id)
+        tombstone_chunks(ids=[node["_id"] for node in stale], tenant_id=tenant_id)
+    return False
+
+
+def ingest_pdf(file_path: str | Path, *, tenant_id: str | None = None) -> DocumentUploadResponse:
+    """
+    Full pipeline: load PDF → deduplicate → chunk → embed → store
+    → summarize (if enabled).
 
     Returns a response indicating what happened.
     """
+    tenant_id = normalize_tenant_id(tenant_id)
+    ensure_active(tenant_id)
     path = Path(file_path)
     file_hash = compute_file_hash(path)
 
-    if _file_hash_exists(file_hash):
+    if _file_hash_exists(file_hash, tenant_id):
         logger.info("PDF already uploaded: %s (hash=%s)", path.name, file_hash)
         return DocumentUploadResponse(
             filename=path.name,
             chunks_stored=0,
             already_existed=True,
             message=f"'{path.name}' has already been uploaded.",
+            file_hash=file_hash,
         )
 
     docs = load_pdf(path)
     chunks = chunk_documents(docs)
 
-    # Tag every chunk with the file hash for future dedup
+    # Tag every chunk with the file hash for dedup / filtering, and use the
+    # original filename as source (PyPDFLoader records the temp upload path).
     for chunk in chunks:
         chunk.metadata["file_hash"] = file_hash
+        chunk.metadata["source"] = path.name
+    tag_chunk_hashes(chunks)
+    sections = assign_sections(chunks) if settings.summaries_enabled else None
 
-    count = store_documents(chunks)
+    count = store_documents(chunks, tenant_id=tenant_id)
+    summarized = _build_summaries(sections, file_hash, path.name, tenant_id)
+    register_document(
+        file_hash, path.name,
+        pages=len(docs), chunks=count, summarized=summarized, tenant_id=tenant_id,
+    )
+    bump_corpus_version(tenant_id)
     logger.info("Ingested %s → %d chunks stored.", path.name, count)
     return DocumentUploadResponse(
         filename=path.name,
         chunks_stored=count,
         message=f"Successfully processed '{path.name}'.",
+        file_hash=file_hash,
     )
 
 
-def ingest_plain_text(text: str, source: str = "user_input") -> DocumentUploadResponse:
+def ingest_plain_text(
+    text: str,
+    source: str = "user_input",
+    *,
+    tenant_id: str | None = None,
+) -> DocumentUploadResponse:
     """
     Ingest raw text into the vector store.
     """
+    tenant_id = normalize_tenant_id(tenant_id)
+    ensure_active(tenant_id)
+    file_hash = compute_text_hash(text)
     docs = create_plain_text_documents(text, source=source)
     chunks = chunk_documents(docs)
-    count = store_documents(chunks)
+    for chunk in chunks:
+        chunk.metadata["file_hash"] = file_hash
+    tag_chunk_hashes(chunks)
+    sections = assign_sections(chunks) if settings.summaries_enabled else None
+
+    count = store_documents(chunks, tenant_id=tenant_id)
+    summarized = _build_summaries(sections, file_hash, source, tenant_id)
+    register_document(
+        file_hash, source, pages=0, chunks=count, summarized=summarized, tenant_id=tenant_id,
+    )
+    bump_corpus_version(tenant_id)
     return DocumentUploadResponse(
         filename=source,
         chunks_stored=count,
         message=f"Stored {count} chunk(s) from plain text.",
+        file_hash=file_hash,
+    )
+
+
+def update_pdf(
+    file_path: str | Path,
+    replaces: str,
+    *,
+    tenant_id: str | None = None,
+) -> DocumentUploadResponse | None:
+    """
+    Replace a stored document with a new version, re-embedding only changes.
+
+    The new chunk set is diffed against the stored one by content hash:
+    unchanged chunks are re-tagged in place, new chunks are embedded and
+    inserted, and chunks that disappeared are tombstoned.
+
+    Returns None if ``replaces`` is not a known document.
+    """
+    tenant_id = normalize_tenant_id(tenant_id)
+    ensure_active(tenant_id)
+    path = Path(file_path)
+    file_hash = compute_file_hash(path)
+
+    stored = get_live_chunk_hashes(replaces, tenant_id=tenant_id)
+    if not stored:
+        return None
+    if file_hash == replaces:
+        return DocumentUploadResponse(
+            filename=path.name,
+            chunks_stored=0,
+            already_existed=True,
+            message=f"'{path.name}' is identical to the stored version.",
+            file_hash=file_hash,
+            chunks_unchanged=len(stored),
+        )
+
+    docs = load_pdf(path)
+    chunks = chunk_documents(docs)
+    for chunk in chunks:
+        chunk.metadata["file_hash"] = file_hash
+        chunk.metadata["source"] = path.name
+    tag_chunk_hashes(chunks)
+    sections = assign_sections(chunks) if settings.summaries_enabled else None
+
+    # Multiset match: identical chunks may legitimately repeat in a file.
+    stored_ids: dict[str | None, list] = defaultdict(list)
+    for record in stored:
+        stored_ids[record.get("chunk_hash")].append(record["_id"])
+
+    to_insert = []
+    kept: list[tuple] = []
+    for chunk in chunks:
+        ids = stored_ids.get(chunk.metadata["chunk_hash"])
+        if ids:
+            kept.append((ids.pop(), {
+                "file_hash": file_hash,
+                "source": path.name,
+                "page": chunk.metadata.get("page"),
+                "section_hash": chunk.metadata.get("section_hash"),
+            }))
+        else:
+            to_insert.append(chunk)
+    removed = [_id for ids in stored_ids.values() for _id in ids]
+
+    count = store_documents(to_insert, tenant_id=tenant_id) if to_insert else 0
+    retag_chunks(kept, tenant_id=tenant_id)
+    tombstone_chunks(ids=removed, tenant_id=tenant_id)
+    summarized = _build_summaries(sections, file_hash, path.name, tenant_id, replaces=replaces)
+
+    register_document(
+        file_hash, path.name,
+        pages=len(docs), chunks=len(chunks), summarized=summarized, tenant_id=tenant_id,
+    )
+    carry_document_metadata(replaces, file_hash, tenant_id=tenant_id)
+    unregister_document(replaces, tenant_id=tenant_id)
+    bump_corpus_version(tenant_id)
+    # Removed chunks and retired summary nodes are tombstones now.
+    schedule_compaction(tenant_id)
+
+    logger.info(
+        "Updated %s: %d new, %d unchanged, %d removed chunks.",
+        path.name, count, len(kept), len(removed),
+    )
+    return DocumentUploadResponse(
+        filename=path.name,
+        chunks_stored=count,
+        message=f"Updated '{path.name}': {count} new, {len(kept)} unchanged, "
+                f"{len(removed)} removed chunk(s).",
+        file_hash=file_hash,
+        chunks_unchanged=len(kept),
+        chunks_removed=len(removed),
     )
+
+
+def delete_document(file_hash: str, *, tenant_id: str | None = None) -> bool:
+    """
+    Remove a document from retrieval and the registry.
+
+    Chunks are tombstoned immediately and purged by background compaction.
+    Returns False if the document is unknown.
+    """
+    tenant_id = normalize_tenant_id(tenant_id)
+    ensure_active(tenant_id)
+
+    removed = tombstone_chunks(file_hash=file_hash, tenant_id=tenant_id)
+    existed = unregister_document(file_hash, tenant_id=tenant_id)
+    if not (removed or existed):
+        return False
+
+    bump_corpus_version(tenant_id)
+    schedule_compaction(tenant_id)
+    logger.info("Deleted document %s (%d chunks tombstoned).", file_hash, removed)
+    return True
+
+
+def list_documents(*, tenant_id: str | None = None) -> list[DocumentInfo]:
+    """
+    Return every ingested document from the registry (no chunk scan).
+
+    An empty registry is first backfilled from the chunks, so corpora
+    ingested before the registry existed are listed too.
+    """
+    records = list_registered_documents(tenant_id=tenant_id)
+    if not records and backfill_document_registry(tenant_id=tenant_id):
+        records = list_registered_documents(tenant_id=tenant_id)
+    return [DocumentInfo(**record) for record in records]
+
+
+# ── Background compaction ────────────────────────────────────────────
+#
+# Tombstones are purged by a single timer thread per worker, one grace
+# period after the first pending deletion. If the worker exits first, the
+# next deletion's compaction run picks up the leftovers. The same run
+# deletes the stubs left by compactions older than the stub retention.
+
+_compaction_lock = threading.Lock()
+_pending_compaction: set[str] = set()
+_compaction_timer: threading.Timer | None = None
+
+
+def schedule_compaction(tenant_id: str) -> None:
+    """Queue a tenant for tombstone compaction after the grace period."""
+    global _compaction_timer  # noqa: PLW0603
+    with _compaction_lock:
+        _pending_compaction.add(tenant_id)
+        if _compaction_timer is None:
+            _compaction_timer = threading.Timer(
+                settings.tombstone_grace_seconds + 1, _run_compaction
+            )
+            _compaction_timer.daemon = True
+            _compaction_timer.start()
+
+
+def _run_compaction() -> None:
+    """Purge expired tombstones for every queued tenant."""
+    global _compaction_timer  # noqa: PLW0603
+    with _compaction_lock:
+        tenant_ids = list(_pending_compaction)
+        _pending_compaction.clear()
+        _compaction_timer = None
+
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(seconds=settings.tombstone_grace_seconds)
+    stub_cutoff = now - timedelta(seconds=settings.deletion_stub_retention_seconds)
+    for tenant_id in tenant_ids:
+        try:
+            compact_tombstones(cutoff, tenant_id=tenant_id)
+            expired = expire_deletion_stubs(stub_cutoff, tenant_id=tenant_id)
+            if expired:
+                record_stub_expiry(tenant_id, expired)
+            # Tombstones created during the grace window need another pass.
+            if has_tombstones(tenant_id=tenant_id):
+                schedule_compaction(tenant_id)
+        except Exception:
+            logger.warning("Tombstone compaction failed for tenant '%s'.", tenant_id, exc_info=True)
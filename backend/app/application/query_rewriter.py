@@ -0,0 +1,123 @@
+"""
+Query rewriting — turn vague questions into precise search queries.
+
+Rewrites run on the cheap summary model in a small thread pool, so the
+graph can start a rewrite and search with the raw question at the same
+time. The rewrite is only waited for (up to ``rewrite_timeout_seconds``)
+when the first pass scores poorly.
+
+In-flight and finished rewrites are cached per worker by normalized
+question, in an LRU of futures: concurrent requests for the same question
+share one call, and a rewrite that misses its deadline still lands in the
+cache for the next time the question is asked.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from config import settings
+from app.infrastructure import metrics
+from app.infrastructure.llm_factory import get_llm
+
+logger = logging.getLogger(__name__)
+
+REWRITE_PROMPT = """Rewrite the question below as a clear, specific search query for a search engine over the user's own notes and documents.
+Resolve vague wording, expand abbreviations and add the key technical terms. Reply with the query only.
+
+Question: {question}"""
+
+# Questions up to this many words with no vague wording are already good
+# search queries.
+_PRECISE_MAX_WORDS = 8
+_VAGUE_WORDS = re.compile(
+    r"\b(it|this|that|these|those|thing|things|stuff|something|anything|"
+    r"about|explain|tell me|help|mean|means)\b",
+    re.IGNORECASE,
+)
+
+# HTTP timeout for the rewrite call itself. Longer than the wait in the
+# graph on purpose: late rewrites still fill the cache.
+_CALL_TIMEOUT = 10.0
+
+_executor: ThreadPoolExecutor | None = None
+_cache: OrderedDict[str, tuple[float, Future[str]]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def normalize_question(question: str) -> str:
+    """Cache key: lowercase, collapsed whitespace, no trailing punctuation."""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+def should_rewrite(question: str) -> bool:
+    """Heuristic: skip short questions without vague wording."""
+    words = question.split()
+    return len(words) > _PRECISE_MAX_WORDS or bool(_VAGUE_WORDS.search(question))
+
+
+def _rewrite(question: str) -> str:
+    llm = get_llm(settings.summary_provider, model=settings.summary_model, timeout=_CALL_TIMEOUT)
+    rewritten = llm.invoke(REWRITE_PROMPT.format(question=question)).text.strip().strip('"')
+    return rewritten or question
+
+
+def _forget_failure(key: str, future: Future[str]) -> None:
+    """Drop failed rewrites so the question is retried next time."""
+    if future.exception() is not None:
+        with _lock:
+            if key in _cache and _cache[key][1] is future:
+                del _cache[key]
+
+
+def start_rewrite(question: str) -> str:
+    """
+    Start (or reuse) a rewrite of ``question`` and return its cache key.
+
+    Never blocks; collect the result with ``await_rewrite``.
+    """
+    global _executor  # noqa: PLW0603
+    key = normalize_question(question)
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            metrics.increment("rewrite.cache_hits")
+            return key
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rewrite")
+        # Carry the request id (and other context) into the worker thread.
+        future = _executor.submit(contextvars.copy_context().run, _rewrite, question)
+        _cache[key] = (time.monotonic(), future)
+        while len(_cache) > settings.rewrite_cache_size:
+            _cache.popitem(last=False)
+    future.add_done_callback(lambda f: _forget_failure(key, f))
+    return key
+
+
+def await_rewrite(key: str) -> str | None:
+    """
+    Return the rewrite for ``key``, waiting at most until its deadline.
+
+    The deadline is ``rewrite_timeout_seconds`` after the rewrite started;
+    returns None if it has not finished by then or failed.
+    """
+    with _lock:
+        entry = _cache.get(key)
+    if entry is None:
+        return None
+    started, future = entry
+    remaining = settings.rewrite_timeout_seconds - (time.monotonic() - started)
+    try:
+        return future.result(timeout=max(remaining, 0))
+    except FutureTimeout:
+        metrics.increment("rewrite.timeouts")
+        return None
+    except Exception:
+        logger.warning("Query rewrite failed.", exc_info=True)
+        metrics.increment("rewrite.failures")
+        return None
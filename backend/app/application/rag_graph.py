@@ -2,8 +2,17 @@
 LangGraph-based RAG agent with conditional routing.
 
 Graph topology:
-  START → retrieve → grade_docs ─┬─ (relevant)   → generate → END
-                                  └─ (no context) → no_context_response → END
+  START → [rewrite] → retrieve → grade_docs ─┬─ (relevant)   → generate ────────────┬→ remember → END
+                                              └─ (no context) → no_context_response ─┘
+
+``rewrite`` is only added with ``REWRITE_ENABLED``; it starts a rewrite of
+the question in the background, and ``retrieve`` waits for it only if the
+first pass on the raw question scores poorly.
+
+Requests with a ``session_id`` run on a checkpointed graph, so ``history``,
+``summary`` and the previous turn's ``documents`` carry over between turns.
+Every turn is retrieved; follow-ups are searched together with the
+previous question and keep some of the previous turn's chunks.
 
 This replaces the flat LCEL chain with an explicit state machine,
 enabling observability, conditional logic, and future extension
@@ -12,33 +21,122 @@ enabling observability, conditional logic, and future extension
 from __future__ import annotations
 
 import logging
+from hashlib import sha256
 from typing import Any, Literal, TypedDict
 
 from langchain_core.documents import Document
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.prompts import PromptTemplate
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langgraph.graph import END, StateGraph
-from app.domain.models import QueryResponse, SourceDocument
-from app.infrastructure.llm_factory import get_llm, get_provider_info
+from app.domain.models import QueryResponse, RetrievalFilter, SourceDocument, TokenUsage
+from app.application.conversation_memory import format_conversation, remember, standalone_question
+from app.application.query_rewriter import (
+    await_rewrite,
+    normalize_question,
+    should_rewrite,
+    start_rewrite,
+)
+from app.application.summary_service import select_scope
+from app.application.tenant_service import ensure_active
+from app.infrastructure import metrics
+from app.infrastructure.checkpoints import get_checkpointer, prune_thread, thread_config
+from app.infrastructure.tenants import has_corpus, normalize_tenant_id
+from app.infrastructure.llm_factory import get_provider_info
+from app.infrastructure.resilient_llm import invoke_with_failover
 from app.infrastructure.vector_store import get_retriever
+from config import settings
 
 logger = logging.getLogger(__name__)
 
 # ── Prompt ───────────────────────────────────────────────────────────
-
-RAG_TEMPLATE = """You are a helpful research assistant. Answer the question using ONLY the provided context.
+#
+# Messages are laid out static → semi-static → variable so providers can
+# reuse the longest possible prefix between calls:
+#   system instructions  (identical on every call)
+#   document context     (identical for repeated questions over the same docs)
+#   question             (changes every call)
+# Anthropic needs explicit ``cache_control`` breakpoints; OpenAI caches
+# matching prefixes automatically once the prompt exceeds ~1024 tokens.
+
+SYSTEM_PROMPT = """You are a helpful research assistant. Answer the question using ONLY the provided context.
 If the context does not contain enough information, reply: "I don't know based on the provided context."
 
-Always cite which document(s) you drew your answer from when possible.
+Always cite which document(s) you drew your answer from when possible."""
 
-Context:
-{context}
+CONTEXT_TEMPLATE = """Context:
+{context}"""
 
-Question: {question}
+CONVERSATION_TEMPLATE = """Conversation so far:
+{conversation}"""
+
+QUESTION_TEMPLATE = """Question: {question}
 
 Answer:"""
 
-RAG_PROMPT = PromptTemplate.from_template(RAG_TEMPLATE)
+_CACHE_BREAKPOINT = {"type": "ephemeral"}
+
+
+def _context_sort_key(doc: Document) -> tuple[str, int, str]:
+    """Deterministic ordering so the same chunk set renders the same prefix."""
+    meta = doc.metadata or {}
+    return (str(meta.get("source", "")), meta.get("page") or 0, doc.page_content[:64])
+
+
+def build_messages(
+    question: str,
+    documents: list[Document],
+    provider: str,
+    conversation: str = "",
+) -> list[BaseMessage]:
+    """
+    Build the chat messages for a generation call.
+
+    When prompt caching is enabled and the provider is Anthropic, the system
+    prompt and the context block are marked as cache breakpoints. The
+    conversation block (if any) goes after them, since it changes every turn.
+    """
+    ordered = sorted(documents, key=_context_sort_key)
+    context = CONTEXT_TEMPLATE.format(
+        context="\n\n".join(doc.page_content for doc in ordered)
+    )
+    question_text = QUESTION_TEMPLATE.format(question=question)
+
+    mark_cache = settings.prompt_caching_enabled and provider == "anthropic"
+    system_block: dict[str, Any] = {"type": "text", "text": SYSTEM_PROMPT}
+    context_block: dict[str, Any] = {"type": "text", "text": context}
+    if mark_cache:
+        system_block["cache_control"] = _CACHE_BREAKPOINT
+        context_block["cache_control"] = _CACHE_BREAKPOINT
+
+    blocks = [context_block]
+    if conversation:
+        blocks.append({"type": "text", "text": CONVERSATION_TEMPLATE.format(conversation=conversation)})
+    blocks.append({"type": "text", "text": question_text})
+    return [
+        SystemMessage(content=[system_block]),
+        HumanMessage(content=blocks),
+    ]
+
+
+def _invoke_kwargs(provider: str, messages: list[BaseMessage]) -> dict[str, Any]:
+    """Provider-specific request options that improve cache hit rates."""
+    if settings.prompt_caching_enabled and provider == "openai":
+        # Route identical system + context prefixes to the same cache shard.
+        prefix = str(messages[0].content) + str(messages[-1].content[0])
+        return {"prompt_cache_key": "smartnotes:" + sha256(prefix.encode()).hexdigest()[:32]}
+    return {}
+
+
+def extract_token_usage(message: BaseMessage) -> dict[str, int]:
+    """Normalise LangChain ``usage_metadata`` into ``TokenUsage`` fields."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    return {
+        "input_tokens": usage.get("input_tokens", 0),
+        "output_tokens": usage.get("output_tokens", 0),
+        "cache_read_tokens": details.get("cache_read", 0) or 0,
+        "cache_write_tokens": details.get("cache_creation", 0) or 0,
+    }
+
 
 # ── Graph State ──────────────────────────────────────────────────────
 
@@ -48,22 +146,97 @@ class GraphState(TypedDict, total=False):
 
     question: str
     provider: Literal["openai", "anthropic"]
+    tenant_id: str
+    filters: RetrievalFilter | None
     documents: list[Document]
     generation: str
     has_relevant_docs: bool
+    usage: dict[str, int]
+    answered_by: str
+    history: list[dict[str, str]]    # last turns, verbatim
+    summary: str                     # rolling summary of older turns
+    rewrite_key: str                 # pending rewrite of this turn's question ("" = none)
+    rewritten_question: str | None   # rewrite actually used for retrieval
 
 
 # ── Node functions ───────────────────────────────────────────────────
 
 
+def _search_question(state: GraphState) -> str:
+    """The question as a standalone search query (see ``standalone_question``)."""
+    return standalone_question(state["question"], state.get("history", []))
+
+
+def _chunk_key(doc: Document) -> tuple:
+    meta = doc.metadata or {}
+    return meta.get("_id") or (meta.get("source"), meta.get("page"), doc.page_content)
+
+
+def _carry_over(documents: list[Document], previous: list[Document]) -> list[Document]:
+    """
+    Add up to half of ``retrieval_k`` of the previous turn's chunks that the
+    new search did not return, so a follow-up keeps the context it refers to.
+    """
+    seen = {_chunk_key(doc) for doc in documents}
+    extra = [doc for doc in previous if _chunk_key(doc) not in seen][: settings.retrieval_k // 2]
+    if extra:
+        metrics.increment("memory.reused_documents", len(extra))
+    return documents + extra
+
+
+def _search(question: str, tenant_id: str, filters: RetrievalFilter | None) -> list[Document]:
+    # Explicit filters already narrow the search; otherwise let document
+    # and section summaries pick where to look.
+    scope = select_scope(question, tenant_id) if filters is None else None
+    return get_retriever(filters, tenant_id=tenant_id, scope=scope).invoke(question)
+
+
+def _top_score(documents: list[Document]) -> float:
+    return max((doc.metadata.get("score", 0.0) for doc in documents), default=0.0)
+
+
+def rewrite(state: GraphState) -> dict[str, Any]:
+    """Start rewriting vague questions in the background (never blocks)."""
+    question = _search_question(state)
+    # An empty corpus skips retrieval, so the (billed) rewrite would be wasted.
+    if not should_rewrite(question) or not has_corpus(state["tenant_id"]):
+        return {"rewrite_key": ""}
+    return {"rewrite_key": start_rewrite(question)}
+
+
 def retrieve(state: GraphState) -> dict[str, Any]:
     """Retrieve relevant documents from the vector store."""
-    question = state["question"]
+    tenant_id = state["tenant_id"]
+    if not has_corpus(tenant_id):
+        logger.info("Tenant '%s' has no documents; skipping retrieval.", tenant_id)
+        return {"documents": [], "rewritten_question": None}
+
+    question = _search_question(state)
+    follow_up = question != state["question"]
     logger.info("Retrieving documents for: %s", question[:80])
-    retriever = get_retriever()
-    documents = retriever.invoke(question)
+    filters = state.get("filters")
+    documents = _search(question, tenant_id, filters)
+    rewritten_question = question if follow_up else None
+
+    # Second pass only when the first one is weak and a rewrite is ready
+    # in time; otherwise the pending rewrite adds no latency.
+    key = state.get("rewrite_key")
+    if key and _top_score(documents) < settings.rewrite_min_score:
+        rewritten = await_rewrite(key)
+        if rewritten and normalize_question(rewritten) != key:
+            second = _search(rewritten, tenant_id, filters)
+            if _top_score(second) > _top_score(documents):
+                logger.info("Using rewritten query: %s", rewritten[:80])
+                metrics.increment("rewrite.used")
+                documents, rewritten_question = second, rewritten
+
+    # On a session, ``documents`` still holds the previous turn's chunks.
+    previous = state.get("documents") or []
+    if follow_up and previous and filters is None:
+        documents = _carry_over(documents, previous)
+
     logger.info("Retrieved %d documents.", len(documents))
-    return {"documents": documents}
+    return {"documents": documents, "rewritten_question": rewritten_question}
 
 
 def grade_documents(state: GraphState) -> dict[str, Any]:
@@ -81,14 +254,23 @@ def generate(state: GraphState) -> dict[str, Any]:
     question = state["question"]
     provider = state.get("provider", "openai")
     documents = state.get("documents", [])
+    conversation = format_conversation(state.get("summary", ""), state.get("history", []))
 
-    context = "\n\n".join(doc.page_content for doc in documents)
-    llm = get_llm(provider)
-    chain = RAG_PROMPT | llm | StrOutputParser()
+    def build_request(target: str) -> tuple[list[BaseMessage], dict[str, Any]]:
+        messages = build_messages(question, documents, target, conversation)
+        return messages, _invoke_kwargs(target, messages)
 
-    generation = chain.invoke({"context": context, "question": question})
-    logger.info("Generated answer via %s (%d chars).", provider, len(generation))
-    return {"generation": generation}
+    # May hedge to / fail over to the other provider; report who answered.
+    message, answered_by = invoke_with_failover(provider, build_request)
+
+    generation = message.text
+    usage = extract_token_usage(message)
+    metrics.record_token_usage(answered_by, usage)
+    logger.info(
+        "Generated answer via %s (%d chars, cache_read=%d, cache_write=%d).",
+        answered_by, len(generation), usage["cache_read_tokens"], usage["cache_write_tokens"],
+    )
+    return {"generation": generation, "usage": usage, "answered_by": answered_by}
 
 
 def no_context_response(state: GraphState) -> dict[str, Any]:
@@ -99,6 +281,17 @@ def no_context_response(state: GraphState) -> dict[str, Any]:
     }
 
 
+def remember_turn(state: GraphState) -> dict[str, Any]:
+    """Record the exchange in the bounded session history."""
+    history, summary = remember(
+        state["question"],
+        state.get("generation", ""),
+        state.get("history", []),
+        state.get("summary", ""),
+    )
+    return {"history": history, "summary": summary}
+
+
 # ── Routing logic ────────────────────────────────────────────────────
 
 
@@ -125,9 +318,15 @@ def build_rag_graph() -> StateGraph:
     workflow.add_node("grade_docs", grade_documents)
     workflow.add_node("generate", generate)
     workflow.add_node("no_context_response", no_context_response)
+    workflow.add_node("remember", remember_turn)
 
     # Wire edges
-    workflow.set_entry_point("retrieve")
+    if settings.rewrite_enabled:
+        workflow.add_node("rewrite", rewrite)
+        workflow.set_entry_point("rewrite")
+        workflow.add_edge("rewrite", "retrieve")
+    else:
+        workflow.set_entry_point("retrieve")
     workflow.add_edge("retrieve", "grade_docs")
     workflow.add_conditional_edges(
         "grade_docs",
@@ -137,20 +336,26 @@ def build_rag_graph() -> StateGraph:
             "no_context_response": "no_context_response",
         },
     )
-    workflow.add_edge("generate", END)
-    workflow.add_edge("no_context_response", END)
+    workflow.add_edge("generate", "remember")
+    workflow.add_edge("no_context_response", "remember")
+    workflow.add_edge("remember", END)
 
     return workflow
 
 
 # ── Public API ───────────────────────────────────────────────────────
 
-# Compile once at module level for reuse
+# Compile once at module level for reuse (stateless and session variants)
 _compiled_graph = None
+_session_graph = None
 
 
-def _get_graph():
-    global _compiled_graph  # noqa: PLW0603
+def _get_graph(*, sessions: bool = False):
+    global _compiled_graph, _session_graph  # noqa: PLW0603
+    if sessions:
+        if _session_graph is None:
+            _session_graph = build_rag_graph().compile(checkpointer=get_checkpointer())
+        return _session_graph
     if _compiled_graph is None:
         _compiled_graph = build_rag_graph().compile()
     return _compiled_graph
@@ -159,6 +364,9 @@ def _get_graph():
 def query_rag(
     question: str,
     provider: Literal["openai", "anthropic"] = "openai",
+    filters: RetrievalFilter | None = None,
+    tenant_id: str | None = None,
+    session_id: str | None = None,
 ) -> QueryResponse:
     """
     Run the full RAG pipeline and return a structured response.
@@ -169,14 +377,37 @@ def query_rag(
         The user's question.
     provider : str
         Which LLM provider to use.
+    filters : RetrievalFilter | None
+        Optional document / source / page restrictions for retrieval.
+    tenant_id : str | None
+        Tenant whose corpus is searched (defaults to the default tenant).
+    session_id : str | None
+        Chat session to continue; None answers the question statelessly.
 
     Returns
     -------
     QueryResponse
-        Answer text, provider info, and source documents.
+        Answer text, provider info, source documents and token usage.
     """
-    graph = _get_graph()
-    result = graph.invoke({"question": question, "provider": provider})
+    tenant_id = normalize_tenant_id(tenant_id)
+    ensure_active(tenant_id)
+
+    inputs: GraphState = {
+        "question": question,
+        "provider": provider,
+        "tenant_id": tenant_id,
+        "filters": filters,
+    }
+    if session_id and settings.memory_enabled:
+        # Per-turn outputs would otherwise carry over from the last turn.
+        inputs.update(generation="", usage={}, answered_by=provider)
+        # Only the final state of a turn is needed, so checkpoint on exit.
+        result = _get_graph(sessions=True).invoke(
+            inputs, thread_config(tenant_id, session_id), durability="exit"
+        )
+        prune_thread(tenant_id, session_id)
+    else:
+        result = _get_graph().invoke(inputs)
 
     # Build source list
     sources: list[SourceDocument] = []
@@ -190,10 +421,13 @@ def query_rag(
             )
         )
 
-    info = get_provider_info(provider)
+    info = get_provider_info(result.get("answered_by", provider))
+    usage = result.get("usage")
     return QueryResponse(
         answer=result.get("generation", ""),
         provider=info["provider"],
         model=info["model"],
         sources=sources,
+        usage=TokenUsage(**usage) if usage else None,
+        rewritten_question=result.get("rewritten_question"),
     )
@@ -0,0 +1,157 @@
+"""
+Corpus snapshots — copy a tenant's corpus between deployments.
+
+Exports write chunks, vectors and the document registry to a snapshot
+file (see ``snapshot_file``); imports bulk-load them without parsing or
+embedding anything, so a new node is ready as soon as the writes finish.
+
+Snapshots are full (``since=0``) or incremental: a delta holds the chunks
+written and deleted after corpus version ``since`` of the source tenant.
+A full snapshot is imported into an empty tenant, then deltas are applied
+on top in order; the target remembers the last source version it has seen
+in ``snapshot_version``.
+"""
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timezone
+from pathlib import Path
+
+from config import settings
+from app.application.document_service import schedule_compaction
+from app.application.tenant_service import ensure_active
+from app.domain.errors import InvalidRequest
+from app.domain.models import SnapshotInfo
+from app.infrastructure import tenants
+from app.infrastructure.snapshot_file import SnapshotReader, SnapshotWriter
+from app.infrastructure.vector_store import (
+    get_deleted_chunk_ids,
+    has_chunks,
+    iter_snapshot_chunks,
+    list_documents,
+    load_chunks,
+    replace_document_registry,
+    tombstone_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _info(header: dict, tenant_id: str) -> SnapshotInfo:
+    return SnapshotInfo(
+        tenant_id=tenant_id,
+        base_version=header["base_version"],
+        version=header["version"],
+        chunks=header["chunks"],
+        deleted=header["deleted"],
+        documents=header["documents"],
+    )
+
+
+def export_snapshot(path: str | Path, *, tenant_id: str, since: int = 0) -> SnapshotInfo:
+    """
+    Write the tenant's corpus (or its changes after version ``since``) to ``path``.
+
+    Deletions are listed from tombstones, which compaction keeps as small
+    stubs for ``deletion_stub_retention_seconds``.
+
+    Raises
+    ------
+    InvalidRequest
+        If stubs of deletions after ``since`` have already expired; the
+        target needs a fresh full snapshot.
+    """
+    record = tenants.get_tenant(tenant_id, refresh=True) or {}
+    version = int(record.get("corpus_version", 0))
+    expired = int(record.get("stubs_expired_version", 0))
+    if since and since < expired:
+        raise InvalidRequest(
+            f"Deletions up to version {expired} of tenant '{tenant_id}' are no longer "
+            f"tracked; a delta since version {since} would miss some. Export a full snapshot."
+        )
+
+    writer = SnapshotWriter(path, settings.embedding_dimensions, {
+        "tenant_id": tenant_id,
+        "base_version": since,
+        "version": version,
+        "embedding_model": settings.embedding_model,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+    try:
+        # Chunks written while the export runs may be included too; they
+        # are stamped above ``version`` and re-sent by the next delta, and
+        # applying a chunk twice is harmless.
+        for chunk, vector in iter_snapshot_chunks(since, tenant_id=tenant_id):
+            writer.add_chunk(chunk, vector)
+        if since:
+            writer.add_deleted(get_deleted_chunk_ids(since, tenant_id=tenant_id))
+        writer.add_documents([
+            {"_id": rec.pop("file_hash"), **rec} for rec in list_documents(tenant_id=tenant_id)
+        ])
+        header = writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+    logger.info(
+        "Exported snapshot of tenant '%s' (versions %d-%d): %d chunks, %d deletions, %d documents.",
+        tenant_id, since, version, header["chunks"], header["deleted"], header["documents"],
+    )
+    return _info(header, tenant_id)
+
+
+def import_snapshot(path: str | Path, *, tenant_id: str | None = None) -> SnapshotInfo:
+    """
+    Load a snapshot into ``tenant_id`` (default: the tenant it was taken from).
+
+    Raises
+    ------
+    InvalidRequest
+        If the file is not a snapshot, was embedded with another model,
+        is a full snapshot for a non-empty tenant, or is a delta that does
+        not follow the last snapshot imported.
+    """
+    reader = SnapshotReader(path)
+    header = reader.header
+    tenant_id = tenants.normalize_tenant_id(tenant_id or header["tenant_id"])
+    ensure_active(tenant_id)
+
+    if (header["embedding_model"], header["dimensions"]) != (
+        settings.embedding_model, settings.embedding_dimensions
+    ):
+        raise InvalidRequest(
+            f"Snapshot vectors come from {header['embedding_model']} "
+            f"({header['dimensions']}-d); this node uses {settings.embedding_model} "
+            f"({settings.embedding_dimensions}-d)."
+        )
+    base = header["base_version"]
+    if base == 0:
+        if has_chunks(tenant_id=tenant_id):
+            raise InvalidRequest(
+                f"Tenant '{tenant_id}' already has chunks; import a full snapshot "
+                "into an empty tenant, or a delta on top of one."
+            )
+    else:
+        record = tenants.get_tenant(tenant_id, refresh=True) or {}
+        current = int(record.get("snapshot_version", 0))
+        if base > current:
+            raise InvalidRequest(
+                f"Delta starts at version {base} but tenant '{tenant_id}' is at "
+                f"snapshot version {current}; import the missing deltas first."
+            )
+
+    loaded = 0
+    for chunks, vectors in reader.iter_chunk_batches(settings.mongo_insert_batch_size):
+        loaded += load_chunks(chunks, vectors, tenant_id=tenant_id, replace=base > 0)
+    deleted = reader.deleted_ids()
+    if deleted:
+        tombstone_chunks(ids=deleted, tenant_id=tenant_id)
+        schedule_compaction(tenant_id)
+    replace_document_registry(reader.documents(), tenant_id=tenant_id)
+    tenants.record_snapshot_import(tenant_id, header["version"])
+
+    logger.info(
+        "Imported snapshot into tenant '%s' (versions %d-%d): %d chunks, %d deletions.",
+        tenant_id, base, header["version"], loaded, len(deleted),
+    )
+    return _info(header, tenant_id)
@@ -0,0 +1,265 @@
+"""
+Hierarchical summaries — section and document summary nodes.
+
+At ingest a document's chunks are grouped into sections, each section is
+summarized with a cheap model, and the section summaries are summarized
+into one document summary. Summary nodes are embedded and stored next to
+the chunks (``node_type="summary"``), so retrieval can run coarse-to-fine:
+find the best documents and sections first, then search only their chunks.
+
+Summary nodes are keyed by a hash of the chunks they cover. Re-uploading
+a changed document only regenerates the sections that actually changed,
+plus the document summary.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+from langchain_core.documents import Document
+
+from config import settings
+from app.infrastructure import metrics
+from app.infrastructure.llm_factory import get_llm
+from app.infrastructure.pdf_parser import compute_text_hash
+from app.infrastructure.tenants import bump_corpus_version, get_corpus_version
+from app.infrastructure.vector_store import (
+    SUMMARY_NODE,
+    get_document_chunks,
+    get_summary_coverage,
+    get_summary_nodes,
+    mark_document_summarized,
+    retag_chunks,
+    search_summaries,
+    store_documents,
+    tombstone_chunks,
+)
+
+logger = logging.getLogger(__name__)
+
+# Part of every summary hash; bump when the prompts change so stored
+# summaries are regenerated on the next update or backfill.
+SUMMARY_VERSION = 1
+
+SECTION_PROMPT = (
+    "Summarize this excerpt from '{source}' for a search index. List the topics, "
+    "key terms, definitions and results it covers, in at most 120 words.\n\n{text}"
+)
+
+DOCUMENT_PROMPT = (
+    "Summarize the document '{source}' for a search index, based on the text "
+    "below. Say what the document is about and list its main topics, in at "
+    "most 200 words.\n\n{text}"
+)
+
+
+def _summary_hash(level: str, parts: list[str]) -> str:
+    return compute_text_hash(f"{level}:{SUMMARY_VERSION}:" + ",".join(parts))
+
+
+def assign_sections(chunks: list[Document]) -> list[list[Document]]:
+    """
+    Group consecutive chunks into sections and tag ``metadata["section_hash"]``.
+
+    Boundaries are content-defined: a section ends at the first chunk past
+    half of ``summary_section_chars`` whose content hash is divisible by 4,
+    with a hard cap at twice the target. An edit then only moves nearby
+    boundaries, so the other sections keep their hash and cached summary.
+    Chunks must already carry ``chunk_hash``.
+    """
+    target = settings.summary_section_chars
+    sections: list[list[Document]] = []
+    current: list[Document] = []
+    size = 0
+    for chunk in chunks:
+        current.append(chunk)
+        size += len(chunk.page_content)
+        at_boundary = int(chunk.metadata["chunk_hash"][:8], 16) % 4 == 0
+        if (size >= target // 2 and at_boundary) or size >= target * 2:
+            sections.append(current)
+            current, size = [], 0
+    if current:
+        sections.append(current)
+
+    for section in sections:
+        section_hash = _summary_hash("section", [c.metadata["chunk_hash"] for c in section])
+        for chunk in section:
+            chunk.metadata["section_hash"] = section_hash
+    return sections
+
+
+def _summarize(prompts: list[str]) -> list[str]:
+    """Run summary prompts concurrently on the summary model."""
+    if not prompts:
+        return []
+    llm = get_llm(settings.summary_provider, model=settings.summary_model)
+    replies = llm.batch(prompts, config={"max_concurrency": settings.summary_max_concurrency})
+    return [reply.text.strip() for reply in replies]
+
+
+def summarize_document(
+    sections: list[list[Document]],
+    *,
+    file_hash: str,
+    source: str,
+    tenant_id: str,
+    replaces: str | None = None,
+) -> int:
+    """
+    Create (or reuse) the summary nodes for a sectioned document.
+
+    Nodes of ``replaces`` (or of ``file_hash`` itself) whose hash is still
+    wanted are re-tagged instead of regenerated; the rest are tombstoned.
+    Documents with a single section only get a document summary.
+
+    Returns the number of summaries generated.
+    """
+    existing = {
+        node["summary_hash"]: node
+        for node in get_summary_nodes(replaces or file_hash, tenant_id=tenant_id)
+    }
+    section_hashes = [section[0].metadata["section_hash"] for section in sections]
+    document_hash = _summary_hash("document", section_hashes)
+
+    nodes: list[Document] = []
+    kept: list[tuple[Any, dict[str, Any]]] = []
+    retag = {"file_hash": file_hash, "source": source}
+
+    def node(text: str, level: str, summary_hash: str, page: Any) -> Document:
+        return Document(page_content=text, metadata={
+            "file_hash": file_hash,
+            "source": source,
+            "page": page,
+            "node_type": SUMMARY_NODE,
+            "level": level,
+            "summary_hash": summary_hash,
+        })
+
+    section_texts: dict[str, str] = {}
+    if len(sections) > 1:
+        todo = []
+        for section, section_hash in zip(sections, section_hashes):
+            if section_hash in existing:
+                cached = existing.pop(section_hash)
+                section_texts[section_hash] = cached.get("text", "")
+                kept.append((cached["_id"], {**retag, "page": section[0].metadata.get("page")}))
+            elif section_hash not in section_texts:
+                todo.append(section)
+                section_texts[section_hash] = ""
+        summaries = _summarize([
+            SECTION_PROMPT.format(source=source, text="\n\n".join(c.page_content for c in section))
+            for section in todo
+        ])
+        for section, summary in zip(todo, summaries):
+            section_hash = section[0].metadata["section_hash"]
+            section_texts[section_hash] = summary
+            nodes.append(node(summary, "section", section_hash, section[0].metadata.get("page")))
+
+    if document_hash in existing:
+        kept.append((existing.pop(document_hash)["_id"], retag))
+    else:
+        if len(sections) > 1:
+            text = "\n\n".join(section_texts[h] for h in dict.fromkeys(section_hashes))
+        else:
+            text = "\n\n".join(chunk.page_content for chunk in sections[0])[: settings.summary_section_chars * 2]
+        nodes.extend(node(summary, "document", document_hash, None)
+                     for summary in _summarize([DOCUMENT_PROMPT.format(source=source, text=text)]))
+
+    store_documents(nodes, tenant_id=tenant_id)
+    retag_chunks(kept, tenant_id=tenant_id)
+    tombstone_chunks(ids=[stale["_id"] for stale in existing.values()], tenant_id=tenant_id)
+    logger.info(
+        "Summaries for %s: %d generated, %d reused, %d retired.",
+        source, len(nodes), len(kept), len(existing),
+    )
+    return len(nodes)
+
+
+def backfill_summaries(*, tenant_id: str) -> int:
+    """
+    Summarize documents ingested before summaries were enabled.
+
+    Chunks are read back from the store (no re-embedding) and tagged with
+    their section. Returns the number of documents summarized.
+    """
+    _, missing = get_summary_coverage(tenant_id=tenant_id)
+    done = 0
+    for file_hash in missing:
+        chunks = get_document_chunks(file_hash, tenant_id=tenant_id)
+        if not chunks or any(not chunk.metadata.get("chunk_hash") for chunk in chunks):
+            logger.warning("Skipping %s: chunks are missing content hashes.", file_hash)
+            continue
+        sections = assign_sections(chunks)
+        retag_chunks(
+            [(chunk.metadata["_id"], {"section_hash": chunk.metadata["section_hash"]}) for chunk in chunks],
+            tenant_id=tenant_id,
+        )
+        source = chunks[0].metadata.get("source", file_hash)
+        summarize_document(sections, file_hash=file_hash, source=source, tenant_id=tenant_id)
+        mark_document_summarized(file_hash, tenant_id=tenant_id)
+        done += 1
+    if done:
+        bump_corpus_version(tenant_id)
+    return done
+
+
+# ── Coarse-to-fine retrieval ─────────────────────────────────────────
+
+# Per tenant: (corpus version, document count, unsummarized file hashes).
+_coverage: dict[str, tuple[int, int, list[str]]] = {}
+_coverage_lock = threading.Lock()
+
+
+def _summary_coverage(tenant_id: str) -> tuple[int, list[str]]:
+    """Registry coverage, re-read only when the corpus version changes."""
+    version = get_corpus_version(tenant_id)
+    with _coverage_lock:
+        cached = _coverage.get(tenant_id)
+    if cached and cached[0] == version:
+        return cached[1], cached[2]
+
+    documents, missing = get_summary_coverage(tenant_id=tenant_id)
+    with _coverage_lock:
+        _coverage.pop(tenant_id, None)
+        _coverage[tenant_id] = (version, documents, missing)
+        while len(_coverage) > settings.tenant_cache_size:
+            _coverage.pop(next(iter(_coverage)))
+    return documents, missing
+
+
+def select_scope(question: str, tenant_id: str) -> dict[str, Any] | None:
+    """
+    Coarse stage: pick the documents and sections worth searching.
+
+    Returns a ``$vectorSearch`` filter clause limiting chunk search to the
+    best-matching documents and sections (plus any documents that have no
+    summaries yet), or None to search the whole corpus.
+    """
+    if not settings.summaries_enabled:
+        return None
+    try:
+        documents, missing = _summary_coverage(tenant_id)
+        if documents < settings.coarse_min_documents:
+            return None
+        nodes = search_summaries(question, tenant_id=tenant_id)
+    except Exception:
+        logger.warning("Coarse retrieval failed; searching all chunks.", exc_info=True)
+        return None
+    if not nodes:
+        return None
+
+    file_hashes = {n["file_hash"] for n in nodes if n.get("level") == "document"} | set(missing)
+    section_hashes = {n["summary_hash"] for n in nodes if n.get("level") == "section"}
+    clauses: list[dict[str, Any]] = []
+    if file_hashes:
+        clauses.append({"file_hash": {"$in": sorted(file_hashes)}})
+    if section_hashes:
+        clauses.append({"section_hash": {"$in": sorted(section_hashes)}})
+
+    metrics.increment("retrieval.coarse_to_fine")
+    logger.info(
+        "Coarse stage: searching %d document(s) and %d section(s) of %d.",
+        len(file_hashes), len(section_hashes), documents,
+    )
+    return {"$or": clauses}
@@ -0,0 +1,110 @@
+"""
+Tenant lifecycle — archive, restore and evict tenant partitions.
+"""
+from __future__ import annotations
+
+import logging
+
+from config import settings
+from app.domain.errors import InvalidRequest, UnknownTenant
+from app.domain.models import TenantInfo
+from app.infrastructure import tenants
+from app.infrastructure.vector_store import (
+    drop_tenant_collections,
+    drop_tenant_vector_index,
+    get_documents_collection,
+    get_vector_store,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def ensure_active(tenant_id: str) -> None:
+    """
+    Raise if the tenant has been archived.
+
+    Raises
+    ------
+    PermissionError
+        If the tenant is archived and must be restored first.
+    """
+    if tenants.is_archived(tenant_id):
+        raise PermissionError(f"Tenant '{tenant_id}' is archived.")
+
+
+def ensure_provisioned(tenant_id: str) -> None:
+    """
+    Raise unless the tenant exists, for tenants named by clients.
+
+    A new tenant costs a collection and an Atlas vector index, so only the
+    admin API creates them unless ``tenant_auto_provision`` is set.
+
+    Raises
+    ------
+    UnknownTenant
+        If the tenant has not been provisioned.
+    """
+    if settings.tenant_auto_provision or tenant_id == settings.default_tenant_id:
+        return
+    if tenants.get_tenant(tenant_id) is None:
+        raise UnknownTenant(f"Unknown tenant '{tenant_id}'.")
+
+
+def get_tenant_info(tenant_id: str) -> TenantInfo | None:
+    """Return status and size of a tenant, or None if it does not exist."""
+    record = tenants.get_tenant(tenant_id)
+    if record is None:
+        return None
+    return TenantInfo(
+        tenant_id=tenant_id,
+        status=record.get("status", "active"),
+        corpus_version=record.get("corpus_version", 0),
+        snapshot_version=record.get("snapshot_version", 0),
+        documents=get_documents_collection(tenant_id).estimated_document_count(),
+    )
+
+
+def provision_tenant(tenant_id: str) -> tuple[TenantInfo, bool]:
+    """
+    Create a tenant and its collection and vector index.
+
+    Waits until Atlas can query the index (up to a few minutes), so the
+    first upload does not. Returns the tenant and whether it was new.
+    """
+    created = tenants.create_tenant(tenant_id)
+    get_vector_store(tenant_id)
+    if created:
+        logger.info("Provisioned tenant '%s'.", tenant_id)
+    return get_tenant_info(tenant_id), created
+
+
+def archive_tenant(tenant_id: str) -> TenantInfo | None:
+    """
+    Take a tenant out of service while keeping its data.
+
+    Drops the tenant's vector index (freeing search memory) and its
+    in-process handle; queries and uploads are rejected until restored.
+    """
+    if tenants.set_status(tenant_id, "archived") is None:
+        return None
+    drop_tenant_vector_index(tenant_id)
+    logger.info("Archived tenant '%s'.", tenant_id)
+    return get_tenant_info(tenant_id)
+
+
+def restore_tenant(tenant_id: str) -> TenantInfo | None:
+    """Return an archived tenant to service; its index is rebuilt lazily."""
+    if tenants.set_status(tenant_id, "active") is None:
+        return None
+    logger.info("Restored tenant '%s'.", tenant_id)
+    return get_tenant_info(tenant_id)
+
+
+def evict_tenant(tenant_id: str) -> bool:
+    """Permanently delete a tenant's chunks, registry and record."""
+    if tenant_id == settings.default_tenant_id:
+        raise InvalidRequest("The default tenant cannot be evicted.")
+    existed = tenants.delete_tenant(tenant_id)
+    drop_tenant_collections(tenant_id)
+    logger.info("Evicted tenant '%s' (existed=%s).", tenant_id, existed)
+    return existed
@@ -0,0 +1,20 @@
+"""
+Domain errors — problems with a request that the caller can fix.
+"""
+from __future__ import annotations
+
+
+class InvalidRequest(ValueError):
+    """
+    A request that cannot be served as sent (bad tenant id, mismatched
+    snapshot, ...). The API returns the message with a 400; any other
+    exception is treated as a server error.
+    """
+
+
+class InvalidTenantId(InvalidRequest):
+    """A tenant id that is not allowed in collection names."""
+
+
+class UnknownTenant(InvalidRequest):
+    """A tenant that has not been provisioned; the API returns a 404."""
@@ -4,14 +4,34 @@ Used across every layer for type safety and serialization.
 """
 from __future__ import annotations
 
+from datetime import datetime
 from typing import Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 # ── Request / Response Models ────────────────────────────────────────
 
 
+class RetrievalFilter(BaseModel):
+    """Optional restrictions applied to vector search before scoring."""
+
+    file_hash: str | None = Field(default=None, description="Only search this document")
+    source: str | None = Field(default=None, description="Only search chunks from this source")
+    page_from: int | None = Field(default=None, ge=0, description="First page (inclusive)")
+    page_to: int | None = Field(default=None, ge=0, description="Last page (inclusive)")
+
+    @model_validator(mode="after")
+    def _check_page_range(self) -> RetrievalFilter:
+        if (
+            self.page_from is not None
+            and self.page_to is not None
+            and self.page_from > self.page_to
+        ):
+            raise ValueError("page_from must be <= page_to")
+        return self
+
+
 class QueryRequest(BaseModel):
     """Incoming question payload from the frontend."""
 
@@ -20,6 +40,15 @@ class QueryRequest(BaseModel):
         default="openai",
         description="LLM provider to use for generation",
     )
+    filters: RetrievalFilter | None = Field(
+        default=None,
+        description="Restrict retrieval to a document, source or page range",
+    )
+    session_id: str | None = Field(
+        default=None,
+        pattern=r"^[A-Za-z0-9_-]{1,64}$",
+        description="Chat session to continue; omit for a stateless question",
+    )
 
 
 class SourceDocument(BaseModel):
@@ -30,6 +59,15 @@ class SourceDocument(BaseModel):
     page: int | None = Field(default=None, description="Page number if PDF")
 
 
+class TokenUsage(BaseModel):
+    """Token accounting for a single generation call."""
+
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = Field(default=0, description="Prompt tokens served from the provider cache")
+    cache_write_tokens: int = Field(default=0, description="Prompt tokens written to the provider cache")
+
+
 class QueryResponse(BaseModel):
     """Answer payload returned to the frontend."""
 
@@ -37,6 +75,8 @@ class QueryResponse(BaseModel):
     provider: str
     model: str
     sources: list[SourceDocument] = Field(default_factory=list)
+    usage: TokenUsage | None = None
+    rewritten_question: str | None = None
 
 
 # ── Document Ingestion Models ────────────────────────────────────────
@@ -49,3 +89,47 @@ class DocumentUploadResponse(BaseModel):
     chunks_stored: int
     already_existed: bool = False
     message: str = ""
+    file_hash: str | None = None
+    chunks_unchanged: int = 0
+    chunks_removed: int = 0
+
+
+class DocumentInfo(BaseModel):
+    """Registry entry for one ingested document."""
+
+    file_hash: str
+    source: str
+    pages: int = 0
+    chunks: int = 0
+    summarized: bool = False
+    uploaded_at: datetime | None = None
+
+
+class DocumentListResponse(BaseModel):
+    """All documents currently in the store."""
+
+    documents: list[DocumentInfo] = Field(default_factory=list)
+
+
+# ── Tenant Models ────────────────────────────────────────────────────
+
+
+class TenantInfo(BaseModel):
+    """Status of a single tenant partition."""
+
+    tenant_id: str
+    status: Literal["active", "archived"] = "active"
+    corpus_version: int = 0
+    snapshot_version: int = 0
+    documents: int = 0
+
+
+class SnapshotInfo(BaseModel):
+    """Contents of an exported or imported corpus snapshot."""
+
+    tenant_id: str
+    base_version: int = 0   # 0 = full snapshot, else a delta since this version
+    version: int = 0        # source corpus version the snapshot brings a tenant to
+    chunks: int = 0
+    deleted: int = 0
+    documents: int = 0
@@ -0,0 +1,76 @@
+"""
+Conversation checkpoints — LangGraph state persisted in a local SQLite file.
+
+Each chat session is one LangGraph thread (``<tenant>:<session>``). Only
+the latest checkpoint of a thread is needed to continue the conversation,
+so older ones are pruned after every turn; the file then grows with the
+number of sessions, not with their length.
+"""
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Application types stored in graph state that may be restored from a checkpoint.
+_ALLOWED_STATE_TYPES = [("app.domain.models", "RetrievalFilter")]
+
+_checkpointer: SqliteSaver | None = None
+_lock = threading.Lock()
+
+
+def get_checkpointer() -> SqliteSaver:
+    """Return the shared ``SqliteSaver``, creating the database once."""
+    global _checkpointer  # noqa: PLW0603
+    with _lock:
+        if _checkpointer is None:
+            path = Path(settings.memory_db_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # One connection per worker; SqliteSaver serializes access to it
+            # and enables WAL so workers can share the file.
+            conn = sqlite3.connect(path, check_same_thread=False)
+            serde = JsonPlusSerializer(allowed_msgpack_modules=_ALLOWED_STATE_TYPES)
+            _checkpointer = SqliteSaver(conn, serde=serde)
+            _checkpointer.setup()
+            logger.info("Conversation memory stored in %s", path)
+    return _checkpointer
+
+
+def thread_id(tenant_id: str, session_id: str) -> str:
+    """LangGraph thread id for a tenant's chat session."""
+    return f"{tenant_id}:{session_id}"
+
+
+def thread_config(tenant_id: str, session_id: str) -> dict[str, Any]:
+    """Invocation config selecting a session's thread."""
+    return {"configurable": {"thread_id": thread_id(tenant_id, session_id)}}
+
+
+def prune_thread(tenant_id: str, session_id: str) -> None:
+    """Delete every checkpoint of a session except the latest."""
+    saver = get_checkpointer()
+    thread = thread_id(tenant_id, session_id)
+    latest = (
+        "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? "
+        "ORDER BY checkpoint_id DESC LIMIT 1"
+    )
+    with saver.lock, saver.conn:  # commits on exit
+        for table in ("writes", "checkpoints"):
+            saver.conn.execute(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_id NOT IN ({latest})",
+                (thread, thread),
+            )
+
+
+def delete_session(tenant_id: str, session_id: str) -> None:
+    """Forget a chat session entirely."""
+    get_checkpointer().delete_thread(thread_id(tenant_id, session_id))
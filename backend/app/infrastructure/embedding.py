@@ -4,23 +4,31 @@ Embedding provider — wraps OpenAI text-embedding-3-small.
 from __future__ import annotations
 
 import logging
+from functools import lru_cache
 
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
 
 from config import settings
 
 logger = logging.getLogger(__name__)
 
-_embeddings: OpenAIEmbeddings | None = None
+_embeddings: Embeddings | None = None
 
 
-def get_embeddings() -> OpenAIEmbeddings:
+def get_embeddings() -> Embeddings:
     """
     Return a singleton ``OpenAIEmbeddings`` instance.
 
     Using a singleton avoids rebuilding the HTTP client on every request.
+    With ``STUB_PROVIDERS`` set, returns offline stub embeddings instead.
     """
     global _embeddings  # noqa: PLW0603
+    if _embeddings is None and settings.stub_providers:
+        from app.infrastructure.stub_providers import StubEmbeddings
+
+        logger.warning("Using stub embeddings (STUB_PROVIDERS=true).")
+        _embeddings = StubEmbeddings()
     if _embeddings is None:
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY is required for embeddings.")
@@ -31,3 +39,18 @@ def get_embeddings() -> OpenAIEmbeddings:
             disallowed_special=(),
         )
     return _embeddings
+
+
+@lru_cache(maxsize=256)
+def _embed_query_cached(text: str) -> tuple[float, ...]:
+    return tuple(get_embeddings().embed_query(text))
+
+
+def embed_query(text: str) -> list[float]:
+    """
+    Embed a query, reusing recent results.
+
+    Coarse-to-fine retrieval searches twice with the same question, and
+    repeated questions are common; each saves an embeddings API call.
+    """
+    return list(_embed_query_cached(text))
@@ -21,6 +21,8 @@ def get_llm(
     *,
     temperature: float = 0,
     streaming: bool = False,
+    model: str | None = None,
+    timeout: float | None = None,
 ) -> BaseChatModel:
     """
     Instantiate and return a chat model for the requested provider.
@@ -33,6 +35,10 @@ def get_llm(
         Sampling temperature (0 = deterministic).
     streaming : bool
         Whether to enable token-by-token streaming.
+    model : str | None
+        Model name override; defaults to the provider's configured model.
+    timeout : float | None
+        Per-request HTTP timeout in seconds (client default if None).
 
     Returns
     -------
@@ -48,17 +54,24 @@ def get_llm(
     """
     provider = provider or settings.default_llm_provider
 
+    if settings.stub_providers and provider in ("openai", "anthropic"):
+        from app.infrastructure.stub_providers import StubChatModel
+
+        return StubChatModel(provider=provider, model_name=model or get_provider_info(provider)["model"])
+
     if provider == "openai":
         if not settings.openai_api_key:
             raise RuntimeError("OPENAI_API_KEY is not set in the environment.")
         from langchain_openai import ChatOpenAI
 
-        logger.info("Creating OpenAI model: %s", settings.default_openai_model)
+        model = model or settings.default_openai_model
+        logger.info("Creating OpenAI model: %s", model)
         return ChatOpenAI(
-            model=settings.default_openai_model,
+            model=model,
             api_key=settings.openai_api_key,
             temperature=temperature,
             streaming=streaming,
+            timeout=timeout,
         )
 
     if provider == "anthropic":
@@ -66,12 +79,14 @@ def get_llm(
             raise RuntimeError("ANTHROPIC_API_KEY is not set in the environment.")
         from langchain_anthropic import ChatAnthropic
 
-        logger.info("Creating Anthropic model: %s", settings.default_anthropic_model)
+        model = model or settings.default_anthropic_model
+        logger.info("Creating Anthropic model: %s", model)
         return ChatAnthropic(
-            model=settings.default_anthropic_model,
+            model=model,
             api_key=settings.anthropic_api_key,
             temperature=temperature,
             streaming=streaming,
+            timeout=timeout,
         )
 
     raise ValueError(
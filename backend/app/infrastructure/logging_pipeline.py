@@ -0,0 +1,188 @@
+"""
+Non-blocking structured logging.
+
+Request threads never touch the log sink: records are filtered, tagged
+with the request's correlation id and put on a bounded in-memory queue;
+a ``QueueListener`` thread formats them (JSON lines by default) and
+writes them to stdout. If the sink falls behind and the queue fills up,
+records are dropped instead of blocking, and counted in the
+``logging.dropped`` metric.
+
+High-volume INFO (and DEBUG) records can be sampled with
+``LOG_INFO_SAMPLE_RATE``. Sampling is decided per request id, so a
+sampled request keeps all of its lines; warnings and errors are always
+kept.
+
+The listener thread belongs to one process. A forked gunicorn worker
+(``--preload`` configures logging in the master) starts its own, with a
+fresh queue, on its first log record.
+"""
+from __future__ import annotations
+
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import zlib
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from config import settings
+from app.infrastructure import metrics
+
+# Correlation id of the request being handled ("-" outside requests).
+request_id_var: contextvars.ContextVar[str] = contextvars.ContextVar("request_id", default="-")
+
+_plain = logging.Formatter()
+_TEXT_FORMAT = "%(asctime)s  %(name)-30s  %(levelname)-7s  [%(request_id)s]  %(message)s"
+
+_handler: BoundedQueueHandler | None = None
+_sink: logging.Handler | None = None
+
+# Process that owns the running listener; gunicorn workers each start their own.
+_listener: QueueListener | None = None
+_listener_pid: int | None = None
+_listener_lock = threading.Lock()
+
+
+class RequestContextFilter(logging.Filter):
+    """Tag records with the current request id (runs on the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a fraction of INFO/DEBUG records, decided per request."""
+
+    def __init__(self, rate: float) -> None:
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        key = getattr(record, "request_id", "-")
+        if key == "-":
+            key = f"{record.name}:{record.lineno}:{record.created}"
+        # crc32 is stable across workers, unlike hash().
+        return zlib.crc32(key.encode()) % 10_000 < self.rate * 10_000
+
+
+class BoundedQueueHandler(QueueHandler):
+    """``QueueHandler`` that drops (and counts) records when the queue is full."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args and render the traceback now: arguments may change
+        # before the listener gets to the record, and tracebacks keep
+        # frames alive.
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _plain.formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if _listener_pid != os.getpid():
+            _start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.increment("logging.dropped")
+
+
+class _DrainingListener(QueueListener):
+    """``QueueListener`` whose ``stop`` waits briefly for room in a full queue."""
+
+    def start(self) -> None:
+        self._pid = os.getpid()
+        super().start()
+
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel, timeout=5)
+
+    def stop(self) -> None:
+        # Forked children inherit the parent's atexit hook but not its thread.
+        if self._thread is None or self._pid != os.getpid():
+            return
+        try:
+            super().stop()
+        except queue.Full:  # the sink is stuck; give up on the backlog
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def _start_listener() -> None:
+    """Start this process's listener thread on a fresh queue."""
+    global _listener, _listener_pid  # noqa: PLW0603
+    with _listener_lock:
+        if _listener_pid == os.getpid() or _handler is None:
+            return
+        # Records queued before a fork belong to the parent's listener.
+        records: queue.Queue[logging.LogRecord] = queue.Queue(maxsize=settings.log_queue_size)
+        _handler.queue = records
+        _listener = _DrainingListener(records, _sink)
+        _listener.start()
+        _listener_pid = os.getpid()
+        # Flush what is still queued when the process exits.
+        atexit.register(_listener.stop)
+
+
+def _reset_after_fork() -> None:
+    global _listener_lock  # noqa: PLW0603
+    # Another thread may have held the lock at the moment of the fork.
+    _listener_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def configure_logging() -> None:
+    """
+    Route the root logger through the queue pipeline.
+
+    Safe to call repeatedly; the listener thread is (re)started lazily in
+    each process that logs.
+    """
+    global _handler, _sink  # noqa: PLW0603
+    if _handler is None:
+        _sink = logging.StreamHandler(sys.stdout)
+        if settings.log_format == "json":
+            _sink.setFormatter(JsonFormatter())
+        else:
+            _sink.setFormatter(logging.Formatter(_TEXT_FORMAT))
+
+        _handler = BoundedQueueHandler(queue.Queue(maxsize=settings.log_queue_size))
+        _handler.addFilter(RequestContextFilter())
+        _handler.addFilter(SamplingFilter(settings.log_info_sample_rate))
+
+        root = logging.getLogger()
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(_handler)
+        root.setLevel(settings.log_level.upper())
+    _start_listener()
@@ -0,0 +1,39 @@
+"""
+In-process request metrics.
+
+Counters live in worker memory (one set per gunicorn worker) and are
+exposed read-only to admins via ``GET /api/metrics``. Good enough for spotting
+trends without running a separate metrics backend.
+"""
+from __future__ import annotations
+
+import threading
+from collections import defaultdict
+
+# Thread-safe storage: { metric_name: value }
+_counters: dict[str, float] = defaultdict(float)
+_lock = threading.Lock()
+
+
+def increment(name: str, value: float = 1) -> None:
+    """Add ``value`` to the counter called ``name``."""
+    with _lock:
+        _counters[name] += value
+
+
+def record_token_usage(provider: str, usage: dict[str, int]) -> None:
+    """
+    Accumulate per-provider token counts for a single LLM call.
+
+    ``usage`` uses the keys of ``TokenUsage`` (input/output/cache tokens).
+    """
+    with _lock:
+        _counters[f"llm.{provider}.requests"] += 1
+        for key, value in usage.items():
+            _counters[f"llm.{provider}.{key}"] += value
+
+
+def snapshot() -> dict[str, float]:
+    """Return a copy of all counters."""
+    with _lock:
+        return dict(_counters)
@@ -45,6 +45,17 @@ def compute_file_hash(file_path: str | Path) -> str:
     return md5(path.read_bytes()).hexdigest()
 
 
+def compute_text_hash(text: str) -> str:
+    """Return the MD5 hex digest of a text string."""
+    return md5(text.encode("utf-8")).hexdigest()
+
+
+def tag_chunk_hashes(chunks: list[Document]) -> None:
+    """Store each chunk's content hash in ``metadata["chunk_hash"]``."""
+    for chunk in chunks:
+        chunk.metadata["chunk_hash"] = compute_text_hash(chunk.page_content)
+
+
 def chunk_documents(
     documents: list[Document],
     *,
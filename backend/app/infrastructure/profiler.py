@@ -0,0 +1,175 @@
+"""
+Profiling for live workers.
+
+Two tools, both admin-only (see ``routes``):
+
+``start_sampling``          samples every thread's stack with
+                            ``sys._current_frames`` from a background
+                            thread for a few seconds and writes collapsed
+                            stacks (``flamegraph.pl`` / speedscope input).
+                            Stacks waiting on sockets or locks show up too,
+                            so time spent blocked is visible.
+``start_request_profile``   deterministic ``cProfile`` of one request,
+                            written as a ``.prof`` file for ``pstats`` /
+                            snakeviz.
+
+Gunicorn's sync workers serve one request at a time, so sampling runs in
+its own thread and the worker keeps serving while it is sampled. Results
+go to ``profile_dir`` on the host, where any worker can serve them. Each
+worker runs at most one sampling session and one request profile at a
+time, and request profiles are rate-limited.
+"""
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from types import FrameType
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Deeper stacks are cut at the root end; the leaf frames matter most.
+_MAX_DEPTH = 128
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_.-]")
+
+_sampling_lock = threading.Lock()
+_request_lock = threading.Lock()
+_last_request_profile = 0.0
+
+
+def profile_dir() -> Path:
+    path = Path(settings.profile_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _output_name(kind: str, suffix: str, label: str = "") -> str:
+    stamp = time.strftime("%Y%m%dT%H%M%S")
+    label = f"-{_UNSAFE_CHARS.sub('_', label)}" if label else ""
+    return f"{kind}-{stamp}-{os.getpid()}{label}{suffix}"
+
+
+def _prune_outputs() -> None:
+    """Keep only the newest ``profile_keep`` files."""
+    files = sorted(profile_dir().iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+    for stale in files[settings.profile_keep:]:
+        stale.unlink(missing_ok=True)
+
+
+def list_outputs() -> list[dict[str, object]]:
+    """Return the available profile files, newest first."""
+    files = sorted(profile_dir().iterdir(), key=lambda p: p.stat().st_mtime, reverse=True)
+    return [{"name": p.name, "bytes": p.stat().st_size} for p in files if p.is_file()]
+
+
+# ── Sampling ─────────────────────────────────────────────────────────
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", Path(code.co_filename).stem)
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _collapse(frame: FrameType | None, thread_name: str) -> str:
+    """Render a stack root-first as ``thread;module:func;...``."""
+    labels = []
+    while frame is not None and len(labels) < _MAX_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+def sample_stacks(seconds: float, interval: float) -> Counter[str]:
+    """Sample all other threads' stacks every ``interval`` seconds."""
+    me = threading.get_ident()
+    names: dict[int, str] = {}
+    counts: Counter[str] = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():  # noqa: SLF001
+            if ident == me:
+                continue
+            if ident not in names:
+                names = {t.ident: t.name for t in threading.enumerate() if t.ident}
+            counts[_collapse(frame, names.get(ident, f"thread-{ident}"))] += 1
+        time.sleep(interval)
+    return counts
+
+
+def _run_sampling(seconds: float, name: str) -> None:
+    try:
+        counts = sample_stacks(seconds, settings.profile_interval_ms / 1000)
+        path = profile_dir() / name
+        path.write_text("".join(f"{stack} {count}\n" for stack, count in counts.most_common()))
+        _prune_outputs()
+        logger.info("Wrote %d samples (%d distinct stacks) to %s.", counts.total(), len(counts), path)
+    except Exception:
+        logger.warning("Sampling profile failed.", exc_info=True)
+    finally:
+        _sampling_lock.release()
+
+
+def start_sampling(seconds: float) -> tuple[str, float] | None:
+    """
+    Sample this worker for ``seconds`` (capped) in a background thread.
+
+    Returns ``(file name, seconds)``; the file appears when sampling ends.
+    Returns None if a session is already running in this worker.
+    """
+    if not _sampling_lock.acquire(blocking=False):
+        return None
+    seconds = min(max(seconds, 1.0), settings.profile_max_seconds)
+    name = _output_name("sample", ".collapsed")
+    thread = threading.Thread(target=_run_sampling, args=(seconds, name), name="profiler", daemon=True)
+    thread.start()
+    return name, seconds
+
+
+# ── Per-request cProfile ─────────────────────────────────────────────
+
+
+def start_request_profile() -> cProfile.Profile | None:
+    """
+    Start profiling the current request.
+
+    Returns None (the request runs unprofiled) if another request is
+    being profiled or one was profiled less than
+    ``profile_request_min_interval`` seconds ago.
+    """
+    global _last_request_profile  # noqa: PLW0603
+    if not _request_lock.acquire(blocking=False):
+        return None
+    now = time.monotonic()
+    if now - _last_request_profile < settings.profile_request_min_interval:
+        _request_lock.release()
+        return None
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:  # another profiler (e.g. a debugger) is active
+        _request_lock.release()
+        return None
+    _last_request_profile = now
+    return profiler
+
+
+def finish_request_profile(profiler: cProfile.Profile, label: str) -> str:
+    """Stop ``profiler``, write its stats and return the file name."""
+    try:
+        profiler.disable()
+        name = _output_name("request", ".prof", label)
+        profiler.dump_stats(profile_dir() / name)
+        _prune_outputs()
+        return name
+    finally:
+        _request_lock.release()
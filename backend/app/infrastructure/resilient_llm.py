@@ -0,0 +1,248 @@
+"""
+Resilient generation — hedged requests, failover and circuit breaking.
+
+``invoke_with_failover`` calls the requested provider and, if it has not
+answered within its recent latency percentile, sends the same request to
+the other configured provider. The first successful answer wins and the
+loser's HTTP request is cancelled. Providers that keep failing are taken
+out of rotation by a circuit breaker for a cool-down period.
+
+All state is per worker process, like the rate limiter. Calls run on one
+long-lived event loop per process, in a background thread: the provider
+SDKs cache their async HTTP clients, and a client cannot be used from a
+different loop than the one it was first used on.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Literal
+
+from langchain_core.messages import BaseMessage
+
+from config import settings
+from app.infrastructure import metrics
+from app.infrastructure.llm_factory import get_llm
+
+logger = logging.getLogger(__name__)
+
+Provider = Literal["openai", "anthropic"]
+
+# Builds (messages, invoke kwargs) for a provider; prompts differ per provider.
+RequestBuilder = Callable[[str], tuple[list[BaseMessage], dict[str, Any]]]
+
+_PROVIDERS: tuple[Provider, ...] = ("openai", "anthropic")
+
+# Latency samples kept per provider, and the minimum before trusting them.
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES = 20
+
+
+class ProviderUnavailable(RuntimeError):
+    """Raised when a provider is tripped or at its concurrency limit."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed → (N failures) → open → (cool-down) → half-open: one trial call
+    is let through; success closes the circuit, failure re-opens it.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < settings.llm_breaker_cooldown:
+                return False
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= settings.llm_breaker_failures:
+                if self._opened_at is None:
+                    logger.warning("Circuit opened for LLM provider '%s'.", self.name)
+                    metrics.increment(f"llm.{self.name}.circuit_opened")
+                self._opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Forget a half-open trial that was cancelled before finishing."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Sliding window of successful call latencies."""
+
+    def __init__(self) -> None:
+        self._samples: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait on this provider before sending a hedge request."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < _MIN_SAMPLES:
+            return settings.llm_hedge_initial_delay
+        index = min(len(samples) - 1, int(len(samples) * settings.llm_hedge_percentile / 100))
+        return max(settings.llm_hedge_min_delay, samples[index])
+
+
+_breakers = {p: CircuitBreaker(p) for p in _PROVIDERS}
+_latency = {p: LatencyTracker() for p in _PROVIDERS}
+_limits = {p: threading.BoundedSemaphore(settings.llm_max_concurrency) for p in _PROVIDERS}
+
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+_loop_lock = threading.Lock()
+
+
+def _event_loop() -> asyncio.AbstractEventLoop:
+    """Return this process's generation event loop, starting it on first use."""
+    global _loop, _loop_pid  # noqa: PLW0603
+    with _loop_lock:
+        # Threads do not survive gunicorn's fork; each worker starts its own.
+        if _loop is None or _loop_pid != os.getpid():
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-event-loop", daemon=True).start()
+            _loop_pid = os.getpid()
+        return _loop
+
+
+def _is_configured(provider: str) -> bool:
+    return bool(settings.openai_api_key if provider == "openai" else settings.anthropic_api_key)
+
+
+def _candidate_order(primary: str) -> list[str]:
+    """Providers to try: the requested one first, then the configured fallback."""
+    order = [primary]
+    if settings.llm_failover_enabled:
+        order += [p for p in _PROVIDERS if p != primary and _is_configured(p)]
+    return order
+
+
+async def _attempt(provider: str, build: RequestBuilder) -> BaseMessage:
+    """One guarded call: breaker check, concurrency slot, timeout, bookkeeping."""
+    breaker = _breakers[provider]
+    if not breaker.allow():
+        raise ProviderUnavailable(f"LLM provider '{provider}' is temporarily disabled.")
+    if not _limits[provider].acquire(blocking=False):
+        breaker.release_trial()
+        metrics.increment(f"llm.{provider}.rejected_busy")
+        raise ProviderUnavailable(f"LLM provider '{provider}' is at its concurrency limit.")
+
+    started = time.monotonic()
+    try:
+        messages, kwargs = build(provider)
+        llm = get_llm(provider)
+        message = await asyncio.wait_for(
+            llm.ainvoke(messages, **kwargs),
+            timeout=settings.llm_timeout_seconds,
+        )
+    except asyncio.CancelledError:
+        breaker.release_trial()
+        raise
+    except Exception:
+        breaker.record_failure()
+        metrics.increment(f"llm.{provider}.failures")
+        raise
+    else:
+        breaker.record_success()
+        _latency[provider].record(time.monotonic() - started)
+        return message
+    finally:
+        _limits[provider].release()
+
+
+async def _hedged(primary: str, build: RequestBuilder) -> tuple[BaseMessage, str]:
+    backups = _candidate_order(primary)
+    tasks: dict[asyncio.Task, str] = {}
+    errors: list[str] = []
+
+    def launch() -> None:
+        provider = backups.pop(0)
+        tasks[asyncio.ensure_future(_attempt(provider, build))] = provider
+
+    launch()
+    hedge_delay = _latency[primary].hedge_delay()
+    pending = set(tasks)
+
+    while True:
+        done, pending = await asyncio.wait(
+            pending,
+            timeout=hedge_delay if backups else None,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+        for task in done:
+            provider = tasks[task]
+            if task.exception() is None:
+                for loser in pending:
+                    loser.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                if provider != primary:
+                    metrics.increment(f"llm.{provider}.answered_as_backup")
+                return task.result(), provider
+            errors.append(f"{provider}: {task.exception()}")
+            logger.warning("LLM provider '%s' failed: %s", provider, task.exception())
+
+        if backups and (not done or not pending):
+            # Either the primary is slower than usual (hedge) or everything
+            # in flight has failed (failover).
+            metrics.increment("llm.hedged" if not done else "llm.failover")
+            launch()
+            pending = {t for t in tasks if not t.done()}
+        elif not pending:
+            raise RuntimeError("All LLM providers failed: " + "; ".join(errors))
+
+
+def invoke_with_failover(primary: str, build: RequestBuilder) -> tuple[BaseMessage, str]:
+    """
+    Generate with ``primary``, hedging / failing over to the other provider.
+
+    Parameters
+    ----------
+    primary : str
+        Provider requested by the caller.
+    build : callable
+        ``build(provider) -> (messages, invoke_kwargs)``.
+
+    Returns
+    -------
+    (message, provider)
+        The winning response and the provider that produced it.
+
+    Raises
+    ------
+    RuntimeError
+        If every candidate provider failed or was unavailable.
+    """
+    # The caller's context (e.g. the request id) carries over to the loop.
+    return asyncio.run_coroutine_threadsafe(_hedged(primary, build), _event_loop()).result()
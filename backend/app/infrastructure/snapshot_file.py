@@ -0,0 +1,170 @@
+"""
+Corpus snapshot file format.
+
+A snapshot holds one tenant's chunks, their vectors and the document
+registry, either in full or as a delta since a corpus version::
+
+    offset 0      magic  b"SNSNAP\\x00\\x01"
+           8      uint32 header length, then the JSON header
+    4096          vector block: float32 little-endian, one row per chunk
+    records       BSON chunk documents (row i ↔ chunk i), without vectors
+    deleted       BSON ``{_id}`` documents for chunks deleted in the delta
+    documents     BSON document registry records (always complete)
+
+The vector block is page-aligned so readers can ``np.memmap`` it instead
+of parsing it. The header is written last, so an interrupted export never
+leaves a file with valid magic behind.
+"""
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import struct
+import tempfile
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterator
+
+import bson
+import numpy as np
+
+from app.domain.errors import InvalidRequest
+
+MAGIC = b"SNSNAP\x00\x01"
+FORMAT_VERSION = 1
+
+# Space reserved for magic + header; also the vector block offset.
+HEADER_BYTES = 4096
+_LENGTH = struct.Struct("<I")
+
+
+def _align(offset: int, alignment: int = 8) -> int:
+    return -(-offset // alignment) * alignment
+
+
+class SnapshotWriter:
+    """
+    Stream a snapshot to ``path``.
+
+    Chunks are added one at a time (vectors go straight to the vector
+    block, records to a spool file), so memory stays flat however large
+    the corpus is. Deleted ids and registry records are small and kept
+    in memory until ``close``.
+    """
+
+    def __init__(self, path: str | Path, dimensions: int, header: dict[str, Any]) -> None:
+        self.path = Path(path)
+        self.dimensions = dimensions
+        self.header = header
+        self.chunks = 0
+        self._deleted: list[Any] = []
+        self._documents: list[dict[str, Any]] = []
+        self._tmp_path = self.path.with_name(self.path.name + ".tmp")
+        self._file = open(self._tmp_path, "wb")  # noqa: SIM115 — closed in close()
+        self._file.seek(HEADER_BYTES)
+        self._records = tempfile.TemporaryFile()
+
+    def add_chunk(self, chunk: dict[str, Any], vector: np.ndarray) -> None:
+        if len(vector) != self.dimensions:
+            raise ValueError(
+                f"Chunk {chunk.get('_id')} has a {len(vector)}-d vector; "
+                f"the snapshot is {self.dimensions}-d."
+            )
+        self._file.write(np.asarray(vector, dtype="<f4").tobytes())
+        self._records.write(bson.encode(chunk))
+        self.chunks += 1
+
+    def add_deleted(self, ids: list[Any]) -> None:
+        self._deleted.extend(ids)
+
+    def add_documents(self, records: list[dict[str, Any]]) -> None:
+        self._documents.extend(records)
+
+    def close(self) -> dict[str, Any]:
+        """Finish the file and return its header."""
+        records_offset = _align(self._file.tell())
+        self._file.seek(records_offset)
+        self._records.seek(0)
+        shutil.copyfileobj(self._records, self._file)
+        self._records.close()
+
+        deleted_offset = self._file.tell()
+        for _id in self._deleted:
+            self._file.write(bson.encode({"_id": _id}))
+        documents_offset = self._file.tell()
+        for record in self._documents:
+            self._file.write(bson.encode(record))
+
+        header = {
+            **self.header,
+            "format": FORMAT_VERSION,
+            "dimensions": self.dimensions,
+            "chunks": self.chunks,
+            "deleted": len(self._deleted),
+            "documents": len(self._documents),
+            "vectors_offset": HEADER_BYTES,
+            "records_offset": records_offset,
+            "deleted_offset": deleted_offset,
+            "documents_offset": documents_offset,
+        }
+        encoded = json.dumps(header).encode()
+        if len(MAGIC) + _LENGTH.size + len(encoded) > HEADER_BYTES:
+            raise ValueError("Snapshot header is too large.")
+        self._file.seek(0)
+        self._file.write(MAGIC + _LENGTH.pack(len(encoded)) + encoded)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return header
+
+    def abort(self) -> None:
+        """Discard a partially written snapshot."""
+        self._records.close()
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+class SnapshotReader:
+    """Read a snapshot written by ``SnapshotWriter``."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as file:
+            prefix = file.read(len(MAGIC) + _LENGTH.size)
+            if len(prefix) < len(MAGIC) + _LENGTH.size or prefix[: len(MAGIC)] != MAGIC:
+                raise InvalidRequest(f"{self.path.name} is not a corpus snapshot.")
+            (length,) = _LENGTH.unpack(prefix[len(MAGIC):])
+            self.header: dict[str, Any] = json.loads(file.read(length))
+        if self.header.get("format") != FORMAT_VERSION:
+            raise InvalidRequest(f"Unsupported snapshot format: {self.header.get('format')!r}.")
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """Memory-mapped ``(chunks, dimensions)`` float32 vector block."""
+        if not self.header["chunks"]:
+            return np.empty((0, self.header["dimensions"]), dtype="<f4")
+        return np.memmap(
+            self.path, dtype="<f4", mode="r",
+            offset=self.header["vectors_offset"],
+            shape=(self.header["chunks"], self.header["dimensions"]),
+        )
+
+    def _records(self, offset_key: str, count_key: str) -> Iterator[dict[str, Any]]:
+        with open(self.path, "rb") as file:
+            file.seek(self.header[offset_key])
+            yield from islice(bson.decode_file_iter(file), self.header[count_key])
+
+    def iter_chunk_batches(self, batch_size: int) -> Iterator[tuple[list[dict[str, Any]], np.ndarray]]:
+        """Yield ``(chunks, vectors)`` batches in file order."""
+        vectors = self.vectors
+        records = self._records("records_offset", "chunks")
+        start = 0
+        while batch := list(islice(records, batch_size)):
+            yield batch, vectors[start:start + len(batch)]
+            start += len(batch)
+
+    def deleted_ids(self) -> list[Any]:
+        return [record["_id"] for record in self._records("deleted_offset", "deleted")]
+
+    def documents(self) -> list[dict[str, Any]]:
+        return list(self._records("documents_offset", "documents"))
@@ -0,0 +1,82 @@
+"""
+Stub LLM and embedding providers for load tests.
+
+With ``STUB_PROVIDERS=true`` every chat model and the embeddings client
+are replaced by these offline fakes, so captured traffic can be replayed
+at full volume (see ``benchmarks/replay_traffic.py``) without paying for
+or being throttled by the real APIs. Each call sleeps for a configurable,
+jittered latency to mimic the provider's share of request time.
+Everything else — MongoDB, retrieval, the graph, the rate limiter — runs
+for real.
+"""
+from __future__ import annotations
+
+import hashlib
+import random
+import time
+from typing import Any
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from config import settings
+
+# Rough characters per token, for plausible usage numbers.
+_CHARS_PER_TOKEN = 4
+
+
+def _sleep_ms(mean_ms: float) -> None:
+    """Sleep for ``mean_ms`` ± 50%."""
+    if mean_ms > 0:
+        time.sleep(mean_ms * random.uniform(0.5, 1.5) / 1000)
+
+
+class StubChatModel(BaseChatModel):
+    """Chat model that waits, then answers with a fixed-size canned reply."""
+
+    provider: str = "stub"
+    model_name: str = "stub"
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: list[str] | None = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        _sleep_ms(settings.stub_llm_latency_ms)
+        prompt_chars = sum(len(str(message.content)) for message in messages)
+        reply = f"Stub answer from {self.provider}/{self.model_name}. " * 8
+        message = AIMessage(
+            content=reply.strip(),
+            usage_metadata={
+                "input_tokens": prompt_chars // _CHARS_PER_TOKEN,
+                "output_tokens": len(reply) // _CHARS_PER_TOKEN,
+                "total_tokens": (prompt_chars + len(reply)) // _CHARS_PER_TOKEN,
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class StubEmbeddings(Embeddings):
+    """Deterministic unit vectors derived from a hash of the text."""
+
+    def _vector(self, text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(settings.embedding_dimensions)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        _sleep_ms(settings.stub_embedding_latency_ms)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        _sleep_ms(settings.stub_embedding_latency_ms)
+        return self._vector(text)
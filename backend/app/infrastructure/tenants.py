@@ -0,0 +1,189 @@
+"""
+Tenant registry — status and corpus version per tenant.
+
+Each tenant's chunks live in their own collection (see ``vector_store``).
+This module tracks the small per-tenant record stored in the Tenants
+collection:
+
+    { _id: tenant_id, status: "active" | "archived", corpus_version: int,
+      snapshot_version: int, stubs_expired_version: int, created_at, updated_at }
+
+``corpus_version`` is bumped on every write to the tenant's corpus, so
+anything cached per tenant can be keyed on it and invalidated for free.
+``snapshot_version`` is the source corpus version of the last snapshot
+imported into the tenant (see ``snapshot_service``);
+``stubs_expired_version`` is the newest deletion whose stub has expired,
+so deltas from before it cannot be exported.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any
+
+from pymongo import ReturnDocument
+from pymongo.collection import Collection
+
+from config import settings
+from app.domain.errors import InvalidTenantId
+from app.infrastructure.vector_store import get_database
+
+# Tenant ids end up in collection names, so keep them conservative.
+_TENANT_ID_RE = re.compile(r"^[A-Za-z0-9_-]{1,48}$")
+
+# Thread-safe storage: { tenant_id: (fetched_at, record | None) }
+_cache: dict[str, tuple[float, dict[str, Any] | None]] = {}
+_lock = threading.Lock()
+
+
+def normalize_tenant_id(tenant_id: str | None) -> str:
+    """
+    Validate a tenant id, falling back to the default tenant.
+
+    Raises
+    ------
+    InvalidTenantId
+        If the id contains characters not allowed in collection names.
+    """
+    tenant_id = (tenant_id or "").strip() or settings.default_tenant_id
+    if not _TENANT_ID_RE.match(tenant_id):
+        raise InvalidTenantId(
+            "Invalid tenant id: use 1-48 letters, digits, '-' or '_'."
+        )
+    return tenant_id
+
+
+def _collection() -> Collection:
+    return get_database()[settings.mongo_tenants_collection_name]
+
+
+def _remember(tenant_id: str, record: dict[str, Any] | None) -> None:
+    with _lock:
+        _cache[tenant_id] = (time.monotonic(), record)
+
+
+def get_tenant(tenant_id: str, *, refresh: bool = False) -> dict[str, Any] | None:
+    """Return the tenant record, served from a short-lived local cache."""
+    with _lock:
+        cached = _cache.get(tenant_id)
+    if not refresh and cached and time.monotonic() - cached[0] < settings.tenant_cache_ttl:
+        return cached[1]
+
+    record = _collection().find_one({"_id": tenant_id})
+    _remember(tenant_id, record)
+    return record
+
+
+def is_archived(tenant_id: str) -> bool:
+    """True if the tenant exists and has been archived."""
+    record = get_tenant(tenant_id)
+    return bool(record and record.get("status") == "archived")
+
+
+def has_corpus(tenant_id: str) -> bool:
+    """
+    True if the tenant may have chunks to search.
+
+    The default tenant predates the registry, so it is always searched.
+    """
+    if tenant_id == settings.default_tenant_id:
+        return True
+    record = get_tenant(tenant_id)
+    return bool(record and record.get("corpus_version", 0) > 0)
+
+
+def get_corpus_version(tenant_id: str) -> int:
+    """Return the tenant's current corpus version (0 if never written)."""
+    record = get_tenant(tenant_id)
+    return int(record.get("corpus_version", 0)) if record else 0
+
+
+def bump_corpus_version(tenant_id: str) -> int:
+    """Atomically increment and return the tenant's corpus version."""
+    now = datetime.now(timezone.utc)
+    record = _collection().find_one_and_update(
+        {"_id": tenant_id},
+        {
+            "$inc": {"corpus_version": 1},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"status": "active", "created_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _remember(tenant_id, record)
+    return int(record["corpus_version"])
+
+
+def record_snapshot_import(tenant_id: str, version: int) -> dict[str, Any]:
+    """Store the source version of an imported snapshot and bump the corpus version."""
+    now = datetime.now(timezone.utc)
+    record = _collection().find_one_and_update(
+        {"_id": tenant_id},
+        {
+            "$inc": {"corpus_version": 1},
+            "$max": {"snapshot_version": version},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"status": "active", "created_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _remember(tenant_id, record)
+    return record
+
+
+def record_stub_expiry(tenant_id: str, version: int) -> None:
+    """Raise the tenant's ``stubs_expired_version`` to at least ``version``."""
+    now = datetime.now(timezone.utc)
+    record = _collection().find_one_and_update(
+        {"_id": tenant_id},
+        {
+            "$max": {"stubs_expired_version": version},
+            "$set": {"updated_at": now},
+            "$setOnInsert": {"status": "active", "created_at": now},
+        },
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    _remember(tenant_id, record)
+
+
+def create_tenant(tenant_id: str) -> bool:
+    """Insert an active tenant record; returns False if it already existed."""
+    now = datetime.now(timezone.utc)
+    result = _collection().update_one(
+        {"_id": tenant_id},
+        {"$setOnInsert": {"status": "active", "corpus_version": 0, "created_at": now, "updated_at": now}},
+        upsert=True,
+    )
+    get_tenant(tenant_id, refresh=True)
+    return result.upserted_id is not None
+
+
+def set_status(tenant_id: str, status: str) -> dict[str, Any] | None:
+    """Set a tenant's status; returns the updated record or None if unknown."""
+    record = _collection().find_one_and_update(
+        {"_id": tenant_id},
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc)}},
+        return_document=ReturnDocument.AFTER,
+    )
+    _remember(tenant_id, record)
+    return record
+
+
+def delete_tenant(tenant_id: str) -> bool:
+    """Remove the tenant record; returns True if it existed."""
+    result = _collection().delete_one({"_id": tenant_id})
+    _remember(tenant_id, None)
+    return result.deleted_count > 0
+
+
+def list_tenant_ids(*, include_archived: bool = False) -> list[str]:
+    """Return known tenant ids; the default tenant is always included."""
+    query = {} if include_archived else {"status": {"$ne": "archived"}}
+    ids = {record["_id"] for record in _collection().find(query, {"_id": 1})}
+    ids.add(settings.default_tenant_id)
+    return sorted(ids)
@@ -0,0 +1,129 @@
+"""
+Embedding storage encodings.
+
+``array``    BSON array of doubles (langchain-mongodb default; ~13 B/dim
+             because every element also stores its index as a key)
+``float32``  BSON vector binary, float32       (4 B/dim, lossless for OpenAI output)
+``int8``     BSON vector binary, int8 scalar-quantized (1 B/dim) for the
+             indexed field, plus a float16 copy (2 B/dim, not indexed) used
+             to rescore the top candidates
+
+Atlas Vector Search indexes ``float32`` and ``int8`` vector binaries
+directly. Quantization scales each vector by its own max-abs value; that
+preserves cosine similarity up to rounding, so no global calibration is
+needed.
+
+Reduced-dimension search: ``text-embedding-3-*`` vectors are trained so
+that a renormalized prefix is itself a usable embedding. With
+``search_dimensions`` set, chunks also get ``embedding_<dims>`` — the
+truncated vector, in the same encoding — which is what the vector index
+covers. The full vector stays in ``embedding`` (or the float16 copy) and
+is only read to rescore the ``fetch_k`` candidates.
+"""
+from __future__ import annotations
+
+from typing import Any, Literal
+
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype
+
+VectorEncoding = Literal["array", "float32", "int8"]
+
+# Field holding the float16 rescoring copy in ``int8`` mode.
+RESCORE_FIELD = "embedding_f16"
+
+# BSON vector binaries start with a dtype byte and a padding byte.
+_VECTOR_HEADER_BYTES = 2
+
+
+def quantize_int8(vector: np.ndarray) -> np.ndarray:
+    """Scale a vector into [-127, 127] by its max-abs value and round."""
+    peak = float(np.max(np.abs(vector))) or 1.0
+    return np.round(vector * (127.0 / peak)).astype(np.int8)
+
+
+def search_vector_field(dimensions: int) -> str:
+    """Name of the indexed vector field; 0 dimensions means the full vector."""
+    return f"embedding_{dimensions}" if dimensions else "embedding"
+
+
+def truncate_vector(vector: list[float] | np.ndarray, dimensions: int) -> np.ndarray:
+    """Keep the first ``dimensions`` components and renormalize to unit length."""
+    prefix = np.asarray(vector, dtype=np.float32)[:dimensions]
+    norm = float(np.linalg.norm(prefix)) or 1.0
+    return prefix / norm
+
+
+def _encode_value(array: np.ndarray, encoding: VectorEncoding) -> Any:
+    """Encode one vector value (no rescoring copy)."""
+    if encoding == "array":
+        return array.tolist()
+    if encoding == "float32":
+        return Binary.from_vector(array.tolist(), BinaryVectorDtype.FLOAT32)
+    if encoding == "int8":
+        return Binary.from_vector(quantize_int8(array).tolist(), BinaryVectorDtype.INT8)
+    raise ValueError(f"Unknown vector encoding: '{encoding}'.")
+
+
+def encode_query(
+    vector: list[float],
+    encoding: VectorEncoding,
+    dimensions: int = 0,
+) -> Any:
+    """Encode a query vector to match the type and size of the indexed field."""
+    array = truncate_vector(vector, dimensions) if dimensions else np.asarray(vector, dtype=np.float32)
+    if encoding == "int8":
+        return Binary.from_vector(quantize_int8(array).tolist(), BinaryVectorDtype.INT8)
+    return array.tolist()
+
+
+def encode_vector(
+    vector: list[float],
+    encoding: VectorEncoding,
+    field: str = "embedding",
+) -> dict[str, Any]:
+    """Return the document fields that store ``vector`` in ``encoding``."""
+    if encoding == "array":
+        return {field: vector}
+
+    array = np.asarray(vector, dtype=np.float32)
+    fields = {field: _encode_value(array, encoding)}
+    if encoding == "int8":
+        fields[RESCORE_FIELD] = Binary(array.astype("<f2").tobytes())
+    return fields
+
+
+def encode_search_vector(
+    vector: list[float] | np.ndarray,
+    encoding: VectorEncoding,
+    dimensions: int,
+) -> dict[str, Any]:
+    """
+    Return the reduced-dimension search field for ``vector``.
+
+    Empty when ``dimensions`` is 0, i.e. the full vector is indexed.
+    """
+    if not dimensions:
+        return {}
+    return {search_vector_field(dimensions): _encode_value(truncate_vector(vector, dimensions), encoding)}
+
+
+def decode_vector(doc: dict[str, Any], field: str = "embedding") -> np.ndarray:
+    """
+    Return the highest-precision copy of a stored vector as float32.
+
+    Handles every encoding, so collections with mixed layouts (e.g. during
+    a migration) can still be rescored.
+    """
+    if RESCORE_FIELD in doc:
+        return np.frombuffer(doc[RESCORE_FIELD], dtype="<f2").astype(np.float32)
+
+    value = doc[field]
+    if isinstance(value, Binary):
+        dtype = BinaryVectorDtype(bytes(value[:1]))
+        if dtype == BinaryVectorDtype.FLOAT32:
+            return np.frombuffer(value, dtype="<f4", offset=_VECTOR_HEADER_BYTES).copy()
+        if dtype == BinaryVectorDtype.INT8:
+            return np.frombuffer(value, dtype=np.int8, offset=_VECTOR_HEADER_BYTES).astype(np.float32)
+        raise ValueError(f"Unsupported vector binary dtype: {dtype!r}")
+    return np.asarray(value, dtype=np.float32)
@@ -2,87 +2,1243 @@
 MongoDB Atlas Vector Search adapter.
 
 Provides a configured retriever and document insertion helpers.
+Chunks are written and searched directly with pymongo so vectors can be
+stored in compact encodings (see ``vector_codec``); langchain-mongodb is
+used for vector index management.
+
+Note: ``langchain-mongodb`` stores chunk metadata as top-level fields
+(``{"text": ..., "embedding": ..., "source": ..., "file_hash": ...}``),
+so filter and index paths below are top-level, not ``metadata.*``.
 """
 from __future__ import annotations
 
 import logging
-from typing import Any
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from datetime import datetime, timezone
+from typing import Any, Iterator
 
 import certifi
+import numpy as np
 
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_core.vectorstores import VectorStoreRetriever
-from pymongo import MongoClient
+from langchain_mongodb.pipelines import vector_search_stage
+from langchain_mongodb.utils import cosine_similarity, maximal_marginal_relevance
+from pymongo import ASCENDING, MongoClient, ReplaceOne, UpdateOne, WriteConcern
 from pymongo.collection import Collection
+from pymongo.database import Database
+from pymongo.errors import OperationFailure
+from pymongo.operations import SearchIndexModel
+from pymongo.read_preferences import make_read_preference, read_pref_mode_from_name
 
 from config import settings
-from app.infrastructure.embedding import get_embeddings
+from app.domain.models import RetrievalFilter
+from app.infrastructure.embedding import embed_query, get_embeddings
+from app.infrastructure.vector_codec import (
+    RESCORE_FIELD,
+    decode_vector,
+    encode_query,
+    encode_search_vector,
+    encode_vector,
+    search_vector_field,
+)
 
 logger = logging.getLogger(__name__)
 
+# Chunk fields declared as ``filter`` paths in the Atlas vector index so
+# they can be used in ``$vectorSearch`` pre-filters.
+FILTER_FIELDS: list[str] = ["file_hash", "source", "page", "deleted", "node_type", "section_hash"]
+
+# Chunk fields that get a regular (B-tree) secondary index.
+SECONDARY_INDEX_FIELDS: list[str] = ["file_hash", "source"]
+
 # ── Module-level singletons ──────────────────────────────────────────
 
 _client: MongoClient | None = None
-_collection: Collection | None = None
-_vector_store: MongoDBAtlasVectorSearch | None = None
+_lock = threading.Lock()
+
+# Vector store handles by chunk collection name, least recently used
+# first, with the time each was last checked against the live index.
+_vector_stores: OrderedDict[str, tuple[float, MongoDBAtlasVectorSearch]] = OrderedDict()
+# One lock per collection, held while its handle and indexes are built.
+_build_locks: dict[str, threading.Lock] = {}
+# Filter paths the live vector index can serve, by collection name, with
+# the time they were read (None if they could not be read).
+_index_filter_paths: dict[str, tuple[float, frozenset[str] | None]] = {}
 
 
-def _get_mongo_collection() -> Collection:
-    """Return the MongoDB collection, creating the client once."""
-    global _client, _collection  # noqa: PLW0603
-    if _collection is None:
+def mongo_client_options() -> dict[str, Any]:
+    """Pool, timeout and compression options for ``MongoClient``."""
+    options: dict[str, Any] = {
+        "maxPoolSize": settings.mongo_max_pool_size,
+        "minPoolSize": settings.mongo_min_pool_size,
+        "maxIdleTimeMS": settings.mongo_max_idle_time_ms,
+        "waitQueueTimeoutMS": settings.mongo_wait_queue_timeout_ms,
+        "serverSelectionTimeoutMS": settings.mongo_server_selection_timeout_ms,
+        "retryWrites": True,
+    }
+    if settings.mongo_compressors:
+        options["compressors"] = settings.mongo_compressors
+    return options
+
+
+def _get_client() -> MongoClient:
+    """Return the shared ``MongoClient``, creating it once."""
+    global _client  # noqa: PLW0603
+    if _client is None:
         if not settings.mongo_uri:
             raise RuntimeError("MONGO_URI is not set in the environment.")
-        _client = MongoClient(settings.mongo_uri, tlsCAFile=certifi.where())
-        # Verify connectivity
-        _client.admin.command("ping")
-        logger.info("Connected to MongoDB Atlas successfully.")
-        db = _client[settings.mongo_db_name]
-        _collection = db[settings.mongo_collection_name]
-    return _collection
-
-
-def get_vector_store() -> MongoDBAtlasVectorSearch:
-    """Return a singleton ``MongoDBAtlasVectorSearch`` instance."""
-    global _vector_store  # noqa: PLW0603
-    if _vector_store is None:
-        _vector_store = MongoDBAtlasVectorSearch(
-            collection=_get_mongo_collection(),
+        _client = MongoClient(
+            settings.mongo_uri,
+            tlsCAFile=certifi.where(),
+            **mongo_client_options(),
+        )
+        # The driver connects in the background; a ping here would block
+        # the first request on a full round trip to Atlas.
+        if settings.mongo_ping_on_connect:
+            _client.admin.command("ping")
+            logger.info("Connected to MongoDB Atlas successfully.")
+    return _client
+
+
+def get_database() -> Database:
+    """Return the application database."""
+    return _get_client()[settings.mongo_db_name]
+
+
+def _tenant_collection_name(base: str, tenant_id: str | None) -> str:
+    """
+    Map a base collection name to the tenant's partition.
+
+    The default tenant keeps the original, un-suffixed collections so
+    single-tenant deployments see no change.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    if tenant_id == settings.default_tenant_id:
+        return base
+    return f"{base}__{tenant_id}"
+
+
+def _get_mongo_collection(tenant_id: str | None = None) -> Collection:
+    """Return the tenant's chunk collection."""
+    return get_database()[_tenant_collection_name(settings.mongo_collection_name, tenant_id)]
+
+
+def _search_collection(tenant_id: str) -> Collection:
+    """Chunk collection for retrieval reads, with ``mongo_read_preference`` if set."""
+    get_vector_store(tenant_id)  # ensures collection + vector index exist
+    collection = _get_mongo_collection(tenant_id)
+    if not settings.mongo_read_preference:
+        return collection
+    read_preference = make_read_preference(
+        read_pref_mode_from_name(settings.mongo_read_preference), None
+    )
+    return collection.with_options(read_preference=read_preference)
+
+
+def _ingest_collection(tenant_id: str | None) -> Collection:
+    """Chunk collection for writes, with ``mongo_ingest_write_concern`` if set."""
+    collection = _get_mongo_collection(tenant_id)
+    w = settings.mongo_ingest_write_concern
+    if not w:
+        return collection
+    return collection.with_options(write_concern=WriteConcern(w=int(w) if w.isdigit() else w))
+
+
+def get_documents_collection(tenant_id: str | None = None) -> Collection:
+    """Return the tenant's document registry collection (``_id`` = file hash)."""
+    return get_database()[
+        _tenant_collection_name(settings.mongo_documents_collection_name, tenant_id)
+    ]
+
+
+def vector_index_dimensions() -> int:
+    """Dimensions of the indexed search vector under the current settings."""
+    return settings.search_dimensions or settings.embedding_dimensions
+
+
+def _vector_index_fields(dimensions: int) -> list[dict[str, Any]]:
+    """Vector index fields for a search vector of ``dimensions`` (0 = full)."""
+    return [
+        {
+            "type": "vector",
+            "path": search_vector_field(dimensions),
+            "numDimensions": dimensions or settings.embedding_dimensions,
+            "similarity": "cosine",
+        },
+        *({"type": "filter", "path": field} for field in FILTER_FIELDS),
+    ]
+
+
+def _live_index_fields(collection: Collection) -> list[dict[str, Any]] | None:
+    """Fields of the live vector index, or None if it does not exist."""
+    for index in collection.list_search_indexes(settings.atlas_vector_search_index):
+        return index.get("latestDefinition", {}).get("fields", [])
+    return None
+
+
+def _wait_until_queryable(collection: Collection, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        indexes = list(collection.list_search_indexes(settings.atlas_vector_search_index))
+        if indexes and indexes[0].get("queryable"):
+            return
+        time.sleep(2)
+    logger.warning("Vector index on %s is not queryable after %ds.", collection.name, timeout)
+
+
+def sync_vector_index(
+    collection: Collection,
+    dimensions: int,
+    *,
+    prune: bool = False,
+) -> list[str]:
+    """
+    Make the vector index cover the search field for ``dimensions``.
+
+    Existing vector fields are kept unless ``prune`` is set, so a new
+    search field can be indexed alongside the old one during a migration.
+    Updating a search index triggers a rebuild, so the definition is only
+    written when it actually changes.
+
+    Returns the vector paths dropped from the index (only with ``prune``).
+    """
+    wanted = _vector_index_fields(dimensions)
+    live = _live_index_fields(collection)
+    if live is None:
+        if collection.name not in collection.database.list_collection_names():
+            collection.database.create_collection(collection.name)
+        collection.create_search_index(SearchIndexModel(
+            definition={"fields": wanted},
+            name=settings.atlas_vector_search_index,
+            type="vectorSearch",
+        ))
+        logger.info("Created vector index on %s (%s).", collection.name, wanted[0]["path"])
+        _wait_until_queryable(collection, timeout=120)  # Atlas indexes can take ~1-3 min
+        return []
+
+    def key(field: dict[str, Any]) -> tuple:
+        return field["type"], field["path"], field.get("numDimensions")
+
+    # A path can only be declared once, so wanted fields replace live ones.
+    wanted_paths = {field["path"] for field in wanted}
+    kept = [] if prune else [field for field in live if field["path"] not in wanted_paths]
+    fields = wanted + kept
+    if {key(field) for field in fields} == {key(field) for field in live}:
+        return []
+
+    collection.update_search_index(settings.atlas_vector_search_index, {"fields": fields})
+    dropped = sorted(
+        {f["path"] for f in live if f["type"] == "vector"} - {f["path"] for f in fields}
+    )
+    logger.info(
+        "Updated vector index on %s: search field %s, dropped %s.",
+        collection.name, wanted[0]["path"], dropped or "nothing",
+    )
+    return dropped
+
+
+def ensure_indexes(vector_store: MongoDBAtlasVectorSearch) -> None:
+    """
+    Create secondary indexes and the vector index for the configured layout.
+
+    Safe to call repeatedly; failures are logged rather than raised because
+    shared (M0) clusters do not allow search index management via the driver.
+    Until the filter fields are indexed, search applies those filters after
+    the ``$vectorSearch`` stage (see ``_vector_search_stages``).
+    """
+    collection = vector_store._collection
+    for field in SECONDARY_INDEX_FIELDS:
+        collection.create_index([(field, ASCENDING)], name=f"{field}_1")
+    # Only tombstoned chunks carry ``deleted_at`` and only compacted stubs
+    # ``purged_at``; used by compaction and stub expiry.
+    collection.create_index([("deleted_at", ASCENDING)], name="deleted_at_1", sparse=True)
+    collection.create_index([("purged_at", ASCENDING)], name="purged_at_1", sparse=True)
+
+    try:
+        sync_vector_index(collection, settings.search_dimensions)
+    except OperationFailure:
+        logger.warning(
+            "Could not update the vector index (search field %s, filters %s); "
+            "add them in the Atlas UI.",
+            search_vector_field(settings.search_dimensions),
+            FILTER_FIELDS,
+            exc_info=True,
+        )
+
+
+def _index_missing(collection: Collection) -> bool:
+    """True if the collection's vector index has been dropped."""
+    try:
+        return _live_index_fields(collection) is None
+    except OperationFailure:
+        return False  # shared (M0) clusters cannot list search indexes
+
+
+def _cached_vector_store(name: str) -> MongoDBAtlasVectorSearch | None:
+    """
+    Return the cached handle for a collection, or None if it must be built.
+
+    Handles older than ``tenant_cache_ttl`` are re-checked against the live
+    vector index, so an index dropped by another worker (tenant archive)
+    is rebuilt here too instead of queries failing on a stale handle.
+    """
+    with _lock:
+        entry = _vector_stores.get(name)
+        if entry is None:
+            return None
+        _vector_stores.move_to_end(name)
+    validated_at, vector_store = entry
+    if time.monotonic() - validated_at < settings.tenant_cache_ttl:
+        return vector_store
+    if _index_missing(vector_store._collection):
+        logger.info("Vector index on %s is gone; rebuilding.", name)
+        return None
+    with _lock:
+        if name in _vector_stores:
+            _vector_stores[name] = (time.monotonic(), vector_store)
+    return vector_store
+
+
+def get_vector_store(tenant_id: str | None = None) -> MongoDBAtlasVectorSearch:
+    """
+    Return the ``MongoDBAtlasVectorSearch`` for a tenant.
+
+    Handles are created lazily (including the tenant's collection and
+    vector index) and kept in a bounded LRU cache. Building one can wait
+    minutes for Atlas, so it holds only that collection's lock: other
+    tenants keep being served meanwhile.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    name = _tenant_collection_name(settings.mongo_collection_name, tenant_id)
+    vector_store = _cached_vector_store(name)
+    if vector_store is not None:
+        return vector_store
+
+    with _lock:
+        build_lock = _build_locks.setdefault(name, threading.Lock())
+    with build_lock:
+        # Another thread may have built it while we waited.
+        with _lock:
+            entry = _vector_stores.get(name)
+        if entry is not None and time.monotonic() - entry[0] < settings.tenant_cache_ttl:
+            return entry[1]
+
+        vector_store = MongoDBAtlasVectorSearch(
+            collection=_get_mongo_collection(tenant_id),
             embedding=get_embeddings(),
             index_name=settings.atlas_vector_search_index,
-            auto_create_index=True,
-            auto_index_timeout=120,  # Atlas indexes can take ~1-3 min
-            dimensions=1536,  # text-embedding-3-small output dims
+            auto_create_index=False,  # managed by ensure_indexes
+            dimensions=vector_index_dimensions(),
         )
-    return _vector_store
+        ensure_indexes(vector_store)
 
+    with _lock:
+        _vector_stores[name] = (time.monotonic(), vector_store)
+        _vector_stores.move_to_end(name)
+        while len(_vector_stores) > settings.tenant_cache_size:
+            evicted, _ = _vector_stores.popitem(last=False)
+            _build_locks.pop(evicted, None)
+            logger.info("Evicted vector store handle for %s.", evicted)
+    return vector_store
 
-def get_retriever() -> VectorStoreRetriever:
+
+def evict_vector_store(tenant_id: str) -> None:
+    """Drop the cached vector store handle for a tenant (if any)."""
+    name = _tenant_collection_name(settings.mongo_collection_name, tenant_id)
+    with _lock:
+        _vector_stores.pop(name, None)
+        _index_filter_paths.pop(name, None)
+
+
+def drop_tenant_collections(tenant_id: str) -> None:
+    """Delete a tenant's chunks, registry and vector index."""
+    evict_vector_store(tenant_id)
+    _get_mongo_collection(tenant_id).drop()
+    get_documents_collection(tenant_id).drop()
+
+
+def drop_tenant_vector_index(tenant_id: str) -> None:
+    """
+    Drop a tenant's vector index while keeping its chunks.
+
+    Frees search-node memory for archived tenants; the index is recreated
+    by ``get_vector_store`` when the tenant is restored.
+    """
+    evict_vector_store(tenant_id)
+    try:
+        _get_mongo_collection(tenant_id).drop_search_index(settings.atlas_vector_search_index)
+    except OperationFailure:
+        logger.warning("Could not drop vector index for tenant '%s'.", tenant_id, exc_info=True)
+
+
+# Excludes tombstoned chunks that have not been compacted yet.
+LIVE_CHUNK_FILTER: dict[str, Any] = {"deleted": {"$ne": True}}
+
+# Summary nodes share the chunk collection and vector index; text chunks
+# have no ``node_type``.
+SUMMARY_NODE = "summary"
+TEXT_CHUNK_FILTER: dict[str, Any] = {"node_type": {"$ne": SUMMARY_NODE}}
+
+
+def build_pre_filter(
+    filters: RetrievalFilter | None,
+    scope: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """
+    Translate a ``RetrievalFilter`` into a ``$vectorSearch`` filter clause.
+
+    Tombstoned chunks and summary nodes are always excluded. ``scope`` is
+    an extra clause restricting the search, e.g. to the documents picked
+    by the coarse retrieval stage.
+    """
+    clauses: list[dict[str, Any]] = [LIVE_CHUNK_FILTER, TEXT_CHUNK_FILTER]
+    if scope:
+        clauses.append(scope)
+    if filters is not None:
+        if filters.file_hash:
+            clauses.append({"file_hash": {"$eq": filters.file_hash}})
+        if filters.source:
+            clauses.append({"source": {"$eq": filters.source}})
+        if filters.page_from is not None:
+            clauses.append({"page": {"$gte": filters.page_from}})
+        if filters.page_to is not None:
+            clauses.append({"page": {"$lte": filters.page_to}})
+    return {"$and": clauses}
+
+
+# ── Retrieval ────────────────────────────────────────────────────────
+
+# Stored fields returned by vector search, besides score and vectors.
+_RETRIEVAL_FIELDS = ("text", "file_hash", "source", "page", "page_label", "chunk_hash")
+
+# Extra candidates requested when part of the filter is applied after the
+# search, to make up for the candidates it removes.
+_POST_FILTER_OVERSAMPLING = 4
+
+
+def _indexed_filter_paths(collection: Collection) -> frozenset[str] | None:
+    """
+    Filter paths the collection's vector index can serve right now.
+
+    Read from a ready index only: while Atlas builds a new definition,
+    queries still run against the old one. Cached for ``tenant_cache_ttl``;
+    None if the index cannot be listed (e.g. shared M0 clusters).
+    """
+    with _lock:
+        cached = _index_filter_paths.get(collection.name)
+    if cached and time.monotonic() - cached[0] < settings.tenant_cache_ttl:
+        return cached[1]
+
+    paths: frozenset[str] | None = None
+    try:
+        for index in collection.list_search_indexes(settings.atlas_vector_search_index):
+            if index.get("status", "READY") == "READY":
+                fields = index.get("latestDefinition", {}).get("fields", [])
+                paths = frozenset(f["path"] for f in fields if f.get("type") == "filter")
+    except OperationFailure:
+        pass
+    if (cached is None or cached[1] != paths) and not (paths and paths >= set(FILTER_FIELDS)):
+        logger.warning(
+            "Vector index on %s does not serve filters on %s yet; "
+            "filtering on them after the search.",
+            collection.name, sorted(set(FILTER_FIELDS) - (paths or frozenset())),
+        )
+    with _lock:
+        _index_filter_paths[collection.name] = (time.monotonic(), paths)
+    return paths
+
+
+def _filter_paths(clause: dict[str, Any]) -> set[str]:
+    """Field paths referenced anywhere in a query clause."""
+    paths: set[str] = set()
+    for key, value in clause.items():
+        if not key.startswith("$"):
+            paths.add(key)
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, dict):
+                    paths |= _filter_paths(item)
+    return paths
+
+
+def _vector_search_stages(
+    collection: Collection,
+    query_vector: Any,
+    search_field: str,
+    top_k: int,
+    pre_filter: dict[str, Any] | None,
+) -> list[dict[str, Any]]:
+    """
+    ``$vectorSearch`` for ``top_k`` results, filtered by ``pre_filter``.
+
+    Clauses on paths the index does not declare as filters would fail the
+    query, so they become a ``$match`` after an oversampled search instead.
+    """
+    clauses = (pre_filter or {}).get("$and", [pre_filter] if pre_filter else [])
+    indexed = _indexed_filter_paths(collection) or frozenset()
+    pre = [clause for clause in clauses if _filter_paths(clause) <= indexed]
+    post = [clause for clause in clauses if not _filter_paths(clause) <= indexed]
+    if not post:
+        return [vector_search_stage(
+            query_vector, search_field, settings.atlas_vector_search_index,
+            top_k=top_k, filter=pre_filter,
+        )]
+    return [
+        vector_search_stage(
+            query_vector, search_field, settings.atlas_vector_search_index,
+            top_k=top_k * _POST_FILTER_OVERSAMPLING, filter={"$and": pre} if pre else None,
+        ),
+        {"$match": {"$and": post}},
+        {"$limit": top_k},
+    ]
+
+
+def search_chunks(
+    query: str,
+    *,
+    tenant_id: str | None = None,
+    pre_filter: dict[str, Any] | None = None,
+    k: int | None = None,
+    fetch_k: int | None = None,
+    lambda_mult: float = 0.5,
+) -> list[Document]:
+    """
+    Vector search over a tenant's chunks.
+
+    With MMR, int8 vectors or a reduced-dimension index this is two-step:
+    ``$vectorSearch`` for ``fetch_k`` candidates on the indexed (quantized
+    or truncated) vectors, then rescoring and selection of ``k`` results
+    on the full vectors. Plain similarity search on full float vectors
+    returns ``k`` results straight from the index, and no vectors are sent
+    back at all.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    k = k or settings.retrieval_k
+    fetch_k = fetch_k or settings.retrieval_fetch_k
+    encoding = settings.vector_encoding
+    dimensions = settings.search_dimensions
+    use_mmr = settings.retrieval_search_type == "mmr"
+    needs_vectors = use_mmr or encoding == "int8" or bool(dimensions)
+
+    query_vector = embed_query(query)
+    collection = _search_collection(tenant_id)
+
+    # Return only what retrieval needs: text, chunk metadata, score and, if
+    # required, the vectors used for rescoring. In int8 mode that is the
+    # float16 copy, with ``embedding`` as a fallback for chunks written
+    # before the encoding was switched.
+    projection: dict[str, Any] = {field: 1 for field in _RETRIEVAL_FIELDS}
+    projection["score"] = {"$meta": "vectorSearchScore"}
+    if needs_vectors:
+        projection["embedding"] = 1
+        if encoding == "int8":
+            projection[RESCORE_FIELD] = 1
+
+    pipeline: list[dict[str, Any]] = [
+        *_vector_search_stages(
+            collection,
+            encode_query(query_vector, encoding, dimensions),
+            search_vector_field(dimensions),
+            fetch_k if needs_vectors else k,
+            pre_filter,
+        ),
+        {"$project": projection},
+    ]
+    candidates = list(collection.aggregate(pipeline))
+    if not candidates:
+        return []
+
+    if needs_vectors:
+        query_array = np.asarray(query_vector, dtype=np.float32)
+        vectors = [decode_vector(candidate) for candidate in candidates]
+        # Same scale as Atlas's cosine ``vectorSearchScore``: (1 + cos) / 2.
+        scores = (1 + cosine_similarity([query_array], vectors)[0]) / 2
+        if use_mmr:
+            selected = maximal_marginal_relevance(query_array, vectors, lambda_mult=lambda_mult, k=k)
+        else:
+            selected = list(np.argsort(-scores)[:k])
+    else:
+        scores = [candidate["score"] for candidate in candidates]
+        selected = list(range(len(candidates)))
+
+    documents: list[Document] = []
+    for i in selected:
+        candidate = candidates[i]
+        candidate.pop("embedding", None)
+        candidate.pop(RESCORE_FIELD, None)
+        text = candidate.pop("text", "")
+        candidate["_id"] = str(candidate["_id"])
+        candidate["score"] = float(scores[i])
+        documents.append(Document(page_content=text, metadata=candidate))
+
+    _rehydrate_document_metadata(documents, tenant_id)
+    return documents
+
+
+def search_summaries(
+    query: str,
+    *,
+    tenant_id: str | None = None,
+    k: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Vector search over a tenant's summary nodes only.
+
+    Returns ``{file_hash, level, summary_hash, score}`` per node, best
+    first. Index scores are used as-is: the coarse stage only needs to
+    rank documents and sections, not to pick final context.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    dimensions = settings.search_dimensions
+    collection = _search_collection(tenant_id)
+    pipeline: list[dict[str, Any]] = [
+        *_vector_search_stages(
+            collection,
+            encode_query(embed_query(query), settings.vector_encoding, dimensions),
+            search_vector_field(dimensions),
+            k or settings.coarse_k,
+            {"$and": [LIVE_CHUNK_FILTER, {"node_type": {"$eq": SUMMARY_NODE}}]},
+        ),
+        {"$project": {
+            "_id": 0,
+            "file_hash": 1,
+            "level": 1,
+            "summary_hash": 1,
+            "score": {"$meta": "vectorSearchScore"},
+        }},
+    ]
+    return list(collection.aggregate(pipeline))
+
+
+class ChunkRetriever(BaseRetriever):
+    """LangChain retriever over one tenant's chunks (see ``search_chunks``)."""
+
+    tenant_id: str
+    pre_filter: dict[str, Any]
+    k: int
+    fetch_k: int
+
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: CallbackManagerForRetrieverRun,
+    ) -> list[Document]:
+        return search_chunks(
+            query,
+            tenant_id=self.tenant_id,
+            pre_filter=self.pre_filter,
+            k=self.k,
+            fetch_k=self.fetch_k,
+        )
+
+
+def get_retriever(
+    filters: RetrievalFilter | None = None,
+    *,
+    tenant_id: str | None = None,
+    scope: dict[str, Any] | None = None,
+) -> BaseRetriever:
     """
-    Build a retriever with MMR (Maximum Marginal Relevance) for
+    Build a retriever — MMR (Maximum Marginal Relevance) by default, for
     diverse, non-redundant context.
+
+    ``filters`` and ``scope`` are applied inside ``$vectorSearch``
+    (pre-filtering), so only matching chunks are scored.
     """
-    return get_vector_store().as_retriever(
-        search_type="mmr",
-        search_kwargs={
-            "k": settings.retrieval_k,
-            "fetch_k": settings.retrieval_fetch_k,
-        },
+    return ChunkRetriever(
+        tenant_id=tenant_id or settings.default_tenant_id,
+        pre_filter=build_pre_filter(filters, scope),
+        k=settings.retrieval_k,
+        fetch_k=settings.retrieval_fetch_k,
+    )
+
+
+# ── Storage ──────────────────────────────────────────────────────────
+
+# Metadata that stays on every chunk; anything else that is identical
+# across a document's chunks is moved to its registry record when a
+# binary vector encoding is in use. Fields that queries filter on must be
+# listed here.
+CHUNK_METADATA_FIELDS = frozenset({
+    "file_hash", "source", "page", "page_label", "chunk_hash", "tenant_id", "start_index",
+    "section_hash", "node_type", "level", "summary_hash", "corpus_version", "deleted_version",
+})
+
+
+def _deduplicate_document_metadata(metadatas: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+    """
+    Strip shared per-document metadata from chunk dicts.
+
+    Returns the stripped fields by file hash; ``store_documents`` saves
+    them to the registry once the chunks are written.
+    """
+    by_file: dict[str, list[dict[str, Any]]] = defaultdict(list)
+    for metadata in metadatas:
+        if metadata.get("file_hash"):
+            by_file[metadata["file_hash"]].append(metadata)
+
+    stripped: dict[str, dict[str, Any]] = {}
+    for file_hash, group in by_file.items():
+        first = group[0]
+        shared = {
+            key: value
+            for key, value in first.items()
+            if key not in CHUNK_METADATA_FIELDS
+            and all(key in other and other[key] == value for other in group)
+        }
+        if not shared:
+            continue
+        for metadata in group:
+            for key in shared:
+                del metadata[key]
+        stripped[file_hash] = shared
+    return stripped
+
+
+def _save_document_metadata(stripped: dict[str, dict[str, Any]], tenant_id: str) -> None:
+    """Merge stripped per-document metadata into registry ``doc_metadata``."""
+    registry = get_documents_collection(tenant_id)
+    for file_hash, shared in stripped.items():
+        registry.update_one(
+            {"_id": file_hash},
+            {"$set": {f"doc_metadata.{key}": value for key, value in shared.items()}},
+            upsert=True,
+        )
+
+
+def _rehydrate_document_metadata(documents: list[Document], tenant_id: str) -> None:
+    """Merge registry ``doc_metadata`` back into retrieved chunks."""
+    file_hashes = {doc.metadata["file_hash"] for doc in documents if doc.metadata.get("file_hash")}
+    if not file_hashes:
+        return
+    records = get_documents_collection(tenant_id).find(
+        {"_id": {"$in": list(file_hashes)}, "doc_metadata": {"$exists": True}},
+        {"doc_metadata": 1},
     )
+    shared = {rec["_id"]: rec["doc_metadata"] for rec in records}
+    for doc in documents:
+        extra = shared.get(doc.metadata.get("file_hash"))
+        if extra:
+            doc.metadata = {**extra, **doc.metadata}
+
+
+def _pending_corpus_version(tenant_id: str) -> int:
+    """
+    Corpus version a write in progress will be published under.
+
+    Chunks are stamped with it so snapshots can export what changed since
+    a version. Read from the primary, not the tenant cache: a stale value
+    could stamp a write below a version that was already exported.
+    """
+    tenants = get_database()[settings.mongo_tenants_collection_name]
+    record = tenants.find_one({"_id": tenant_id}, {"corpus_version": 1})
+    return int(record.get("corpus_version", 0)) + 1 if record else 1
 
 
-def store_documents(documents: list[Any]) -> int:
+def store_documents(documents: list[Document], *, tenant_id: str | None = None) -> int:
     """
-    Embed and insert document chunks into MongoDB Atlas.
+    Embed and insert document chunks into the tenant's collection.
 
+    Vectors are written in ``settings.vector_encoding``, plus the
+    reduced-dimension search field when ``settings.search_dimensions`` is set.
     Returns the number of documents stored.
     """
-    vs = MongoDBAtlasVectorSearch.from_documents(
-        documents=documents,
-        embedding=get_embeddings(),
-        collection=_get_mongo_collection(),
-        index_name=settings.atlas_vector_search_index,
+    tenant_id = tenant_id or settings.default_tenant_id
+    if not documents:
+        return 0
+
+    encoding = settings.vector_encoding
+    get_vector_store(tenant_id)  # ensures collection + vector index exist
+    collection = _ingest_collection(tenant_id)
+    vectors = get_embeddings().embed_documents([doc.page_content for doc in documents])
+
+    version = _pending_corpus_version(tenant_id)
+    metadatas = [{**doc.metadata, "tenant_id": tenant_id, "corpus_version": version} for doc in documents]
+    stripped = _deduplicate_document_metadata(metadatas) if encoding != "array" else {}
+
+    records = [
+        {
+            "text": doc.page_content,
+            **encode_vector(vector, encoding),
+            **encode_search_vector(vector, encoding, settings.search_dimensions),
+            **metadata,
+        }
+        for doc, vector, metadata in zip(documents, vectors, metadatas)
+    ]
+    # Unordered batches let the server apply inserts in parallel and keep
+    # going past individual failures.
+    batch_size = settings.mongo_insert_batch_size
+    for start in range(0, len(records), batch_size):
+        collection.insert_many(records[start:start + batch_size], ordered=False)
+    # Only once the chunks are written; until ``register_document`` runs
+    # the record is incomplete and ignored by registry reads.
+    _save_document_metadata(stripped, tenant_id)
+
+    count = len(records)
+    logger.info(
+        "Stored %d document chunks in MongoDB (tenant=%s, encoding=%s).",
+        count, tenant_id, encoding,
     )
-    count = len(documents)
-    logger.info("Stored %d document chunks in MongoDB.", count)
     return count
+
+
+# ── Document registry ────────────────────────────────────────────────
+
+# ``register_document`` sets ``source``; a record without it only holds
+# ``doc_metadata`` from an ingest that has not finished (or never will).
+_REGISTERED: dict[str, Any] = {"source": {"$exists": True}}
+
+
+def document_exists(file_hash: str, *, tenant_id: str | None = None) -> bool:
+    """
+    Check whether a document with this hash has been ingested.
+
+    Uses the registry first, then the ``file_hash`` index on the chunk
+    collection for documents ingested before the registry existed.
+    """
+    if get_documents_collection(tenant_id).find_one({"_id": file_hash, **_REGISTERED}, {"_id": 1}):
+        return True
+    chunks = _get_mongo_collection(tenant_id)
+    query = {"file_hash": file_hash, **LIVE_CHUNK_FILTER}
+    return chunks.find_one(query, {"_id": 1}) is not None
+
+
+def register_document(
+    file_hash: str,
+    source: str,
+    *,
+    pages: int,
+    chunks: int,
+    summarized: bool = False,
+    tenant_id: str | None = None,
+) -> None:
+    """Upsert the registry record for an ingested document."""
+    get_documents_collection(tenant_id).update_one(
+        {"_id": file_hash},
+        {
+            "$set": {"source": source, "pages": pages, "chunks": chunks, "summarized": summarized},
+            "$setOnInsert": {"uploaded_at": datetime.now(timezone.utc)},
+        },
+        upsert=True,
+    )
+
+
+def carry_document_metadata(
+    old_hash: str,
+    new_hash: str,
+    *,
+    tenant_id: str | None = None,
+) -> None:
+    """
+    Copy a replaced document's ``doc_metadata`` onto its new version.
+
+    Chunks kept by an update were stripped of it when first stored. Fields
+    the new version's inserted chunks already saved take precedence.
+    """
+    registry = get_documents_collection(tenant_id)
+    old = registry.find_one({"_id": old_hash}, {"doc_metadata": 1}) or {}
+    new = registry.find_one({"_id": new_hash}, {"doc_metadata": 1}) or {}
+    current = new.get("doc_metadata", {})
+    missing = {
+        key: value for key, value in old.get("doc_metadata", {}).items() if key not in current
+    }
+    if missing:
+        registry.update_one(
+            {"_id": new_hash},
+            {"$set": {f"doc_metadata.{key}": value for key, value in missing.items()}},
+        )
+
+
+def unregister_document(file_hash: str, *, tenant_id: str | None = None) -> bool:
+    """Remove a registry record; returns True if it existed."""
+    result = get_documents_collection(tenant_id).delete_one({"_id": file_hash})
+    return result.deleted_count > 0
+
+
+def list_documents(*, tenant_id: str | None = None) -> list[dict[str, Any]]:
+    """Return all registry records for a tenant, newest first."""
+    cursor = get_documents_collection(tenant_id).find(_REGISTERED).sort("uploaded_at", -1)
+    return [{"file_hash": rec.pop("_id"), **rec} for rec in cursor]
+
+
+def has_registered_documents(*, tenant_id: str | None = None) -> bool:
+    """True if the tenant's registry holds at least one complete record."""
+    return get_documents_collection(tenant_id).find_one(_REGISTERED, {"_id": 1}) is not None
+
+
+def backfill_document_registry(*, tenant_id: str | None = None) -> int:
+    """
+    Register documents ingested before the registry existed.
+
+    One aggregation over the live chunks gives each document's source,
+    chunk count, page count and first insert time (from the ObjectId).
+    Registered documents are left alone (records an unfinished ingest left
+    without ``source`` are completed), so this is safe to run repeatedly.
+    Returns the number of records written.
+    """
+    registry = get_documents_collection(tenant_id)
+    registered = set(registry.distinct("_id", _REGISTERED))
+    chunks = _get_mongo_collection(tenant_id)
+    groups = chunks.aggregate([
+        {"$match": {"file_hash": {"$ne": None}, **LIVE_CHUNK_FILTER, **TEXT_CHUNK_FILTER}},
+        {"$group": {
+            "_id": "$file_hash",
+            "source": {"$first": "$source"},
+            "chunks": {"$sum": 1},
+            "last_page": {"$max": "$page"},
+            "first_id": {"$min": "$_id"},
+        }},
+    ])
+    summarized = set(chunks.distinct("file_hash", {"node_type": SUMMARY_NODE, **LIVE_CHUNK_FILTER}))
+    updates = [
+        UpdateOne(
+            {"_id": group["_id"]},
+            {"$set": {
+                "source": group["source"] or group["_id"],
+                "pages": group["last_page"] + 1 if group["last_page"] is not None else 0,
+                "chunks": group["chunks"],
+                "summarized": group["_id"] in summarized,
+                "uploaded_at": getattr(group["first_id"], "generation_time", None),
+            }},
+            upsert=True,
+        )
+        for group in groups
+        if group["_id"] not in registered
+    ]
+    if not updates:
+        return 0
+    registry.bulk_write(updates, ordered=False)
+    logger.info("Registered %d existing documents (tenant=%s).", len(updates), tenant_id)
+    return len(updates)
+
+
+# ── Summary nodes ────────────────────────────────────────────────────
+
+
+def get_summary_nodes(file_hash: str, *, tenant_id: str | None = None) -> list[dict[str, Any]]:
+    """Return ``{_id, summary_hash, text}`` for every live summary node of a document."""
+    cursor = _get_mongo_collection(tenant_id).find(
+        {"file_hash": file_hash, "node_type": SUMMARY_NODE, **LIVE_CHUNK_FILTER},
+        {"_id": 1, "summary_hash": 1, "text": 1},
+    )
+    return list(cursor)
+
+
+def get_document_chunks(file_hash: str, *, tenant_id: str | None = None) -> list[Document]:
+    """Return a document's live text chunks in reading order, without vectors."""
+    cursor = _get_mongo_collection(tenant_id).find(
+        {"file_hash": file_hash, **LIVE_CHUNK_FILTER, **TEXT_CHUNK_FILTER},
+        {"text": 1, "chunk_hash": 1, "source": 1, "page": 1},
+    ).sort([("page", ASCENDING), ("_id", ASCENDING)])
+    return [
+        Document(page_content=chunk.pop("text", ""), metadata=chunk)
+        for chunk in cursor
+    ]
+
+
+def mark_document_summarized(file_hash: str, *, tenant_id: str | None = None) -> None:
+    """Flag a registry record as covered by summary nodes."""
+    get_documents_collection(tenant_id).update_one(
+        {"_id": file_hash}, {"$set": {"summarized": True}}
+    )
+
+
+def get_summary_coverage(*, tenant_id: str | None = None) -> tuple[int, list[str]]:
+    """Return the number of registered documents and those without summaries."""
+    records = list(get_documents_collection(tenant_id).find(_REGISTERED, {"summarized": 1}))
+    missing = [rec["_id"] for rec in records if not rec.get("summarized")]
+    return len(records), missing
+
+
+# ── Incremental updates & tombstones ─────────────────────────────────
+
+
+def get_live_chunk_hashes(file_hash: str, *, tenant_id: str | None = None) -> list[dict[str, Any]]:
+    """Return ``{_id, chunk_hash}`` for every live text chunk of a document."""
+    cursor = _get_mongo_collection(tenant_id).find(
+        {"file_hash": file_hash, **LIVE_CHUNK_FILTER, **TEXT_CHUNK_FILTER},
+        {"_id": 1, "chunk_hash": 1},
+    )
+    return list(cursor)
+
+
+def retag_chunks(updates: list[tuple[Any, dict[str, Any]]], *, tenant_id: str | None = None) -> int:
+    """Apply ``$set`` metadata updates to kept chunks without re-embedding."""
+    if not updates:
+        return 0
+    version = _pending_corpus_version(tenant_id or settings.default_tenant_id)
+    result = _ingest_collection(tenant_id).bulk_write(
+        [UpdateOne({"_id": _id}, {"$set": {**fields, "corpus_version": version}}) for _id, fields in updates],
+        ordered=False,
+    )
+    return result.modified_count
+
+
+def tombstone_chunks(
+    *,
+    ids: list[Any] | None = None,
+    file_hash: str | None = None,
+    tenant_id: str | None = None,
+) -> int:
+    """
+    Mark chunks as deleted (by id list or whole document).
+
+    Tombstoned chunks are excluded from retrieval immediately and purged
+    later by ``compact_tombstones``.
+    """
+    if ids is not None:
+        if not ids:
+            return 0
+        query: dict[str, Any] = {"_id": {"$in": ids}}
+    elif file_hash is not None:
+        query = {"file_hash": file_hash, **LIVE_CHUNK_FILTER}
+    else:
+        raise ValueError("tombstone_chunks needs ids or file_hash.")
+
+    version = _pending_corpus_version(tenant_id or settings.default_tenant_id)
+    result = _ingest_collection(tenant_id).update_many(
+        query,
+        {"$set": {"deleted": True, "deleted_at": datetime.now(timezone.utc), "deleted_version": version}},
+    )
+    logger.info("Tombstoned %d chunks (tenant=%s).", result.modified_count, tenant_id)
+    return result.modified_count
+
+
+def compact_tombstones(older_than: datetime, *, tenant_id: str | None = None) -> int:
+    """
+    Purge chunks tombstoned before ``older_than``.
+
+    Text, vectors and metadata are dropped, leaving a ``{_id, deleted,
+    deleted_version, purged_at}`` stub (a few dozen bytes) so snapshot
+    deltas can still list the deletion until ``expire_deletion_stubs``
+    removes it.
+    """
+    result = _get_mongo_collection(tenant_id).update_many(
+        {"deleted": True, "deleted_at": {"$lt": older_than}},
+        [{"$replaceWith": {
+            "_id": "$_id",
+            "deleted": True,
+            "deleted_version": "$deleted_version",
+            "purged_at": "$$NOW",
+        }}],
+    )
+    if result.modified_count:
+        logger.info("Compacted %d tombstoned chunks (tenant=%s).", result.modified_count, tenant_id)
+    return result.modified_count
+
+
+def expire_deletion_stubs(older_than: datetime, *, tenant_id: str | None = None) -> int:
+    """
+    Delete stubs compacted before ``older_than``.
+
+    Returns the highest ``deleted_version`` removed (0 if none): snapshot
+    deltas taken since an earlier version can no longer list every
+    deletion.
+    """
+    collection = _get_mongo_collection(tenant_id)
+    query = {"purged_at": {"$lt": older_than}}
+    newest = collection.find_one(query, {"deleted_version": 1}, sort=[("deleted_version", -1)])
+    if newest is None:
+        return 0
+    result = collection.delete_many(query)
+    logger.info("Expired %d deletion stubs (tenant=%s).", result.deleted_count, tenant_id)
+    return int(newest.get("deleted_version") or 0)
+
+
+def has_tombstones(*, tenant_id: str | None = None) -> bool:
+    """True if the tenant still has tombstoned chunks awaiting compaction."""
+    chunks = _get_mongo_collection(tenant_id)
+    return chunks.find_one({"deleted_at": {"$exists": True}}, {"_id": 1}) is not None
+
+
+# ── Search vector migration ──────────────────────────────────────────
+#
+# Changing ``search_dimensions`` on a populated collection is an
+# expand / contract migration that runs while the app keeps serving:
+#   1. ``backfill_search_vectors(new)`` indexes the new search field next
+#      to the current one and writes it onto every chunk in batches.
+#   2. Switch SEARCH_DIMENSIONS and restart the app.
+#   3. ``prune_search_vectors()`` backfills chunks written in between,
+#      drops the old search field from the index and unsets it on chunks.
+
+def backfill_search_vectors(
+    dimensions: int,
+    *,
+    tenant_id: str | None = None,
+    batch_size: int = 500,
+    pause: float = 0.0,
+) -> int:
+    """
+    Write the ``dimensions`` search field onto chunks that lack it.
+
+    Vectors are derived from the stored full vectors, so nothing is
+    re-embedded. ``pause`` seconds between batches throttles the load on
+    the cluster. Returns the number of chunks updated.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    collection = _ingest_collection(tenant_id)
+    sync_vector_index(collection, dimensions)
+    if not dimensions:
+        return 0  # the full vector is always stored
+
+    encoding = settings.vector_encoding
+    missing = {search_vector_field(dimensions): {"$exists": False}}
+    last_id = None
+    updated = 0
+    while True:
+        query = missing if last_id is None else {**missing, "_id": {"$gt": last_id}}
+        batch = list(
+            collection.find(query, {"embedding": 1, RESCORE_FIELD: 1})
+            .sort("_id", ASCENDING)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+        collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": chunk["_id"]},
+                    {"$set": encode_search_vector(decode_vector(chunk), encoding, dimensions)},
+                )
+                for chunk in batch
+            ],
+            ordered=False,
+        )
+        updated += len(batch)
+        last_id = batch[-1]["_id"]
+        logger.info("Backfilled %d chunks with %d-d search vectors (tenant=%s).",
+                    updated, dimensions, tenant_id)
+        if pause:
+            time.sleep(pause)
+    return updated
+
+
+def prune_search_vectors(
+    *,
+    tenant_id: str | None = None,
+    batch_size: int = 500,
+    pause: float = 0.0,
+) -> list[str]:
+    """
+    Finish a migration to ``settings.search_dimensions``.
+
+    Returns the search fields that were removed from the index and chunks.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    dimensions = settings.search_dimensions
+    backfill_search_vectors(dimensions, tenant_id=tenant_id, batch_size=batch_size, pause=pause)
+
+    collection = _ingest_collection(tenant_id)
+    dropped = sync_vector_index(collection, dimensions, prune=True)
+    # ``embedding`` holds the full vector used for rescoring; never unset it.
+    stale = [path for path in dropped if path != "embedding"]
+    if stale:
+        result = collection.update_many(
+            {"$or": [{path: {"$exists": True}} for path in stale]},
+            {"$unset": {path: "" for path in stale}},
+        )
+        logger.info("Removed %s from %d chunks (tenant=%s).", stale, result.modified_count, tenant_id)
+    return dropped
+
+
+# ── Snapshots ────────────────────────────────────────────────────────
+#
+# Chunks carry the corpus version that last wrote them (``corpus_version``)
+# and, once tombstoned, the version that deleted them (``deleted_version``).
+# Chunks written before versions were stamped only appear in full snapshots.
+
+
+def is_vector_field(field: str) -> bool:
+    """True for stored vector fields (full, rescoring and search copies)."""
+    return field == "embedding" or field.startswith("embedding_")
+
+
+def iter_snapshot_chunks(
+    since: int = 0,
+    *,
+    tenant_id: str | None = None,
+    batch_size: int = 1000,
+) -> Iterator[tuple[dict[str, Any], np.ndarray]]:
+    """
+    Yield ``(chunk, vector)`` for live chunks written after ``since``.
+
+    ``since=0`` yields every live chunk. The chunk dict has its vector
+    fields removed; ``vector`` is the highest-precision float32 copy.
+    """
+    query: dict[str, Any] = dict(LIVE_CHUNK_FILTER)
+    if since:
+        query["corpus_version"] = {"$gt": since}
+    cursor = _get_mongo_collection(tenant_id).find(query).sort("_id", ASCENDING).batch_size(batch_size)
+    for chunk in cursor:
+        vector = decode_vector(chunk)
+        yield {key: value for key, value in chunk.items() if not is_vector_field(key)}, vector
+
+
+def get_deleted_chunk_ids(since: int, *, tenant_id: str | None = None) -> list[Any]:
+    """Return ids of chunks tombstoned after corpus version ``since``."""
+    cursor = _get_mongo_collection(tenant_id).find(
+        {"deleted": True, "deleted_version": {"$gt": since}}, {"_id": 1}
+    )
+    return [chunk["_id"] for chunk in cursor]
+
+
+def has_chunks(*, tenant_id: str | None = None) -> bool:
+    """True if the tenant's collection holds any chunk, live or tombstoned."""
+    return _get_mongo_collection(tenant_id).find_one({}, {"_id": 1}) is not None
+
+
+def load_chunks(
+    chunks: list[dict[str, Any]],
+    vectors: np.ndarray,
+    *,
+    tenant_id: str | None = None,
+    replace: bool = False,
+) -> int:
+    """
+    Bulk-write pre-embedded chunks (e.g. from a snapshot), keeping their ids.
+
+    Vectors are encoded for this node's ``vector_encoding`` and
+    ``search_dimensions``, so snapshots move between differently configured
+    deployments. With ``replace`` existing chunks with the same id are
+    overwritten; otherwise chunks are inserted. Returns the number written.
+    """
+    tenant_id = tenant_id or settings.default_tenant_id
+    if not chunks:
+        return 0
+    encoding = settings.vector_encoding
+    get_vector_store(tenant_id)  # ensures collection + vector index exist
+    collection = _ingest_collection(tenant_id)
+    version = _pending_corpus_version(tenant_id)
+    records = [
+        {
+            **chunk,
+            **encode_vector(vector.tolist(), encoding),
+            **encode_search_vector(vector, encoding, settings.search_dimensions),
+            "tenant_id": tenant_id,
+            "corpus_version": version,
+        }
+        for chunk, vector in zip(chunks, vectors)
+    ]
+    if replace:
+        collection.bulk_write(
+            [ReplaceOne({"_id": record["_id"]}, record, upsert=True) for record in records],
+            ordered=False,
+        )
+    else:
+        collection.insert_many(records, ordered=False)
+    return len(records)
+
+
+def replace_document_registry(records: list[dict[str, Any]], *, tenant_id: str | None = None) -> None:
+    """Make the tenant's document registry exactly ``records``."""
+    registry = get_documents_collection(tenant_id)
+    if records:
+        registry.bulk_write([ReplaceOne({"_id": rec["_id"]}, rec, upsert=True) for rec in records])
+    registry.delete_many({"_id": {"$nin": [rec["_id"] for rec in records]}})
+
@@ -0,0 +1,167 @@
+"""
+MongoDB transport benchmark — write modes, wire compression, projection
+and pool sizing, against a local ``mongod`` standing in for Atlas.
+
+Start a throwaway server first, e.g.:
+    docker run --rm -p 27017:27017 mongo:7
+
+Usage:
+    python -m benchmarks.bench_mongo_transport
+    python -m benchmarks.bench_mongo_transport --uri mongodb://localhost:27017 --chunks 2000
+
+``$vectorSearch`` is not available on plain mongod, so the read test
+fetches ``fetch_k`` chunks by id — the same documents and projection the
+retriever asks Atlas to return.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bson
+import numpy as np
+from pymongo import InsertOne, MongoClient, WriteConcern
+
+from app.infrastructure.vector_codec import encode_vector
+
+DB_NAME = "smartnotes_bench"
+RETRIEVAL_PROJECTION = {"text": 1, "file_hash": 1, "source": 1, "page": 1, "page_label": 1, "chunk_hash": 1}
+
+
+def make_chunks(n: int, dim: int, encoding: str) -> list[dict]:
+    rng = np.random.default_rng(0)
+    words = "lecture notes about vectors retrieval databases and language models".split()
+    chunks = []
+    for i in range(n):
+        text = " ".join(rng.choice(words, size=200))
+        chunks.append({
+            "text": text,
+            "source": "lecture-notes.pdf",
+            "file_hash": f"{i // 100:032x}",
+            "chunk_hash": f"{i:032x}",
+            "page": i % 40,
+            "producer": "Microsoft® Word for Microsoft 365",
+            "creationdate": "2024-09-12T10:41:07-05:00",
+            **encode_vector(rng.normal(size=dim).tolist(), encoding),
+        })
+    return chunks
+
+
+def timed(fn) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def bench_writes(client: MongoClient, chunks: list[dict], batch_size: int) -> None:
+    print("\n## Ingestion write modes")
+    print(f"{'mode':<36}{'seconds':>9}{'chunks/s':>11}")
+    modes = {
+        "insert_one loop (w=1)": ("one", WriteConcern(w=1), True),
+        "insert_many ordered (w=1)": ("many", WriteConcern(w=1), True),
+        "insert_many unordered (w=1)": ("many", WriteConcern(w=1), False),
+        "insert_many unordered (w=majority)": ("many", WriteConcern(w="majority"), False),
+        "bulk_write unordered (w=0)": ("bulk", WriteConcern(w=0), False),
+    }
+    for name, (kind, write_concern, ordered) in modes.items():
+        collection = client[DB_NAME].get_collection("writes", write_concern=write_concern)
+        collection.drop()
+        docs = [dict(chunk) for chunk in chunks]
+
+        # Defaults bind this iteration's values (the loop rebinds the names).
+        def run(kind=kind, collection=collection, docs=docs, ordered=ordered) -> None:
+            if kind == "one":
+                for doc in docs:
+                    collection.insert_one(doc)
+            elif kind == "many":
+                for start in range(0, len(docs), batch_size):
+                    collection.insert_many(docs[start:start + batch_size], ordered=ordered)
+            else:
+                collection.bulk_write([InsertOne(doc) for doc in docs], ordered=ordered)
+
+        seconds = timed(run)
+        print(f"{name:<36}{seconds:>9.2f}{len(docs) / seconds:>11,.0f}")
+
+
+def bench_reads(uri: str, chunks: list[dict], fetch_k: int, rounds: int) -> None:
+    print("\n## Retrieval reads (fetch_k chunks by id)")
+    print(f"{'compressor':<12}{'projection':<12}{'ms/query':>10}{'KB/query':>10}")
+    seed = MongoClient(uri)[DB_NAME]["reads"]
+    seed.drop()
+    ids = seed.insert_many(chunks).inserted_ids
+    rng = np.random.default_rng(1)
+
+    for compressor in ("none", "zlib", "snappy", "zstd"):
+        options = {} if compressor == "none" else {"compressors": compressor}
+        client = MongoClient(uri, **options)
+        collection = client[DB_NAME]["reads"]
+        for label, projection in (("full", None), ("retrieval", RETRIEVAL_PROJECTION)):
+            sizes, latencies = [], []
+            for _ in range(rounds):
+                batch = [ids[i] for i in rng.choice(len(ids), size=fetch_k, replace=False)]
+                start = time.perf_counter()
+                docs = list(collection.find({"_id": {"$in": batch}}, projection))
+                latencies.append(time.perf_counter() - start)
+                sizes.append(sum(len(bson.encode(doc)) for doc in docs))
+            print(f"{compressor:<12}{label:<12}{statistics.median(latencies) * 1000:>10.2f}"
+                  f"{statistics.mean(sizes) / 1024:>10.1f}")
+        client.close()
+
+
+def bench_pool(uri: str, threads: int, requests: int) -> None:
+    print(f"\n## Pool sizing ({threads} threads, {requests} reads)")
+    print(f"{'maxPoolSize':<14}{'p50 ms':>9}{'p95 ms':>9}{'timeouts':>10}")
+    for pool_size in (1, 4, 16, 50):
+        client = MongoClient(uri, maxPoolSize=pool_size, waitQueueTimeoutMS=2000)
+        collection = client[DB_NAME]["reads"]
+        collection.find_one({}, {"_id": 1})  # warm up
+
+        def one(_: int, collection=collection) -> float | None:
+            start = time.perf_counter()
+            try:
+                list(collection.find({}, RETRIEVAL_PROJECTION).limit(20))
+            except Exception:
+                return None
+            return time.perf_counter() - start
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(one, range(requests)))
+        latencies = sorted(r for r in results if r is not None)
+        p50 = statistics.median(latencies) if latencies else float("nan")
+        p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else float("nan")
+        print(f"{pool_size:<14}{p50 * 1000:>9.2f}{p95 * 1000:>9.2f}"
+              f"{results.count(None):>10}")
+        client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--encoding", default="array", choices=["array", "float32", "int8"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=32)
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, serverSelectionTimeoutMS=3000)
+    client.admin.command("ping")
+    chunks = make_chunks(args.chunks, args.dim, args.encoding)
+    print(f"chunks={args.chunks} dim={args.dim} encoding={args.encoding} "
+          f"avg_bytes={statistics.mean(len(bson.encode(c)) for c in chunks[:50]):,.0f}")
+
+    try:
+        bench_writes(client, chunks, args.batch_size)
+        bench_reads(args.uri, chunks, args.fetch_k, args.rounds)
+        bench_pool(args.uri, args.threads, args.rounds * 5)
+    finally:
+        client.drop_database(DB_NAME)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
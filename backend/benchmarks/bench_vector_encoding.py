@@ -0,0 +1,115 @@
+"""
+Storage size and recall of the chunk vector encodings.
+
+Runs offline — no MongoDB or OpenAI calls. Sizes are measured by encoding
+realistic chunk documents to BSON; recall compares the candidate ranking
+``$vectorSearch`` would produce on each encoding against exact float32
+cosine search, before and after full-precision rescoring.
+
+Usage:
+    python -m benchmarks.bench_vector_encoding
+    python -m benchmarks.bench_vector_encoding --embeddings vectors.npy  # real embeddings
+"""
+from __future__ import annotations
+
+import argparse
+
+import bson
+import numpy as np
+
+from app.infrastructure.vector_codec import decode_vector, encode_query, encode_vector
+
+# PyPDFLoader-style metadata repeated on every chunk of a document.
+DOC_METADATA = {
+    "producer": "Microsoft® Word for Microsoft 365",
+    "creator": "Microsoft® Word for Microsoft 365",
+    "creationdate": "2024-09-12T10:41:07-05:00",
+    "moddate": "2024-09-12T10:41:07-05:00",
+    "author": "Course Staff",
+    "title": "Lecture Notes",
+    "total_pages": 42,
+}
+CHUNK_METADATA = {
+    "source": "lecture-notes.pdf",
+    "file_hash": "0" * 32,
+    "chunk_hash": "1" * 32,
+    "tenant_id": "default",
+    "page": 7,
+    "page_label": "8",
+}
+
+
+def synthetic_embeddings(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    """Clustered, anisotropic unit vectors — closer to real embeddings than iid noise."""
+    rng = np.random.default_rng(seed)
+    scales = 1.0 / np.sqrt(np.arange(1, dim + 1))
+    centers = rng.normal(size=(max(n // 50, 1), dim)) * scales
+    vectors = centers[rng.integers(len(centers), size=n)] + 0.6 * rng.normal(size=(n, dim)) * scales
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def chunk_bytes(vector: np.ndarray, encoding: str) -> int:
+    """BSON size of one stored chunk in ``encoding``."""
+    doc = {"_id": bson.ObjectId(), "text": "x" * 1200, **CHUNK_METADATA}
+    if encoding == "array":
+        doc.update(DOC_METADATA)  # legacy layout repeats document metadata
+    doc.update(encode_vector(vector.tolist(), encoding))
+    return len(bson.encode(doc))
+
+
+def normalized(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def recall(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--embeddings", help=".npy file of shape (n, dim)")
+    parser.add_argument("--n", type=int, default=20_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = normalized(np.load(args.embeddings).astype(np.float32))
+    else:
+        corpus = synthetic_embeddings(args.n + args.queries, args.dim)
+    queries, corpus = corpus[: args.queries], corpus[args.queries:]
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, : args.k]
+
+    print(f"corpus={len(corpus)} dim={corpus.shape[1]} queries={len(queries)} "
+          f"k={args.k} fetch_k={args.fetch_k}\n")
+    print(f"{'encoding':<10}{'bytes/chunk':>12}{'vs array':>10}"
+          f"{'recall@k':>11}{'rescored':>11}")
+
+    baseline = chunk_bytes(corpus[0], "array")
+    for encoding in ("array", "float32", "int8"):
+        stored = [encode_vector(v.tolist(), encoding) for v in corpus]
+        # What the index sees (first stage) and what rescoring reads.
+        indexed = normalized(np.stack([decode_vector({"embedding": d["embedding"]}) for d in stored]))
+        rescoring = np.stack([decode_vector(d) for d in stored])
+        encoded_queries = normalized(np.stack([
+            decode_vector({"embedding": encode_query(q.tolist(), encoding)}) for q in queries
+        ]))
+
+        first_stage = np.argsort(-(encoded_queries @ indexed.T), axis=1)
+        plain = first_stage[:, : args.k]
+        candidates = first_stage[:, : args.fetch_k]
+        rescored = np.stack([
+            cand[np.argsort(-(normalized(rescoring[cand]) @ q))][: args.k]
+            for cand, q in zip(candidates, queries)
+        ])
+
+        size = chunk_bytes(corpus[0], encoding)
+        print(f"{encoding:<10}{size:>12,}{baseline / size:>9.1f}x"
+              f"{recall(plain, truth):>11.3f}{recall(rescored, truth):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Recall, index size and search cost of reduced-dimension search vectors.
+
+For each candidate ``SEARCH_DIMENSIONS`` this simulates the two-stage
+retrieval in ``search_chunks``: exact search over the truncated (and
+encoded) vectors for ``fetch_k`` candidates, then rescoring on the full
+vectors. Recall is measured against exact search on the full vectors.
+Search time is brute force with numpy — a proxy for the per-candidate
+distance cost inside the vector index, which scales with dimensions.
+
+Usage:
+    python -m benchmarks.eval_reduced_dims
+    python -m benchmarks.eval_reduced_dims --embeddings vectors.npy   # (n, dim) array
+    python -m benchmarks.eval_reduced_dims --from-mongo 20000         # stored chunks (needs MONGO_URI)
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.infrastructure.vector_codec import decode_vector, encode_query, encode_search_vector
+from benchmarks.bench_vector_encoding import normalized, recall, synthetic_embeddings
+
+# Bytes per indexed component as held by the vector index.
+INDEX_BYTES = {"array": 4, "float32": 4, "int8": 1}
+
+
+def load_from_mongo(limit: int) -> np.ndarray:
+    """Full vectors of up to ``limit`` live chunks of the default tenant."""
+    from app.infrastructure.vector_codec import RESCORE_FIELD
+    from app.infrastructure.vector_store import LIVE_CHUNK_FILTER, _get_mongo_collection
+
+    cursor = _get_mongo_collection().find(LIVE_CHUNK_FILTER, {"embedding": 1, RESCORE_FIELD: 1}).limit(limit)
+    return np.stack([decode_vector(chunk) for chunk in cursor])
+
+
+def search(queries: np.ndarray, index: np.ndarray, top: int) -> tuple[np.ndarray, float]:
+    """Exact top-``top`` ids per query and the median ms per query."""
+    timings = []
+    for _ in range(3):
+        start = time.perf_counter()
+        scores = queries @ index.T
+        ids = np.argpartition(-scores, top, axis=1)[:, :top]
+        timings.append(time.perf_counter() - start)
+    # argpartition leaves the top ids unordered; sort them by score.
+    order = np.take_along_axis(scores, ids, axis=1).argsort(axis=1)[:, ::-1]
+    ids = np.take_along_axis(ids, order, axis=1)
+    return ids, min(timings) * 1000 / len(queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--embeddings", help=".npy file of shape (n, dim)")
+    source.add_argument("--from-mongo", type=int, metavar="N", help="sample N stored chunk vectors")
+    parser.add_argument("--n", type=int, default=20_000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--dims", default="128,256,512,768", help="search dimensions to evaluate")
+    parser.add_argument("--encoding", default="float32", choices=["array", "float32", "int8"])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--fetch-k", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = normalized(np.load(args.embeddings).astype(np.float32))
+    elif args.from_mongo:
+        corpus = normalized(load_from_mongo(args.from_mongo))
+    else:
+        corpus = synthetic_embeddings(args.n + args.queries, args.dim)
+    queries, corpus = corpus[: args.queries], corpus[args.queries:]
+    full_dim = corpus.shape[1]
+    truth, full_ms = search(queries, corpus, args.k)
+
+    print(f"corpus={len(corpus)} dim={full_dim} queries={len(queries)} encoding={args.encoding} "
+          f"k={args.k} fetch_k={args.fetch_k}\n")
+    print(f"{'dims':>6}{'index B/vec':>13}{'vs full':>9}{'ms/query':>10}{'speedup':>9}"
+          f"{'recall@k':>11}{'rescored':>11}")
+    print(f"{full_dim:>6}{full_dim * INDEX_BYTES[args.encoding]:>13,}{1:>8.1f}x"
+          f"{full_ms:>10.3f}{1:>8.1f}x{1:>11.3f}{1:>11.3f}")
+
+    for dims in sorted(int(d) for d in args.dims.split(",") if 0 < int(d) < full_dim):
+        # What the index holds for each chunk, and what the query becomes.
+        index = normalized(np.stack([
+            decode_vector(encode_search_vector(v, args.encoding, dims), field=f"embedding_{dims}")
+            for v in corpus
+        ]))
+        encoded_queries = normalized(np.stack([
+            decode_vector({"embedding": encode_query(q.tolist(), args.encoding, dims)}) for q in queries
+        ]))
+
+        candidates, ms = search(encoded_queries, index, args.fetch_k)
+        plain = candidates[:, : args.k]
+        rescored = np.stack([
+            cand[np.argsort(-(corpus[cand] @ q))][: args.k]
+            for cand, q in zip(candidates, queries)
+        ])
+        print(f"{dims:>6}{dims * INDEX_BYTES[args.encoding]:>13,}{full_dim / dims:>8.1f}x"
+              f"{ms:>10.3f}{full_ms / ms:>8.1f}x"
+              f"{recall(plain, truth):>11.3f}{recall(rescored, truth):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Replay captured traffic against a running instance.
+
+Reads a capture log written with ``CAPTURE_ENABLED=true`` and re-sends
+the same workload to ``--url``, preserving arrival times (compressed by
+``--speed``), question lengths and repeats, providers, chat sessions,
+upload sizes and per-client rate limiting (each captured client gets its
+own ``X-Forwarded-For`` address). Request bodies are synthetic.
+
+Run the target with ``STUB_PROVIDERS=true`` so no LLM or embedding calls
+are billed; MongoDB and everything in the app still run for real.
+
+Usage:
+    python -m benchmarks.replay_traffic data/capture.jsonl
+    python -m benchmarks.replay_traffic data/capture.jsonl --url http://localhost:5000 --speed 4
+    python -m benchmarks.replay_traffic data/capture.jsonl --speed 10 --endpoints query --limit 5000
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+WORDS = (
+    "what how why explain difference between vector index retrieval lecture notes "
+    "chapter theorem proof example database query model training gradient loss "
+    "summary definition algorithm complexity memory network layer attention"
+).split()
+
+PATHS = {"query": "/api/query", "upload": "/api/documents/upload", "text": "/api/documents/text"}
+
+
+@dataclass
+class Result:
+    endpoint: str
+    status: int          # 0 = connection error / timeout
+    seconds: float
+    lag: float           # how late the request was sent vs. its schedule
+
+
+def load_capture(path: str, endpoints: set[str], limit: int | None) -> list[dict]:
+    with open(path) as file:
+        records = [json.loads(line) for line in file if line.strip()]
+    records = sorted((r for r in records if r["endpoint"] in endpoints), key=lambda r: r["t"])
+    return records[:limit] if limit else records
+
+
+def synthetic_text(chars: int, seed: str) -> str:
+    """Deterministic word salad of about ``chars`` characters."""
+    rng = random.Random(seed)
+    words: list[str] = []
+    while sum(len(w) + 1 for w in words) < max(chars, 1):
+        words.append(rng.choice(WORDS))
+    return " ".join(words)[:max(chars, 1)]
+
+
+def synthetic_pdf(size: int) -> bytes:
+    """A valid, unique single-page text PDF of roughly ``size`` bytes."""
+    lines = [f"replay {uuid.uuid4().hex}"]
+    budget = max(size - 600, 100)
+    while sum(len(line) + 12 for line in lines) < budget:
+        lines.append(synthetic_text(80, f"{lines[0]}{len(lines)}"))
+    stream = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+        "/Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream",
+    ]
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode()
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return out
+
+
+def client_address(client: str) -> str:
+    """Stable fake IPv4 address for a captured client id."""
+    value = int(client[:6], 16) if client else 0
+    return f"10.{value >> 16 & 255}.{value >> 8 & 255}.{value & 255}"
+
+
+def build_request(record: dict, base_url: str, tenant: str | None) -> urllib.request.Request:
+    endpoint = record["endpoint"]
+    headers = {"X-Forwarded-For": client_address(record.get("client", ""))}
+    if tenant:
+        headers["X-Tenant-ID"] = tenant
+
+    if endpoint == "query":
+        body: dict = {
+            "question": synthetic_text(record.get("question_chars", 60), record.get("q", "")),
+            "provider": record.get("provider") or "openai",
+        }
+        if record.get("session"):
+            body["session_id"] = record["session"]
+        data = json.dumps(body).encode()
+        headers["Content-Type"] = "application/json"
+    elif endpoint == "text":
+        text = f"replay {uuid.uuid4().hex} " + synthetic_text(record.get("text_chars", 1000), uuid.uuid4().hex)
+        data = json.dumps({"text": text, "source": "replay"}).encode()
+        headers["Content-Type"] = "application/json"
+    else:
+        boundary = uuid.uuid4().hex
+        data = (
+            f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"replay.pdf\"\r\n"
+            "Content-Type: application/pdf\r\n\r\n"
+        ).encode() + synthetic_pdf(record.get("bytes", 50_000)) + f"\r\n--{boundary}--\r\n".encode()
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+    return urllib.request.Request(base_url + PATHS[endpoint], data=data, headers=headers, method="POST")
+
+
+def send(request: urllib.request.Request, endpoint: str, scheduled: float, timeout: float) -> Result:
+    started = time.monotonic()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = 0
+    return Result(endpoint, status, time.monotonic() - started, started - scheduled)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def report(results: list[Result], wall: float, offered: float) -> None:
+    print(f"\n{len(results)} requests in {wall:.1f}s  "
+          f"(offered {offered:.2f} req/s, completed {len(results) / wall:.2f} req/s)")
+    print(f"{'endpoint':<10}{'count':>7}{'2xx':>7}{'429':>6}{'4xx':>6}{'5xx':>6}{'conn':>6}"
+          f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    by_endpoint: dict[str, list[Result]] = defaultdict(list)
+    for result in results:
+        by_endpoint[result.endpoint].append(result)
+    by_endpoint["all"] = results
+    for endpoint, group in by_endpoint.items():
+        classes = Counter(
+            "429" if r.status == 429 else "conn" if r.status == 0 else f"{r.status // 100}xx"
+            for r in group
+        )
+        ok = [r.seconds * 1000 for r in group if 200 <= r.status < 300]
+        print(f"{endpoint:<10}{len(group):>7}{classes['2xx']:>7}{classes['429']:>6}{classes['4xx']:>6}"
+              f"{classes['5xx']:>6}{classes['conn']:>6}{percentile(ok, 50):>9.0f}{percentile(ok, 90):>9.0f}"
+              f"{percentile(ok, 99):>9.0f}{max(ok, default=0):>9.0f}")
+    errors = sum(1 for r in results if r.status == 0 or r.status >= 500)
+    print(f"error rate {errors / max(len(results), 1):.2%}; "
+          f"rate-limited {sum(1 for r in results if r.status == 429) / max(len(results), 1):.2%}")
+    lag = percentile([r.lag for r in results], 99)
+    if lag > 0.1:
+        print(f"warning: p99 send lag {lag:.2f}s — raise --concurrency, the client is the bottleneck")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("capture", help="capture log (JSON lines)")
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--speed", type=float, default=1.0, help="time compression (4 = 4x faster)")
+    parser.add_argument("--endpoints", default="query,upload,text")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--tenant", help="send every request as this tenant")
+    parser.add_argument("--concurrency", type=int, default=64, help="max requests in flight")
+    parser.add_argument("--timeout", type=float, default=130.0)
+    args = parser.parse_args()
+
+    records = load_capture(args.capture, set(args.endpoints.split(",")), args.limit)
+    if not records:
+        raise SystemExit("No matching requests in the capture log.")
+    span = (records[-1]["t"] - records[0]["t"]) / args.speed
+    print(f"Replaying {len(records)} requests over {span:.1f}s at {args.speed}x against {args.url}")
+
+    results: list[Result] = []
+    lock = threading.Lock()
+
+    def run(record: dict, scheduled: float) -> None:
+        result = send(build_request(record, args.url, args.tenant), record["endpoint"], scheduled, args.timeout)
+        with lock:
+            results.append(result)
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for record in records:
+            scheduled = start + (record["t"] - records[0]["t"]) / args.speed
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(run, record, scheduled)
+    wall = time.monotonic() - start
+
+    report(results, wall, len(records) / max(span, 1.0))
+
+
+if __name__ == "__main__":
+    main()
@@ -27,8 +27,25 @@ class Settings(BaseSettings):
     mongo_uri: str = ""
     mongo_db_name: str = "RagProject"
     mongo_collection_name: str = "Notes"
+    mongo_documents_collection_name: str = "Documents"   # one record per ingested file
+    mongo_tenants_collection_name: str = "Tenants"       # status + corpus version per tenant
     atlas_vector_search_index: str = "vector_index"
 
+    # ── MongoDB Transport ─────────────────────────────────────────────
+    mongo_max_pool_size: int = 50
+    mongo_min_pool_size: int = 0
+    mongo_max_idle_time_ms: int = 60_000          # close idle pooled sockets after this
+    mongo_wait_queue_timeout_ms: int = 5_000      # max wait for a free pooled socket
+    mongo_server_selection_timeout_ms: int = 5_000
+    mongo_compressors: str = "zstd,snappy,zlib"   # offered to the server in order; "" disables
+    # Both default to the URI's settings (Atlas: primary reads, w=majority).
+    # "secondaryPreferred" reads may miss chunks uploaded a moment ago, and
+    # w=1 ingests can be rolled back on failover; opt in knowingly.
+    mongo_read_preference: str = ""               # retrieval reads only, e.g. "secondaryPreferred"
+    mongo_ingest_write_concern: str = ""          # ingestion writes only, e.g. "1"
+    mongo_insert_batch_size: int = 500            # chunks per insert_many call
+    mongo_ping_on_connect: bool = False           # blocking ping when the client is created
+
     # ── Defaults ──────────────────────────────────────────────────────
     default_llm_provider: Literal["openai", "anthropic"] = "openai"
     default_openai_model: str = "gpt-4o-mini"
@@ -38,19 +55,117 @@ class Settings(BaseSettings):
     # ── Retrieval ─────────────────────────────────────────────────────
     retrieval_k: int = 8
     retrieval_fetch_k: int = 20
+    retrieval_search_type: Literal["mmr", "similarity"] = "mmr"   # similarity skips fetching vectors
+
+    # ── Vector Storage ────────────────────────────────────────────────
+    # "array" (BSON doubles), "float32" or "int8" (BSON vector binary).
+    # Applies to newly written chunks. Binary encodings also move shared
+    # PDF metadata to the document registry; int8 keeps a float16 copy
+    # of each vector for rescoring.
+    vector_encoding: Literal["array", "float32", "int8"] = "array"
+    # Output size of EMBEDDING_MODEL; the full vector is kept for rescoring.
+    embedding_dimensions: int = 1536
+    # Size of the indexed search vector (a renormalized prefix of the full
+    # one, e.g. 256). 0 indexes the full vector. Changing it on an existing
+    # collection needs `flask vectors backfill` — see README.
+    search_dimensions: int = 0
+
+    # ── Query Rewriting ───────────────────────────────────────────────
+    # Vague questions are rewritten by the summary model while a first
+    # retrieval pass runs on the raw question; the rewrite is only used
+    # if that pass scores poorly.
+    rewrite_enabled: bool = False
+    rewrite_timeout_seconds: float = 1.5          # max wait for a rewrite after it starts
+    rewrite_min_score: float = 0.75               # first-pass top score that skips the rewrite
+    rewrite_cache_size: int = 512                 # rewrites cached per worker
+
+    # ── Hierarchical Summaries ────────────────────────────────────────
+    # Per-section and per-document summary nodes, built at ingest with a
+    # cheap model, let retrieval pick documents before searching chunks.
+    # The summary model also folds chat history and rewrites queries.
+    summaries_enabled: bool = False               # costs LLM calls on every upload
+    summary_provider: Literal["openai", "anthropic"] = "openai"
+    summary_model: str = "gpt-4o-mini"
+    summary_section_chars: int = 12_000           # approximate text per section summary
+    summary_max_concurrency: int = 4              # parallel section summary calls
+    coarse_min_documents: int = 20                # coarse-to-fine only above this corpus size
+    coarse_k: int = 10                            # summary nodes selected by the coarse stage
+
+    # ── Conversation Memory ───────────────────────────────────────────
+    memory_enabled: bool = True                   # requests with a session_id keep history
+    memory_db_path: str = "data/memory.sqlite"    # LangGraph checkpoints (one file per host)
+    memory_turns: int = 3                         # recent turns kept verbatim in the prompt
+    memory_summary_words: int = 150               # cap on the rolling summary of older turns
+
+    # ── Generation Resilience ─────────────────────────────────────────
+    llm_failover_enabled: bool = True     # hedge / fail over to the other configured provider
+    llm_timeout_seconds: float = 40.0     # per-provider call timeout (gunicorn kills at 120s)
+    llm_hedge_percentile: float = 95.0    # hedge once the primary is slower than this percentile
+    llm_hedge_min_delay: float = 2.0      # never hedge sooner than this (seconds)
+    llm_hedge_initial_delay: float = 8.0  # hedge delay until enough latency samples exist
+    llm_max_concurrency: int = 8          # in-flight calls per provider per worker
+    llm_breaker_failures: int = 5         # consecutive failures that open the circuit
+    llm_breaker_cooldown: float = 30.0    # seconds before a tripped provider is retried
+
+    # ── Prompt Caching ────────────────────────────────────────────────
+    prompt_caching_enabled: bool = True   # mark static prompt prefixes as cacheable
 
     # ── Chunking ──────────────────────────────────────────────────────
     chunk_size: int = 1200
     chunk_overlap: int = 300
 
+    # ── Deletion ──────────────────────────────────────────────────────
+    tombstone_grace_seconds: int = 300   # tombstoned chunks are purged after this delay
+    # Purged chunks leave a tiny stub so snapshot deltas can list the
+    # deletion; older stubs are deleted and deltas from before them refused.
+    deletion_stub_retention_seconds: int = 30 * 24 * 3600
+
+    # ── Profiling ─────────────────────────────────────────────────────
+    # Admin-only: POST /api/admin/profile samples a worker; an X-Profile: 1
+    # header cProfiles one request. Output is written per host.
+    profile_dir: str = "data/profiles"
+    profile_max_seconds: float = 30.0          # cap on one sampling session
+    profile_interval_ms: int = 10              # sampling period (100 Hz)
+    profile_request_min_interval: float = 10.0   # seconds between profiled requests per worker
+    profile_keep: int = 20                     # newest profile files kept
+
+    # ── Traffic Capture & Replay ──────────────────────────────────────
+    # Capture logs anonymized query/upload shapes for
+    # benchmarks/replay_traffic.py; stub providers replace the LLM and
+    # embedding APIs with offline fakes on the instance under test.
+    capture_enabled: bool = False
+    capture_path: str = "data/capture.jsonl"   # shared by all workers on a host
+    capture_salt: str = ""                     # key for hashed ids; random per worker if empty
+    capture_queue_size: int = 10_000           # records buffered before new ones are dropped
+    stub_providers: bool = False               # never enable in production
+    stub_llm_latency_ms: int = 800             # mean simulated LLM call latency
+    stub_embedding_latency_ms: int = 50        # mean simulated embeddings call latency
+
+    # ── Multi-Tenancy ─────────────────────────────────────────────────
+    default_tenant_id: str = "default"   # uses the un-suffixed collections
+    tenant_cache_size: int = 64          # vector store handles kept in memory
+    tenant_cache_ttl: float = 5.0        # seconds to trust a cached tenant record / index check
+    # X-Tenant-ID is taken as sent. Unless this is set, only tenants created
+    # with PUT /api/tenants/<id> are served and other ids get a 404; only
+    # enable it when a trusted proxy sets the header.
+    tenant_auto_provision: bool = False
+
     # ── Rate Limiting ─────────────────────────────────────────────────
     rate_limit_queries: int = 5       # max queries per window per IP
     rate_limit_uploads: int = 3       # max uploads per window per IP
     rate_limit_window: int = 3600     # sliding window in seconds (1 hour)
     max_upload_size_mb: int = 5       # max PDF upload size in MB
 
+    # ── Logging ───────────────────────────────────────────────────────
+    # Records go through a bounded queue to a background writer thread.
+    log_level: str = "INFO"
+    log_format: Literal["json", "text"] = "json"   # json: one object per line
+    log_queue_size: int = 10_000                   # records buffered before new ones are dropped
+    log_info_sample_rate: float = 1.0              # share of requests whose INFO lines are kept
+
     # ── Server ────────────────────────────────────────────────────────
     flask_debug: bool = False
+    admin_api_token: str = ""   # X-Admin-Token for admin endpoints; empty disables them
     cors_origins: str = "*"
 
 
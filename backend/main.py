@@ -7,37 +7,43 @@ Usage:
 """
 from __future__ import annotations
 
-import logging
-import sys
-
 from flask import Flask
 from flask_cors import CORS
 
 from config import settings
+from app.api.cli import register_cli
 from app.api.errors import register_error_handlers
+from app.api.request_context import register_request_context
 from app.api.routes import api_bp
+from app.api.traffic_capture import register_traffic_capture
+from app.infrastructure.logging_pipeline import configure_logging
 
 
 def create_app() -> Flask:
     """Build and configure the Flask application."""
-    # Logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s  %(name)-30s  %(levelname)-7s  %(message)s",
-        stream=sys.stdout,
-    )
+    # Logging — queued JSON records, written off the request path
+    configure_logging()
 
     app = Flask(__name__)
 
     # CORS — allow frontend origins
     CORS(app, origins=settings.cors_origins.split(","))
 
+    # Correlation id for logs (X-Request-ID)
+    register_request_context(app)
+
     # Register blueprints
     app.register_blueprint(api_bp)
 
     # Register global error handlers
     register_error_handlers(app)
 
+    # Record request shapes for load replay (CAPTURE_ENABLED)
+    register_traffic_capture(app)
+
+    # Register CLI commands (`flask vectors ...`)
+    register_cli(app)
+
     return app
 
 
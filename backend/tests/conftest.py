@@ -0,0 +1,45 @@
+"""
+Shared pytest fixtures.
+
+Tests run without MongoDB or provider keys: anything that would reach
+Atlas or an LLM API is replaced per test with ``monkeypatch``.
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+# Make ``app``, ``config`` and ``main`` importable when pytest runs from backend/.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.api import rate_limiter  # noqa: E402
+from config import settings  # noqa: E402
+from main import create_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+@pytest.fixture
+def client(app):
+    rate_limiter._state.clear()
+    return app.test_client()
+
+
+@pytest.fixture
+def mongo_db(monkeypatch):
+    """An empty in-memory database (skips the test without ``mongomock``)."""
+    mongomock = pytest.importorskip("mongomock")
+    # mongomock's bulk builder predates the ``sort`` argument newer pymongo passes.
+    builder = mongomock.collection.BulkOperationBuilder
+    for name in ("add_replace", "add_update"):
+        original = getattr(builder, name)
+        monkeypatch.setattr(
+            builder, name,
+            lambda self, *args, sort=None, _original=original, **kw: _original(self, *args, **kw),
+        )
+    return mongomock.MongoClient()[settings.mongo_db_name]
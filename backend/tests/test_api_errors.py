@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import pytest
+
+from app.api import routes
+from app.domain.models import DocumentInfo
+from config import settings
+
+
+def test_invalid_tenant_id_is_a_bad_request(client):
+    response = client.get("/api/documents", headers={"X-Tenant-ID": "../admin"})
+    assert response.status_code == 400
+    assert "Invalid tenant id" in response.get_json()["error"]
+
+
+def test_evicting_the_default_tenant_is_a_bad_request(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_token", "secret")
+    response = client.delete(f"/api/tenants/{settings.default_tenant_id}", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "The default tenant cannot be evicted."}
+
+
+@pytest.mark.parametrize("raise_error", [
+    lambda: DocumentInfo(file_hash="abc"),  # pydantic ValidationError on a bad stored record
+    lambda: int("not a number"),
+])
+def test_unexpected_value_errors_are_server_errors(client, monkeypatch, raise_error):
+    monkeypatch.setattr(routes, "list_documents", lambda tenant_id: raise_error())
+    response = client.get("/api/documents")
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Internal server error"}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from bson import BSON
+from pymongo.errors import OperationFailure
+
+from app.domain.models import RetrievalFilter
+from app.infrastructure import vector_store
+from app.infrastructure.vector_codec import RESCORE_FIELD, encode_vector
+from config import settings
+
+
+class SearchCollection:
+    """Returns every stored chunk from ``aggregate``, cut to the ``$project`` stage."""
+
+    name = "Notes"
+
+    def __init__(self, chunks: list[dict], filter_paths=tuple(vector_store.FILTER_FIELDS), status="READY"):
+        self.chunks = chunks
+        self.pipelines: list[list[dict]] = []
+        self.filter_paths = filter_paths
+        self.status = status
+
+    def list_search_indexes(self, name):
+        if self.filter_paths is None:
+            raise OperationFailure("search index management is not supported")
+        fields = [{"type": "vector", "path": "embedding"}]
+        fields += [{"type": "filter", "path": path} for path in self.filter_paths]
+        return [{"name": name, "status": self.status, "latestDefinition": {"fields": fields}}]
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        projection = next(stage["$project"] for stage in pipeline if "$project" in stage)
+        results = []
+        for chunk in self.chunks:
+            stored = BSON.decode(BSON.encode(chunk))
+            result = {key: value for key, value in stored.items() if key == "_id" or projection.get(key) == 1}
+            result["score"] = 0.5
+            results.append(result)
+        return results
+
+
+def _unit(values: list[float]) -> list[float]:
+    array = np.asarray(values, dtype=np.float32)
+    return (array / np.linalg.norm(array)).tolist()
+
+
+@pytest.fixture
+def search(monkeypatch):
+    query = _unit([1.0, 0.0, 0.0, 0.0])
+    monkeypatch.setattr(vector_store, "embed_query", lambda text: query)
+    monkeypatch.setattr(vector_store, "_rehydrate_document_metadata", lambda documents, tenant_id: None)
+    monkeypatch.setattr(settings, "search_dimensions", 0)
+    monkeypatch.setattr(settings, "retrieval_search_type", "similarity")
+    monkeypatch.setattr(vector_store, "_index_filter_paths", {})
+
+    def run(chunks: list[dict], **index) -> tuple[list, SearchCollection]:
+        collection = SearchCollection(chunks, **index)
+        monkeypatch.setattr(vector_store, "_search_collection", lambda tenant_id: collection)
+        pre_filter = vector_store.build_pre_filter(RetrievalFilter(file_hash="h1"))
+        documents = vector_store.search_chunks("question", tenant_id="acme", pre_filter=pre_filter, k=2, fetch_k=4)
+        return documents, collection
+
+    return run
+
+
+def test_int8_search_rescores_chunks_written_before_the_switch(search, monkeypatch):
+    monkeypatch.setattr(settings, "vector_encoding", "int8")
+    old = {"_id": 1, "text": "old", **encode_vector(_unit([0.9, 0.1, 0.0, 0.0]), "array")}
+    new = {"_id": 2, "text": "new", **encode_vector(_unit([0.1, 0.9, 0.0, 0.0]), "int8")}
+
+    documents, collection = search([old, new])
+
+    projection = collection.pipelines[0][-1]["$project"]
+    assert projection["embedding"] == projection[RESCORE_FIELD] == 1
+    assert [doc.page_content for doc in documents] == ["old", "new"]
+    assert documents[0].metadata["score"] > documents[1].metadata["score"]
+    assert all("embedding" not in doc.metadata and RESCORE_FIELD not in doc.metadata for doc in documents)
+
+
+def test_full_float_similarity_search_sends_no_vectors(search, monkeypatch):
+    monkeypatch.setattr(settings, "vector_encoding", "float32")
+    chunk = {"_id": 1, "text": "only", **encode_vector(_unit([1.0, 0.0, 0.0, 0.0]), "float32")}
+
+    documents, collection = search([chunk])
+
+    projection = collection.pipelines[0][-1]["$project"]
+    assert "embedding" not in projection and RESCORE_FIELD not in projection
+    assert documents[0].metadata["score"] == 0.5
+
+
+def test_filters_are_applied_inside_the_search_when_indexed(search, monkeypatch):
+    monkeypatch.setattr(settings, "vector_encoding", "float32")
+    _, collection = search([])
+
+    (stage, _) = collection.pipelines[0]
+    assert stage["$vectorSearch"]["limit"] == 2
+    assert stage["$vectorSearch"]["filter"]["$and"][-1] == {"file_hash": {"$eq": "h1"}}
+
+
+@pytest.mark.parametrize("index", [
+    {"filter_paths": ("file_hash", "source", "page")},  # declared before tombstones and summaries
+    {"status": "PENDING"},  # new definition still building
+    {"filter_paths": None},  # shared (M0) cluster
+])
+def test_undeclared_filter_fields_are_matched_after_the_search(search, monkeypatch, index):
+    monkeypatch.setattr(settings, "vector_encoding", "float32")
+    _, collection = search([], **index)
+
+    search_stage, match, limit, _ = collection.pipelines[0]
+    assert search_stage["$vectorSearch"]["limit"] == 2 * vector_store._POST_FILTER_OVERSAMPLING
+    pre = search_stage["$vectorSearch"].get("filter", {"$and": []})["$and"]
+    assert vector_store.LIVE_CHUNK_FILTER not in pre and vector_store.TEXT_CHUNK_FILTER not in pre
+    assert vector_store.LIVE_CHUNK_FILTER in match["$match"]["$and"]
+    assert vector_store.TEXT_CHUNK_FILTER in match["$match"]["$and"]
+    assert limit == {"$limit": 2}
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+from langchain_core.documents import Document
+
+from app.application import conversation_memory, rag_graph
+from app.application.conversation_memory import is_follow_up, remember, standalone_question
+from config import settings
+
+
+@pytest.mark.parametrize("question", [
+    "Why is that?",
+    "give an example of it",
+    "Can you elaborate?",
+    "What about their performance?",
+    "How does it scale?",
+    "Tell me more.",
+])
+def test_follow_ups(question):
+    assert is_follow_up(question)
+
+
+@pytest.mark.parametrize("question", [
+    "What is the mitochondria and what is their function?",
+    "Explain gradient descent",
+    "How does this relate to the attention layer in transformers?",
+    "What is a B-tree?",
+    "",
+])
+def test_standalone_questions(question):
+    assert not is_follow_up(question)
+
+
+def test_standalone_question_prepends_the_previous_question():
+    history = [{"question": "What is MMR retrieval?", "answer": "..."}]
+    assert standalone_question("Why is that useful?", history) == "What is MMR retrieval? Why is that useful?"
+    assert standalone_question("What is a B-tree?", history) == "What is a B-tree?"
+    assert standalone_question("Why is that?", []) == "Why is that?"
+
+
+def test_remember_keeps_the_window_and_folds_the_overflow(monkeypatch):
+    monkeypatch.setattr(settings, "memory_turns", 2)
+    folded = []
+    monkeypatch.setattr(
+        conversation_memory, "fold_turns",
+        lambda summary, turns: folded.append(turns) or f"{summary}+{len(turns)}",
+    )
+    history, summary = [], ""
+    for i in range(4):
+        history, summary = remember(f"q{i}", f"a{i}", history, summary)
+    assert [turn["question"] for turn in history] == ["q2", "q3"]
+    assert summary == "+1+1"
+    assert [turns[0]["question"] for turns in folded] == ["q0", "q1"]
+
+
+def test_failed_fold_keeps_turns_for_later(monkeypatch):
+    monkeypatch.setattr(settings, "memory_turns", 1)
+
+    def fail(summary, turns):
+        raise RuntimeError("provider down")
+
+    monkeypatch.setattr(conversation_memory, "fold_turns", fail)
+    history, summary = remember("q1", "a1", [{"question": "q0", "answer": "a0"}], "old")
+    assert [turn["question"] for turn in history] == ["q0", "q1"]
+    assert summary == "old"
+
+
+# ── Retrieval on a session ───────────────────────────────────────────
+
+
+def _doc(text: str) -> Document:
+    return Document(page_content=text, metadata={"_id": text, "source": "notes.pdf", "score": 0.9})
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Record every search the retrieve node runs."""
+    queries: list[str] = []
+
+    def search(question, tenant_id, filters):
+        queries.append(question)
+        return [_doc(f"new:{question}")]
+
+    monkeypatch.setattr(rag_graph, "_search", search)
+    monkeypatch.setattr(rag_graph, "has_corpus", lambda tenant_id: True)
+    return queries
+
+
+def _state(question: str, **extra) -> rag_graph.GraphState:
+    return {
+        "question": question,
+        "tenant_id": "acme",
+        "filters": None,
+        "documents": [_doc("old chunk 1"), _doc("old chunk 2")],
+        "history": [{"question": "What are ribosomes?", "answer": "..."}],
+        **extra,
+    }
+
+
+def test_follow_up_is_retrieved_with_context_and_keeps_previous_chunks(searches):
+    result = rag_graph.retrieve(_state("Why is that?"))
+    assert searches == ["What are ribosomes? Why is that?"]
+    assert [doc.page_content for doc in result["documents"]] == [
+        "new:What are ribosomes? Why is that?", "old chunk 1", "old chunk 2",
+    ]
+    assert result["rewritten_question"] == "What are ribosomes? Why is that?"
+
+
+def test_new_topic_on_a_session_is_retrieved_from_scratch(searches):
+    question = "What is the mitochondria and what is their function?"
+    result = rag_graph.retrieve(_state(question))
+    assert searches == [question]
+    assert [doc.page_content for doc in result["documents"]] == [f"new:{question}"]
+    assert result["rewritten_question"] is None
+
+
+def test_previous_chunks_are_not_duplicated(searches, monkeypatch):
+    monkeypatch.setattr(rag_graph, "_search", lambda q, t, f: [_doc("old chunk 1")])
+    result = rag_graph.retrieve(_state("Why is that?"))
+    assert [doc.page_content for doc in result["documents"]] == ["old chunk 1", "old chunk 2"]
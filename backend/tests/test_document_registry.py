@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import pytest
+from langchain_core.documents import Document
+from pymongo.errors import BulkWriteError
+
+from app.infrastructure import vector_store
+from config import settings
+
+
+class FakeEmbeddings:
+    def embed_documents(self, texts):
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts]
+
+
+@pytest.fixture
+def db(monkeypatch, mongo_db):
+    monkeypatch.setattr(vector_store, "get_vector_store", lambda tenant_id=None: None)
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: FakeEmbeddings())
+    monkeypatch.setattr(vector_store, "_pending_corpus_version", lambda tenant_id: 1)
+    monkeypatch.setattr(vector_store, "_get_mongo_collection", lambda tenant_id=None: mongo_db.chunks)
+    monkeypatch.setattr(vector_store, "_ingest_collection", lambda tenant_id=None: mongo_db.chunks)
+    monkeypatch.setattr(vector_store, "get_documents_collection", lambda tenant_id=None: mongo_db.documents)
+    monkeypatch.setattr(settings, "vector_encoding", "float32")
+    monkeypatch.setattr(settings, "search_dimensions", 0)
+    return mongo_db
+
+
+def _chunks(file_hash: str, **shared) -> list[Document]:
+    return [
+        Document(page_content=text, metadata={"file_hash": file_hash, "source": "notes.pdf", "page": 0, **shared})
+        for text in ("intro", "methods")
+    ]
+
+
+def test_shared_metadata_is_moved_to_the_registry(db):
+    vector_store.store_documents(_chunks("h1", producer="TeX"), tenant_id="acme")
+
+    assert all("producer" not in chunk for chunk in db.chunks.find())
+    assert db.documents.find_one({"_id": "h1"})["doc_metadata"] == {"producer": "TeX"}
+
+
+def test_failed_insert_leaves_no_registry_record(db, monkeypatch):
+    def fail(*args, **kwargs):
+        raise BulkWriteError({"writeErrors": [], "nInserted": 0})
+
+    monkeypatch.setattr(db.chunks, "insert_many", fail)
+    with pytest.raises(BulkWriteError):
+        vector_store.store_documents(_chunks("h1", producer="TeX"), tenant_id="acme")
+
+    assert db.documents.find_one({"_id": "h1"}) is None
+    assert not vector_store.document_exists("h1", tenant_id="acme")
+
+
+def test_unfinished_ingest_is_not_listed(db):
+    db.documents.insert_one({"_id": "h1", "doc_metadata": {"producer": "TeX"}})
+    vector_store.register_document("h2", "done.pdf", pages=1, chunks=2, tenant_id="acme")
+
+    assert [record["file_hash"] for record in vector_store.list_documents(tenant_id="acme")] == ["h2"]
+    assert vector_store.get_summary_coverage(tenant_id="acme") == (1, ["h2"])
+    assert not vector_store.document_exists("h1", tenant_id="acme")
+
+
+def test_update_carries_metadata_of_kept_chunks(db):
+    db.documents.insert_one({"_id": "old", "source": "v1.pdf", "doc_metadata": {"producer": "TeX", "pages": 3}})
+    db.documents.insert_one({"_id": "new", "source": "v2.pdf", "doc_metadata": {"pages": 4}})
+
+    vector_store.carry_document_metadata("old", "new", tenant_id="acme")
+    assert db.documents.find_one({"_id": "new"})["doc_metadata"] == {"pages": 4, "producer": "TeX"}
+
+
+def test_update_without_new_chunks_keeps_metadata(db):
+    db.documents.insert_one({"_id": "old", "source": "v1.pdf", "doc_metadata": {"producer": "TeX"}})
+    vector_store.register_document("new", "v2.pdf", pages=1, chunks=2, tenant_id="acme")
+
+    vector_store.carry_document_metadata("old", "new", tenant_id="acme")
+    assert db.documents.find_one({"_id": "new"})["doc_metadata"] == {"producer": "TeX"}
+
+
+def test_legacy_documents_are_registered_from_their_chunks(db):
+    from app.application import document_service
+
+    db.chunks.insert_many([
+        {"text": "a", "file_hash": "h1", "source": "/tmp/tmpx/notes.pdf", "page": 0},
+        {"text": "b", "file_hash": "h1", "source": "/tmp/tmpx/notes.pdf", "page": 4},
+        {"text": "s", "file_hash": "h1", "node_type": vector_store.SUMMARY_NODE, "level": "document"},
+        {"text": "c", "file_hash": "h2", "source": "user_input"},
+        {"text": "gone", "file_hash": "h3", "source": "old.pdf", "deleted": True},
+        {"text": "pre-hash", "source": "user_input"},
+    ])
+
+    documents = {doc.file_hash: doc for doc in document_service.list_documents(tenant_id="acme")}
+    assert set(documents) == {"h1", "h2"}
+    assert (documents["h1"].pages, documents["h1"].chunks, documents["h1"].summarized) == (5, 2, True)
+    assert (documents["h2"].pages, documents["h2"].chunks, documents["h2"].summarized) == (0, 1, False)
+    assert documents["h1"].uploaded_at is not None
+
+    # Registered documents are not rewritten.
+    assert vector_store.backfill_document_registry(tenant_id="acme") == 0
+
+
+def test_backfill_completes_records_of_unfinished_ingests(db):
+    db.chunks.insert_one({"text": "a", "file_hash": "h1", "source": "notes.pdf", "page": 0})
+    db.documents.insert_one({"_id": "h1", "doc_metadata": {"producer": "TeX"}})
+
+    assert vector_store.backfill_document_registry(tenant_id="acme") == 1
+    record = db.documents.find_one({"_id": "h1"})
+    assert record["source"] == "notes.pdf" and record["doc_metadata"] == {"producer": "TeX"}
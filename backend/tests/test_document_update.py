@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import pytest
+from langchain_core.documents import Document
+
+from app.application import document_service
+from app.infrastructure.pdf_parser import compute_file_hash, compute_text_hash
+from config import settings
+
+
+class FakeCorpus:
+    """Records what update_pdf writes instead of touching MongoDB."""
+
+    def __init__(self, monkeypatch, stored_texts: list[str], new_texts: list[str]):
+        self.stored = [{"_id": f"id-{i}", "chunk_hash": compute_text_hash(t)} for i, t in enumerate(stored_texts)]
+        self.inserted: list[Document] = []
+        self.retagged: list = []
+        self.tombstoned: list = []
+        self.registered: list = []
+        self.registry_calls: list = []
+        patches = {
+            "ensure_active": lambda tenant_id: None,
+            "get_live_chunk_hashes": lambda file_hash, tenant_id: list(self.stored),
+            "get_summary_nodes": lambda file_hash, tenant_id: [],
+            "load_pdf": lambda path: [Document(page_content="\n".join(new_texts), metadata={"page": 0})],
+            "chunk_documents": lambda docs: [Document(page_content=t, metadata={"page": 0}) for t in new_texts],
+            "store_documents": lambda docs, tenant_id: self.inserted.extend(docs) or len(docs),
+            "retag_chunks": lambda kept, tenant_id: self.retagged.extend(kept),
+            "tombstone_chunks": lambda ids, tenant_id: self.tombstoned.extend(ids),
+            "unregister_document": lambda file_hash, tenant_id: self.registry_calls.append(("unregister", file_hash)),
+            "register_document": lambda file_hash, source, **kw: self.registered.append(file_hash),
+            "carry_document_metadata": lambda old, new, tenant_id: self.registry_calls.append(("carry", old, new)),
+            "bump_corpus_version": lambda tenant_id: 1,
+            "schedule_compaction": lambda tenant_id: None,
+        }
+        for name, fake in patches.items():
+            monkeypatch.setattr(document_service, name, fake)
+        monkeypatch.setattr(settings, "summaries_enabled", False)
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "notes.pdf"
+    path.write_bytes(b"%PDF-1.4 new version")
+    return path
+
+
+def test_only_changed_chunks_are_embedded(monkeypatch, pdf):
+    corpus = FakeCorpus(monkeypatch, ["intro", "methods", "results"], ["intro", "methods v2", "results"])
+    response = document_service.update_pdf(pdf, "old-hash", tenant_id="acme")
+
+    assert [doc.page_content for doc in corpus.inserted] == ["methods v2"]
+    assert sorted(_id for _id, _ in corpus.retagged) == ["id-0", "id-2"]
+    assert corpus.tombstoned == ["id-1"]
+    assert all(fields["file_hash"] == compute_file_hash(pdf) for _, fields in corpus.retagged)
+    assert (response.chunks_stored, response.chunks_unchanged, response.chunks_removed) == (1, 2, 1)
+    assert corpus.registered == [compute_file_hash(pdf)]
+    # Metadata stripped from kept chunks moves before the old record goes.
+    assert corpus.registry_calls == [("carry", "old-hash", compute_file_hash(pdf)), ("unregister", "old-hash")]
+
+
+def test_repeated_chunks_are_matched_as_a_multiset(monkeypatch, pdf):
+    corpus = FakeCorpus(monkeypatch, ["header", "header", "body"], ["header", "body", "body"])
+    document_service.update_pdf(pdf, "old-hash", tenant_id="acme")
+
+    assert [doc.page_content for doc in corpus.inserted] == ["body"]
+    assert len(corpus.retagged) == 2
+    assert len(corpus.tombstoned) == 1
+
+
+def test_identical_file_changes_nothing(monkeypatch, pdf):
+    corpus = FakeCorpus(monkeypatch, ["intro"], ["intro"])
+    response = document_service.update_pdf(pdf, compute_file_hash(pdf), tenant_id="acme")
+
+    assert response.already_existed and response.chunks_unchanged == 1
+    assert corpus.inserted == corpus.retagged == corpus.tombstoned == []
+
+
+def test_unknown_document_returns_none(monkeypatch, pdf):
+    corpus = FakeCorpus(monkeypatch, [], ["intro"])
+    assert document_service.update_pdf(pdf, "missing", tenant_id="acme") is None
+    assert corpus.inserted == []
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import sys
+
+import pytest
+
+from app.application import query_rewriter
+from app.infrastructure import logging_pipeline, metrics
+from app.infrastructure.logging_pipeline import (
+    BoundedQueueHandler,
+    JsonFormatter,
+    RequestContextFilter,
+    SamplingFilter,
+    request_id_var,
+)
+
+
+def _record(msg="hello %s", args=("world",), level=logging.INFO, exc_info=None) -> logging.LogRecord:
+    return logging.LogRecord("app.test", level, __file__, 10, msg, args, exc_info)
+
+
+def test_records_are_tagged_with_the_request_id():
+    token = request_id_var.set("req-42")
+    try:
+        record = _record()
+        assert RequestContextFilter().filter(record)
+        assert record.request_id == "req-42"
+    finally:
+        request_id_var.reset(token)
+    record = _record()
+    RequestContextFilter().filter(record)
+    assert record.request_id == "-"
+
+
+def test_json_formatter_writes_one_object_per_line():
+    record = _record()
+    record.request_id = "req-1"
+    line = JsonFormatter().format(record)
+    assert "\n" not in line
+    entry = json.loads(line)
+    assert entry["msg"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["request_id"] == "req-1"
+    assert {"ts", "pid", "thread"} <= set(entry)
+    assert "exc" not in entry
+
+
+def test_prepared_records_carry_the_rendered_traceback():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = _record(level=logging.ERROR, exc_info=sys.exc_info())
+    prepared = BoundedQueueHandler(queue.Queue()).prepare(record)
+    assert prepared.exc_info is None and prepared.args is None
+    entry = json.loads(JsonFormatter().format(prepared))
+    assert entry["msg"] == "hello world"
+    assert "ValueError: boom" in entry["exc"]
+
+
+def test_full_queue_drops_and_counts(monkeypatch):
+    monkeypatch.setattr(logging_pipeline, "_listener_pid", os.getpid())
+    handler = BoundedQueueHandler(queue.Queue(maxsize=1))
+    before = metrics.snapshot().get("logging.dropped", 0)
+    handler.emit(_record())
+    handler.emit(_record())
+    assert handler.queue.qsize() == 1
+    assert metrics.snapshot()["logging.dropped"] == before + 1
+
+
+def test_sampling_is_per_request_and_keeps_warnings():
+    sampler = SamplingFilter(0.5)
+    decisions = set()
+    for _ in range(5):
+        record = _record()
+        record.request_id = "req-7"
+        decisions.add(sampler.filter(record))
+    assert len(decisions) == 1
+    kept = 0
+    for i in range(1000):
+        record = _record()
+        record.request_id = f"req-{i}"
+        kept += sampler.filter(record)
+    assert 400 < kept < 600
+    warning = _record(level=logging.WARNING)
+    warning.request_id = "req-dropped"
+    assert SamplingFilter(0.0).filter(warning)
+
+
+def test_request_id_header_is_echoed_or_generated(client):
+    response = client.get("/api/health", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["X-Request-ID"] == "abc-123"
+    generated = client.get("/api/health", headers={"X-Request-ID": "bad id; rm -rf"})
+    assert generated.headers["X-Request-ID"] != "bad id; rm -rf"
+    assert len(generated.headers["X-Request-ID"]) == 16
+
+
+def test_rewrite_threads_see_the_request_id(monkeypatch):
+    monkeypatch.setattr(query_rewriter, "_cache", query_rewriter.OrderedDict())
+    monkeypatch.setattr(query_rewriter, "_rewrite", lambda question: request_id_var.get())
+    token = request_id_var.set("req-rewrite")
+    try:
+        key = query_rewriter.start_rewrite("what does it mean for request ids")
+        _, future = query_rewriter._cache[key]
+        assert future.result(timeout=5) == "req-rewrite"
+    finally:
+        request_id_var.reset(token)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork")
+def test_forked_worker_starts_its_own_listener(app):
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:  # child: behaves like a gunicorn worker forked after --preload
+        try:
+            logging.getLogger("app.test").info("from the worker")
+            listener = logging_pipeline._listener
+            ok = logging_pipeline._listener_pid == os.getpid() and listener._thread.is_alive()
+            os.write(write_fd, b"1" if ok else b"0")
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    try:
+        assert os.read(read_fd, 1) == b"1"
+    finally:
+        os.close(read_fd)
+        os.waitpid(pid, 0)
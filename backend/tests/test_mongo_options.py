@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import pytest
+from pymongo import ReadPreference, WriteConcern
+
+from app.infrastructure import vector_store
+from config import settings
+
+
+class FakeCollection:
+    def __init__(self, **options):
+        self.options = options
+
+    def with_options(self, **options):
+        return FakeCollection(**{**self.options, **options})
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    monkeypatch.setattr(vector_store, "_get_mongo_collection", lambda tenant_id=None: FakeCollection())
+    monkeypatch.setattr(vector_store, "get_vector_store", lambda tenant_id=None: None)
+
+
+def test_uri_settings_are_kept_by_default(collection, monkeypatch):
+    monkeypatch.setattr(settings, "mongo_read_preference", "")
+    monkeypatch.setattr(settings, "mongo_ingest_write_concern", "")
+    assert vector_store._search_collection("acme").options == {}
+    assert vector_store._ingest_collection("acme").options == {}
+
+
+def test_relaxed_settings_are_opt_in(collection, monkeypatch):
+    monkeypatch.setattr(settings, "mongo_read_preference", "secondaryPreferred")
+    monkeypatch.setattr(settings, "mongo_ingest_write_concern", "1")
+    assert vector_store._search_collection("acme").options == {
+        "read_preference": ReadPreference.SECONDARY_PREFERRED,
+    }
+    assert vector_store._ingest_collection("acme").options == {"write_concern": WriteConcern(w=1)}
+
+
+def test_named_write_concern(collection, monkeypatch):
+    monkeypatch.setattr(settings, "mongo_ingest_write_concern", "majority")
+    assert vector_store._ingest_collection(None).options == {"write_concern": WriteConcern(w="majority")}
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import threading
+from collections import Counter
+
+import pytest
+
+from app.api import routes
+from app.infrastructure import profiler
+from config import settings
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture(autouse=True)
+def profiles(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "admin_api_token", "secret")
+    monkeypatch.setattr(settings, "profile_dir", str(tmp_path))
+    monkeypatch.setattr(settings, "profile_request_min_interval", 60.0)
+    monkeypatch.setattr(profiler, "_last_request_profile", 0.0)
+    return tmp_path
+
+
+def _join_sampler() -> None:
+    for thread in threading.enumerate():
+        if thread.name == "profiler":
+            thread.join(timeout=5)
+
+
+@pytest.mark.parametrize("headers", [{}, {"X-Admin-Token": "wrong"}])
+def test_request_profile_needs_the_admin_token(client, headers):
+    response = client.get("/api/health", headers={"X-Profile": "1", **headers})
+    assert response.status_code == 403
+    assert not profiler._request_lock.locked()
+
+
+def test_request_profiles_are_rate_limited(client, profiles):
+    first = client.get("/api/health", headers={"X-Profile": "1", **ADMIN})
+    assert first.status_code == 200
+    assert first.headers["X-Profile"].endswith(".prof")
+    assert (profiles / first.headers["X-Profile"]).is_file()
+
+    second = client.get("/api/health", headers={"X-Profile": "1", **ADMIN})
+    assert second.status_code == 200
+    assert second.headers["X-Profile"] == "skipped"
+    assert not profiler._request_lock.locked()
+
+
+def test_failed_request_still_releases_the_profiler(client, monkeypatch):
+    monkeypatch.setattr(routes, "list_documents", lambda tenant_id: 1 / 0)
+    response = client.get("/api/documents", headers={"X-Profile": "1", **ADMIN})
+
+    assert response.status_code == 500
+    assert response.headers["X-Profile"].endswith(".prof")
+    assert not profiler._request_lock.locked()
+
+
+def test_one_sampling_session_per_worker(client, monkeypatch):
+    release = threading.Event()
+    monkeypatch.setattr(profiler, "sample_stacks", lambda seconds, interval: release.wait(5) and Counter())
+
+    try:
+        first = client.post("/api/admin/profile?seconds=1", headers=ADMIN)
+        assert first.status_code == 202
+        second = client.post("/api/admin/profile?seconds=1", headers=ADMIN)
+        assert second.status_code == 409
+    finally:
+        release.set()
+        _join_sampler()
+
+    assert client.post("/api/admin/profile?seconds=1", headers=ADMIN).status_code == 202
+    _join_sampler()
+    assert not profiler._sampling_lock.locked()
+
+
+def test_sampling_needs_the_admin_token(client):
+    assert client.post("/api/admin/profile").status_code == 403
+    assert not profiler._sampling_lock.locked()
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.messages import AIMessage
+
+from app.application import rag_graph
+from app.application.rag_graph import SYSTEM_PROMPT, build_messages, extract_token_usage
+from app.infrastructure import metrics
+from config import settings
+
+
+@pytest.fixture
+def documents() -> list[Document]:
+    return [
+        Document(page_content="results", metadata={"source": "b.pdf", "page": 2}),
+        Document(page_content="intro", metadata={"source": "a.pdf", "page": 0}),
+        Document(page_content="methods", metadata={"source": "b.pdf", "page": 1}),
+    ]
+
+
+def _blocks(messages):
+    system, human = messages
+    return system.content, human.content
+
+
+def test_anthropic_gets_breakpoints_on_system_and_context(documents, monkeypatch):
+    monkeypatch.setattr(settings, "prompt_caching_enabled", True)
+    system, blocks = _blocks(build_messages("Why?", documents, "anthropic", conversation="User: hi"))
+
+    assert system == [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}]
+    context, conversation, question = blocks
+    assert context["cache_control"] == {"type": "ephemeral"}
+    # Blocks after the last breakpoint change every turn and are never marked.
+    assert "cache_control" not in conversation and "cache_control" not in question
+    assert conversation["text"].endswith("User: hi")
+    assert question["text"].startswith("Question: Why?")
+
+
+@pytest.mark.parametrize("provider, enabled", [("openai", True), ("anthropic", False)])
+def test_no_breakpoints_elsewhere(documents, monkeypatch, provider, enabled):
+    monkeypatch.setattr(settings, "prompt_caching_enabled", enabled)
+    system, blocks = _blocks(build_messages("Why?", documents, provider))
+    assert all("cache_control" not in block for block in [*system, *blocks])
+
+
+def test_context_order_does_not_depend_on_retrieval_order(documents, monkeypatch):
+    monkeypatch.setattr(settings, "prompt_caching_enabled", True)
+    first = build_messages("Why?", documents, "anthropic")
+    second = build_messages("Why?", list(reversed(documents)), "anthropic")
+
+    assert first == second
+    context = _blocks(first)[1][0]["text"]
+    assert context.index("intro") < context.index("methods") < context.index("results")
+
+
+def test_openai_cache_key_follows_the_prefix(documents, monkeypatch):
+    monkeypatch.setattr(settings, "prompt_caching_enabled", True)
+    key = rag_graph._invoke_kwargs("openai", build_messages("Why?", documents, "openai"))["prompt_cache_key"]
+
+    assert key == rag_graph._invoke_kwargs("openai", build_messages("How?", documents[::-1], "openai"))["prompt_cache_key"]
+    assert key != rag_graph._invoke_kwargs("openai", build_messages("Why?", documents[:1], "openai"))["prompt_cache_key"]
+    assert rag_graph._invoke_kwargs("anthropic", build_messages("Why?", documents, "anthropic")) == {}
+
+
+def test_token_usage_includes_cache_reads_and_writes():
+    message = AIMessage(content="ok", usage_metadata={
+        "input_tokens": 1200, "output_tokens": 80, "total_tokens": 1280,
+        "input_token_details": {"cache_read": 1024, "cache_creation": 0},
+    })
+    assert extract_token_usage(message) == {
+        "input_tokens": 1200, "output_tokens": 80, "cache_read_tokens": 1024, "cache_write_tokens": 0,
+    }
+
+
+def test_token_usage_without_metadata_is_zero():
+    assert extract_token_usage(AIMessage(content="ok")) == {
+        "input_tokens": 0, "output_tokens": 0, "cache_read_tokens": 0, "cache_write_tokens": 0,
+    }
+
+
+def test_metrics_require_the_admin_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "admin_api_token", "secret")
+    metrics.increment("tokens.input", 5)
+
+    assert client.get("/api/metrics").status_code == 403
+    response = client.get("/api/metrics", headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    assert response.get_json()["tokens.input"] >= 5
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import pytest
+
+from app.application import rag_graph
+from app.application.query_rewriter import normalize_question, should_rewrite
+
+
+@pytest.fixture
+def started(monkeypatch):
+    calls: list[str] = []
+    monkeypatch.setattr(rag_graph, "start_rewrite", lambda q: calls.append(q) or normalize_question(q))
+    return calls
+
+
+def test_vague_question_starts_a_rewrite(started, monkeypatch):
+    monkeypatch.setattr(rag_graph, "has_corpus", lambda tenant_id: True)
+    result = rag_graph.rewrite({"question": "can you explain this stuff", "tenant_id": "acme"})
+    assert started == ["can you explain this stuff"]
+    assert result["rewrite_key"] == "can you explain this stuff"
+
+
+def test_no_rewrite_for_a_tenant_without_documents(started, monkeypatch):
+    monkeypatch.setattr(rag_graph, "has_corpus", lambda tenant_id: False)
+    result = rag_graph.rewrite({"question": "can you explain this stuff", "tenant_id": "empty"})
+    assert started == []
+    assert result == {"rewrite_key": ""}
+
+
+def test_precise_short_questions_are_not_rewritten():
+    assert not should_rewrite("B-tree page split cost")
+    assert should_rewrite("what does it mean")
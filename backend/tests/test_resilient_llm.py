@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from app.infrastructure import metrics, resilient_llm
+from app.infrastructure.resilient_llm import CircuitBreaker, LatencyTracker, invoke_with_failover
+from config import settings
+
+
+class LoopBoundLLM:
+    """
+    Fake chat model that behaves like the provider SDKs' cached async
+    HTTP client: usable only from the event loop it was first used on.
+    """
+
+    def __init__(self, name: str, *, delay: float = 0.0, fail: bool = False) -> None:
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def ainvoke(self, messages, **kwargs):
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif self._loop is not loop or self._loop.is_closed():
+            raise RuntimeError("Event loop is closed")
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError(f"{self.name} is down")
+        return AIMessage(content=f"answer from {self.name}")
+
+
+@pytest.fixture
+def providers(monkeypatch):
+    """Fresh breakers and latency windows, and fake models for both providers."""
+    monkeypatch.setattr(settings, "openai_api_key", "test")
+    monkeypatch.setattr(settings, "anthropic_api_key", "test")
+    monkeypatch.setattr(settings, "llm_failover_enabled", True)
+    monkeypatch.setattr(settings, "llm_hedge_initial_delay", 0.05)
+    monkeypatch.setattr(settings, "llm_timeout_seconds", 2.0)
+    monkeypatch.setattr(resilient_llm, "_breakers", {p: CircuitBreaker(p) for p in ("openai", "anthropic")})
+    monkeypatch.setattr(resilient_llm, "_latency", {p: LatencyTracker() for p in ("openai", "anthropic")})
+    models = {"openai": LoopBoundLLM("openai"), "anthropic": LoopBoundLLM("anthropic")}
+    monkeypatch.setattr(resilient_llm, "get_llm", lambda provider, **_: models[provider])
+    return models
+
+
+def _build(provider: str):
+    return [HumanMessage(content="hi")], {}
+
+
+def test_consecutive_calls_reuse_one_event_loop(providers):
+    failures_before = metrics.snapshot().get("llm.openai.failures", 0)
+    for _ in range(5):
+        message, provider = invoke_with_failover("openai", _build)
+        assert (message.content, provider) == ("answer from openai", "openai")
+    assert providers["openai"].calls == 5
+    assert metrics.snapshot().get("llm.openai.failures", 0) == failures_before
+
+
+def test_slow_primary_is_hedged(providers):
+    providers["openai"].delay = 1.0
+    message, provider = invoke_with_failover("openai", _build)
+    assert provider == "anthropic"
+    assert message.content == "answer from anthropic"
+
+
+def test_failed_primary_fails_over(providers):
+    providers["anthropic"].fail = True
+    _, provider = invoke_with_failover("anthropic", _build)
+    assert provider == "openai"
+
+
+def test_all_providers_failing_raises(providers):
+    providers["openai"].fail = True
+    providers["anthropic"].fail = True
+    with pytest.raises(RuntimeError, match="All LLM providers failed"):
+        invoke_with_failover("openai", _build)
+
+
+def test_caller_context_is_visible_to_the_build_callback(providers):
+    marker: contextvars.ContextVar[str] = contextvars.ContextVar("marker", default="-")
+    seen = []
+
+    def build(provider):
+        seen.append(marker.get())
+        return _build(provider)
+
+    marker.set("req-1")
+    invoke_with_failover("openai", build)
+    assert seen == ["req-1"]
+
+
+def test_breaker_opens_after_consecutive_failures(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failures", 3)
+    monkeypatch.setattr(settings, "llm_breaker_cooldown", 60.0)
+    breaker = CircuitBreaker("test")
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+
+
+def test_breaker_half_open_allows_one_trial(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failures", 1)
+    monkeypatch.setattr(settings, "llm_breaker_cooldown", 0.0)
+    breaker = CircuitBreaker("test")
+    breaker.record_failure()
+    assert breaker.allow()          # the trial call
+    assert not breaker.allow()      # nothing else while it runs
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_failed_trial_reopens_the_circuit(monkeypatch):
+    monkeypatch.setattr(settings, "llm_breaker_failures", 1)
+    monkeypatch.setattr(settings, "llm_breaker_cooldown", 0.0)
+    breaker = CircuitBreaker("test")
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    monkeypatch.setattr(settings, "llm_breaker_cooldown", 60.0)
+    assert not breaker.allow()
+
+
+def test_hedge_delay_uses_the_latency_percentile(monkeypatch):
+    monkeypatch.setattr(settings, "llm_hedge_percentile", 90.0)
+    monkeypatch.setattr(settings, "llm_hedge_min_delay", 0.5)
+    monkeypatch.setattr(settings, "llm_hedge_initial_delay", 8.0)
+    tracker = LatencyTracker()
+    assert tracker.hedge_delay() == 8.0       # too few samples yet
+    for seconds in range(1, 101):
+        tracker.record(seconds / 10)
+    assert tracker.hedge_delay() == pytest.approx(9.1)
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from app.domain.models import RetrievalFilter
+from app.infrastructure.vector_store import (
+    LIVE_CHUNK_FILTER,
+    TEXT_CHUNK_FILTER,
+    build_pre_filter,
+)
+
+
+def test_pre_filter_always_excludes_tombstones_and_summaries():
+    assert build_pre_filter(None) == {"$and": [LIVE_CHUNK_FILTER, TEXT_CHUNK_FILTER]}
+
+
+def test_pre_filter_translates_every_field():
+    filters = RetrievalFilter(file_hash="abc", source="notes.pdf", page_from=2, page_to=5)
+    clauses = build_pre_filter(filters)["$and"]
+    assert clauses[2:] == [
+        {"file_hash": {"$eq": "abc"}},
+        {"source": {"$eq": "notes.pdf"}},
+        {"page": {"$gte": 2}},
+        {"page": {"$lte": 5}},
+    ]
+
+
+def test_pre_filter_adds_scope_before_user_filters():
+    scope = {"file_hash": {"$in": ["a", "b"]}}
+    clauses = build_pre_filter(RetrievalFilter(source="x"), scope)["$and"]
+    assert clauses[2] == scope
+    assert clauses[3] == {"source": {"$eq": "x"}}
+
+
+def test_open_page_range_only_bounds_one_side():
+    clauses = build_pre_filter(RetrievalFilter(page_from=3))["$and"]
+    assert clauses[2:] == [{"page": {"$gte": 3}}]
+
+
+def test_inverted_page_range_is_a_validation_error(client):
+    response = client.post("/api/query", json={
+        "question": "What is covered?",
+        "filters": {"page_from": 5, "page_to": 2},
+    })
+    assert response.status_code == 422
+    detail = response.get_json()["detail"]
+    assert "page_from must be <= page_to" in detail[0]["msg"]
+    assert "ctx" not in detail[0]
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+
+from app.application import snapshot_service
+from app.infrastructure import tenants, vector_store
+from app.infrastructure.snapshot_file import SnapshotReader, SnapshotWriter
+from app.infrastructure.stub_providers import StubEmbeddings
+from config import settings
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    path = tmp_path / "corpus.snap"
+    vectors = np.arange(12, dtype=np.float32).reshape(3, 4)
+    writer = SnapshotWriter(path, 4, {"tenant_id": "acme", "base_version": 2, "version": 5})
+    for i, vector in enumerate(vectors):
+        writer.add_chunk({"_id": f"c{i}", "text": f"chunk {i}", "page": i}, vector)
+    writer.add_deleted(["gone-1", "gone-2"])
+    writer.add_documents([{"_id": "f1", "source": "notes.pdf"}])
+    header = writer.close()
+    assert (header["chunks"], header["deleted"], header["documents"]) == (3, 2, 1)
+    assert not path.with_name("corpus.snap.tmp").exists()
+
+    reader = SnapshotReader(path)
+    assert reader.header["version"] == 5 and reader.header["dimensions"] == 4
+    batches = list(reader.iter_chunk_batches(2))
+    assert [len(chunks) for chunks, _ in batches] == [2, 1]
+    chunks = [chunk for batch, _ in batches for chunk in batch]
+    assert [chunk["text"] for chunk in chunks] == ["chunk 0", "chunk 1", "chunk 2"]
+    np.testing.assert_array_equal(np.vstack([v for _, v in batches]), vectors)
+    assert reader.deleted_ids() == ["gone-1", "gone-2"]
+    assert reader.documents() == [{"_id": "f1", "source": "notes.pdf"}]
+
+
+def test_wrong_vector_size_is_rejected(tmp_path):
+    writer = SnapshotWriter(tmp_path / "bad.snap", 4, {})
+    with pytest.raises(ValueError):
+        writer.add_chunk({"_id": 1}, np.zeros(3, dtype=np.float32))
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_non_snapshot_file_is_rejected(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"not a snapshot" * 400)
+    with pytest.raises(ValueError):
+        SnapshotReader(path)
+
+
+# ── Delta export / import against an in-memory MongoDB ───────────────
+
+
+@pytest.fixture
+def database(monkeypatch, mongo_db):
+    monkeypatch.setattr(vector_store, "get_database", lambda: mongo_db)
+    monkeypatch.setattr(tenants, "get_database", lambda: mongo_db)
+    monkeypatch.setattr(tenants, "_cache", {})
+    monkeypatch.setattr(vector_store, "get_vector_store", lambda tenant_id=None: None)
+    monkeypatch.setattr(vector_store, "get_embeddings", StubEmbeddings)
+    monkeypatch.setattr(settings, "stub_embedding_latency_ms", 0)
+    monkeypatch.setattr(settings, "embedding_dimensions", 8)
+    monkeypatch.setattr(settings, "search_dimensions", 0)
+    monkeypatch.setattr(snapshot_service, "schedule_compaction", lambda tenant_id: None)
+    return mongo_db
+
+
+def _ingest(file_hash: str, texts: list[str], tenant_id: str) -> None:
+    """Store a document the way document_service does, with shared PDF metadata."""
+    docs = [
+        Document(page_content=text, metadata={
+            "file_hash": file_hash, "source": f"{file_hash}.pdf", "page": i,
+            "producer": "LaTeX", "creationdate": "2026-01-01",
+        })
+        for i, text in enumerate(texts)
+    ]
+    vector_store.store_documents(docs, tenant_id=tenant_id)
+    vector_store.register_document(file_hash, f"{file_hash}.pdf", pages=len(texts), chunks=len(texts),
+                                   tenant_id=tenant_id)
+    tenants.bump_corpus_version(tenant_id)
+
+
+def _live_texts(db, tenant_id: str) -> list[str]:
+    collection = db[vector_store._tenant_collection_name(settings.mongo_collection_name, tenant_id)]
+    return sorted(chunk["text"] for chunk in collection.find(vector_store.LIVE_CHUNK_FILTER))
+
+
+@pytest.mark.parametrize("encoding", ["float32", "int8"])
+def test_delta_round_trip_with_binary_encoding(database, monkeypatch, tmp_path, encoding):
+    monkeypatch.setattr(settings, "vector_encoding", encoding)
+    _ingest("a", ["alpha one", "alpha two"], "src")
+    full = snapshot_service.export_snapshot(tmp_path / "full.snap", tenant_id="src")
+
+    _ingest("b", ["beta one", "beta two", "beta three"], "src")
+    removed = database["Notes__src"].find_one({"text": "alpha two"})["_id"]
+    vector_store.tombstone_chunks(ids=[removed], tenant_id="src")
+    tenants.bump_corpus_version("src")
+    delta = snapshot_service.export_snapshot(tmp_path / "delta.snap", tenant_id="src", since=full.version)
+
+    assert delta.chunks == 3
+    assert delta.deleted == 1
+
+    snapshot_service.import_snapshot(tmp_path / "full.snap", tenant_id="dst")
+    snapshot_service.import_snapshot(tmp_path / "delta.snap", tenant_id="dst")
+    assert _live_texts(database, "dst") == _live_texts(database, "src")
+    assert tenants.get_tenant("dst", refresh=True)["snapshot_version"] == delta.version
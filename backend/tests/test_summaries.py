@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+
+import pytest
+from langchain_core.documents import Document
+
+from app.application import summary_service
+from app.application.summary_service import assign_sections, summarize_document
+from config import settings
+
+
+def _chunks(texts: list[str]) -> list[Document]:
+    return [
+        Document(page_content=text, metadata={
+            "chunk_hash": hashlib.sha256(text.encode()).hexdigest(),
+            "page": i,
+        })
+        for i, text in enumerate(texts)
+    ]
+
+
+@pytest.fixture
+def small_sections(monkeypatch):
+    monkeypatch.setattr(settings, "summary_section_chars", 400)
+
+
+def _texts(n: int, prefix: str = "chunk") -> list[str]:
+    return [f"{prefix} {i} " + "lorem ipsum " * 10 for i in range(n)]
+
+
+def test_every_chunk_is_tagged_and_order_is_kept(small_sections):
+    chunks = _chunks(_texts(40))
+    sections = assign_sections(chunks)
+    assert [c for section in sections for c in section] == chunks
+    for section in sections:
+        assert len({c.metadata["section_hash"] for c in section}) == 1
+    assert len({s[0].metadata["section_hash"] for s in sections}) == len(sections)
+
+
+def test_sections_never_exceed_the_hard_cap(small_sections):
+    for section in assign_sections(_chunks(_texts(60))):
+        # The chunk that crosses the cap closes the section.
+        assert sum(len(c.page_content) for c in section[:-1]) < 2 * settings.summary_section_chars
+
+
+def test_an_edit_only_changes_nearby_sections(small_sections):
+    texts = _texts(60)
+    before = [s[0].metadata["section_hash"] for s in assign_sections(_chunks(texts))]
+    texts[45] = "edited " + texts[45]
+    after = [s[0].metadata["section_hash"] for s in assign_sections(_chunks(texts))]
+    assert len(set(before) & set(after)) >= len(before) - 3
+
+
+class FakeStore:
+    """Stands in for the summary-node storage functions."""
+
+    def __init__(self, monkeypatch, existing=()):
+        self.existing = list(existing)
+        self.prompts: list[str] = []
+        self.stored: list[Document] = []
+        self.retagged: list = []
+        self.tombstoned: list = []
+        monkeypatch.setattr(summary_service, "get_summary_nodes", lambda fh, tenant_id: list(self.existing))
+        monkeypatch.setattr(summary_service, "_summarize", self._summarize)
+        monkeypatch.setattr(summary_service, "store_documents", lambda docs, tenant_id: self.stored.extend(docs))
+        monkeypatch.setattr(summary_service, "retag_chunks", lambda kept, tenant_id: self.retagged.extend(kept))
+        monkeypatch.setattr(summary_service, "tombstone_chunks", lambda ids, tenant_id: self.tombstoned.extend(ids))
+
+    def _summarize(self, prompts):
+        self.prompts.extend(prompts)
+        return [f"summary {len(self.prompts) - len(prompts) + i}" for i in range(len(prompts))]
+
+    def as_existing(self):
+        return [
+            {"_id": i, "summary_hash": doc.metadata["summary_hash"], "text": doc.page_content}
+            for i, doc in enumerate(self.stored)
+        ]
+
+
+def _summarize_doc(sections):
+    return summarize_document(sections, file_hash="f1", source="notes.pdf", tenant_id="acme")
+
+
+def test_fan_out_one_summary_per_section_plus_the_document(small_sections, monkeypatch):
+    sections = assign_sections(_chunks(_texts(40)))
+    assert len(sections) > 1
+    store = FakeStore(monkeypatch)
+    assert _summarize_doc(sections) == len(sections) + 1
+    levels = [doc.metadata["level"] for doc in store.stored]
+    assert levels.count("section") == len(sections)
+    assert levels.count("document") == 1
+
+
+def test_unchanged_document_reuses_every_summary(small_sections, monkeypatch):
+    sections = assign_sections(_chunks(_texts(40)))
+    first = FakeStore(monkeypatch)
+    _summarize_doc(sections)
+
+    second = FakeStore(monkeypatch, existing=first.as_existing())
+    assert _summarize_doc(sections) == 0
+    assert second.prompts == []
+    assert len(second.retagged) == len(sections) + 1
+    assert second.tombstoned == []
+
+
+def test_edit_regenerates_changed_sections_and_the_document(small_sections, monkeypatch):
+    texts = _texts(40)
+    first = FakeStore(monkeypatch)
+    _summarize_doc(assign_sections(_chunks(texts)))
+
+    texts[-1] = "edited " + texts[-1]
+    sections = assign_sections(_chunks(texts))
+    second = FakeStore(monkeypatch, existing=first.as_existing())
+    generated = _summarize_doc(sections)
+    assert 2 <= generated < len(sections) + 1
+    assert any(doc.metadata["level"] == "document" for doc in second.stored)
+    assert len(second.retagged) == len(sections) - (generated - 1)
+    assert second.tombstoned  # the old document summary and edited section
+
+
+def test_single_section_documents_only_get_a_document_summary(monkeypatch):
+    sections = assign_sections(_chunks(_texts(2)))
+    assert len(sections) == 1
+    store = FakeStore(monkeypatch)
+    assert _summarize_doc(sections) == 1
+    assert store.stored[0].metadata["level"] == "document"
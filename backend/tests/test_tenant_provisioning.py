@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from app.api import routes
+from app.application import tenant_service
+from app.domain.models import TenantInfo
+from app.infrastructure import tenants
+from config import settings
+
+
+@pytest.fixture
+def known(monkeypatch):
+    """Tenant records by id; ``get_tenant`` reads from here instead of MongoDB."""
+    records: dict[str, dict] = {"acme": {"_id": "acme", "status": "active"}}
+    monkeypatch.setattr(tenants, "get_tenant", lambda tenant_id, refresh=False: records.get(tenant_id))
+    monkeypatch.setattr(settings, "tenant_auto_provision", False)
+    monkeypatch.setattr(settings, "admin_api_token", "secret")
+    return records
+
+
+@pytest.fixture
+def provisioned(monkeypatch):
+    """Collections whose vector index was built."""
+    built: list[str] = []
+    monkeypatch.setattr(tenant_service, "get_vector_store", built.append)
+    return built
+
+
+def _upload(client, tenant_id: str):
+    return client.post(
+        "/api/documents/upload",
+        data={"file": (io.BytesIO(b"%PDF-1.4"), "notes.pdf")},
+        content_type="multipart/form-data",
+        headers={"X-Tenant-ID": tenant_id},
+    )
+
+
+def test_upload_to_an_unknown_tenant_builds_nothing(client, known, provisioned, monkeypatch):
+    monkeypatch.setattr(routes, "ingest_pdf", lambda path, tenant_id: pytest.fail("ingested"))
+    response = _upload(client, "new-tenant")
+
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Unknown tenant 'new-tenant'."}
+    assert provisioned == []
+
+
+def test_known_and_default_tenants_are_served(client, known, monkeypatch):
+    monkeypatch.setattr(routes, "list_documents", lambda tenant_id: [])
+    assert client.get("/api/documents", headers={"X-Tenant-ID": "acme"}).status_code == 200
+    assert client.get("/api/documents").status_code == 200
+
+
+def test_auto_provision_accepts_any_valid_id(client, known, monkeypatch):
+    monkeypatch.setattr(settings, "tenant_auto_provision", True)
+    monkeypatch.setattr(routes, "list_documents", lambda tenant_id: [])
+    assert client.get("/api/documents", headers={"X-Tenant-ID": "new-tenant"}).status_code == 200
+
+
+def test_admin_creates_tenants(client, known, provisioned, monkeypatch):
+    def create(tenant_id):
+        created = tenant_id not in known
+        known.setdefault(tenant_id, {"_id": tenant_id, "status": "active"})
+        return created
+
+    monkeypatch.setattr(tenants, "create_tenant", create)
+    monkeypatch.setattr(tenant_service, "get_tenant_info", lambda tenant_id: TenantInfo(tenant_id=tenant_id))
+    headers = {"X-Admin-Token": "secret"}
+
+    assert client.put("/api/tenants/new-tenant").status_code == 403
+    assert client.put("/api/tenants/new-tenant", headers=headers).status_code == 201
+    assert client.put("/api/tenants/new-tenant", headers=headers).status_code == 200
+    assert provisioned == ["new-tenant", "new-tenant"]
@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+
+from app.application import document_service, snapshot_service
+from app.infrastructure import vector_store
+
+
+class RecordingCollection:
+    """Records the queries sent to a chunk collection."""
+
+    def __init__(self, newest_stub=None):
+        self.calls: list[tuple] = []
+        self.newest_stub = newest_stub
+
+    def update_many(self, query, update):
+        self.calls.append(("update_many", query, update))
+        return SimpleNamespace(modified_count=3)
+
+    def find_one(self, query, projection=None, sort=None):
+        self.calls.append(("find_one", query, sort))
+        return self.newest_stub
+
+    def delete_many(self, query):
+        self.calls.append(("delete_many", query))
+        return SimpleNamespace(deleted_count=2)
+
+
+def test_tombstones_are_excluded_from_every_search():
+    assert vector_store.LIVE_CHUNK_FILTER in vector_store.build_pre_filter(None)["$and"]
+
+
+def test_compaction_only_touches_expired_tombstones_and_leaves_a_stub(monkeypatch):
+    chunks = RecordingCollection()
+    monkeypatch.setattr(vector_store, "_get_mongo_collection", lambda tenant_id=None: chunks)
+    cutoff = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert vector_store.compact_tombstones(cutoff, tenant_id="acme") == 3
+    _, query, pipeline = chunks.calls[0]
+    assert query == {"deleted": True, "deleted_at": {"$lt": cutoff}}
+    stub = pipeline[0]["$replaceWith"]
+    assert set(stub) == {"_id", "deleted", "deleted_version", "purged_at"}
+    # Stubs no longer count as pending tombstones.
+    assert "deleted_at" not in stub
+
+
+def test_expiring_stubs_reports_the_newest_deletion_removed(monkeypatch):
+    chunks = RecordingCollection(newest_stub={"_id": 1, "deleted_version": 17})
+    monkeypatch.setattr(vector_store, "_get_mongo_collection", lambda tenant_id=None: chunks)
+    cutoff = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+    assert vector_store.expire_deletion_stubs(cutoff, tenant_id="acme") == 17
+    assert chunks.calls[0] == ("find_one", {"purged_at": {"$lt": cutoff}}, [("deleted_version", -1)])
+    assert chunks.calls[1] == ("delete_many", {"purged_at": {"$lt": cutoff}})
+
+
+def test_expiring_without_stubs_deletes_nothing(monkeypatch):
+    chunks = RecordingCollection(newest_stub=None)
+    monkeypatch.setattr(vector_store, "_get_mongo_collection", lambda tenant_id=None: chunks)
+    assert vector_store.expire_deletion_stubs(datetime.now(timezone.utc)) == 0
+    assert [call[0] for call in chunks.calls] == ["find_one"]
+
+
+def test_compaction_run_records_the_expired_version(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(document_service, "_pending_compaction", {"acme"})
+    monkeypatch.setattr(document_service, "compact_tombstones", lambda cutoff, tenant_id: 0)
+    monkeypatch.setattr(document_service, "expire_deletion_stubs", lambda cutoff, tenant_id: 9)
+    monkeypatch.setattr(document_service, "has_tombstones", lambda tenant_id: False)
+    monkeypatch.setattr(document_service, "record_stub_expiry", lambda *args: recorded.append(args))
+
+    document_service._run_compaction()
+    assert recorded == [("acme", 9)]
+
+
+def test_delta_from_before_expired_stubs_is_refused(monkeypatch, tmp_path):
+    monkeypatch.setattr(
+        snapshot_service.tenants, "get_tenant",
+        lambda tenant_id, refresh=False: {"corpus_version": 30, "stubs_expired_version": 12},
+    )
+    with pytest.raises(ValueError, match="Export a full snapshot"):
+        snapshot_service.export_snapshot(tmp_path / "delta.snap", tenant_id="acme", since=5)
+    assert not (tmp_path / "delta.snap").exists()
+
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import io
+
+import pytest
+
+from app.api import rate_limiter, traffic_capture
+from config import settings
+from main import create_app
+
+
+@pytest.fixture
+def captured(monkeypatch):
+    """App with capture on; records are collected instead of written."""
+    records: list[dict] = []
+    monkeypatch.setattr(settings, "capture_enabled", True)
+    monkeypatch.setattr(traffic_capture, "_enqueue", records.append)
+    rate_limiter._state.clear()
+    client = create_app().test_client()
+    return client, records
+
+
+def test_query_record_holds_shape_not_content(captured):
+    client, records = captured
+    question = "What did Professor Smith say about my thesis?"
+    client.post(
+        "/api/query",
+        json={"question": question, "provider": "anthropic", "session_id": "s-1",
+              "filters": {"page_from": 3, "page_to": 1}},
+        headers={"X-Forwarded-For": "203.0.113.9, 10.0.0.1", "X-Tenant-ID": "acme"},
+    )
+    (record,) = records
+    assert set(record) == {
+        "t", "endpoint", "status", "ms", "client", "tenant",
+        "question_chars", "q", "provider", "filters", "session",
+    }
+    assert record["endpoint"] == "query"
+    assert record["status"] == 422
+    assert record["question_chars"] == len(question)
+    assert record["provider"] == "anthropic" and record["filters"] is True
+    assert record["client"] == traffic_capture.anonymize("203.0.113.9")
+    assert record["tenant"] == traffic_capture.anonymize("acme")
+    assert record["session"] == traffic_capture.anonymize("s-1")
+    serialized = str(record)
+    for secret in ("Smith", "thesis", "203.0.113.9", "acme", "s-1"):
+        assert secret not in serialized
+
+
+def test_repeated_questions_share_a_hash(captured):
+    client, records = captured
+    for question in ("What is MMR?", "  what is   mmr? "):
+        client.post("/api/query", json={"question": question, "filters": {"page_from": 2, "page_to": 1}})
+    assert records[0]["q"] == records[1]["q"]
+
+
+def test_upload_record_only_has_the_size(captured):
+    client, records = captured
+    client.post(
+        "/api/documents/upload",
+        data={"file": (io.BytesIO(b"not a pdf"), "notes.txt")},
+        content_type="multipart/form-data",
+    )
+    (record,) = records
+    assert record["endpoint"] == "upload"
+    assert record["bytes"] > 0
+    assert "notes" not in str(record)
+
+
+def test_other_endpoints_are_not_captured(captured):
+    client, records = captured
+    client.get("/api/health")
+    assert records == []
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from bson import BSON
+from bson.binary import Binary
+
+from app.infrastructure.vector_codec import (
+    RESCORE_FIELD,
+    decode_vector,
+    encode_query,
+    encode_search_vector,
+    encode_vector,
+    quantize_int8,
+    search_vector_field,
+    truncate_vector,
+)
+
+
+@pytest.fixture
+def vector() -> list[float]:
+    rng = np.random.default_rng(7)
+    values = rng.standard_normal(64).astype(np.float32)
+    return (values / np.linalg.norm(values)).tolist()
+
+
+def _round_trip(fields: dict) -> dict:
+    """Decode what MongoDB would hand back for these fields."""
+    return BSON.decode(BSON.encode(fields))
+
+
+def test_array_encoding_is_stored_as_is(vector):
+    assert encode_vector(vector, "array") == {"embedding": vector}
+    np.testing.assert_allclose(decode_vector(_round_trip(encode_vector(vector, "array"))), vector, rtol=1e-6)
+
+
+def test_float32_round_trip_is_lossless(vector):
+    fields = encode_vector(vector, "float32")
+    assert isinstance(fields["embedding"], Binary)
+    np.testing.assert_array_equal(decode_vector(_round_trip(fields)), np.asarray(vector, dtype=np.float32))
+
+
+def test_int8_keeps_a_float16_copy_for_rescoring(vector):
+    fields = encode_vector(vector, "int8")
+    assert set(fields) == {"embedding", RESCORE_FIELD}
+    decoded = decode_vector(_round_trip(fields))
+    np.testing.assert_allclose(decoded, vector, atol=1e-3)
+
+
+def test_int8_without_rescore_copy_preserves_direction(vector):
+    stored = _round_trip(encode_vector(vector, "int8"))
+    del stored[RESCORE_FIELD]
+    decoded = decode_vector(stored)
+    cosine = decoded @ np.asarray(vector) / np.linalg.norm(decoded)
+    assert cosine > 0.999
+
+
+def test_quantize_int8_uses_the_full_range():
+    quantized = quantize_int8(np.array([0.5, -0.25, 0.0], dtype=np.float32))
+    assert quantized.tolist() == [127, -64, 0]
+    assert quantize_int8(np.zeros(3, dtype=np.float32)).tolist() == [0, 0, 0]
+
+
+def test_truncated_search_vector_is_a_unit_prefix(vector):
+    truncated = truncate_vector(vector, 16)
+    assert truncated.shape == (16,)
+    assert np.linalg.norm(truncated) == pytest.approx(1.0, abs=1e-6)
+    fields = encode_search_vector(vector, "float32", 16)
+    assert list(fields) == [search_vector_field(16)] == ["embedding_16"]
+    np.testing.assert_allclose(decode_vector(_round_trip(fields), "embedding_16"), truncated, rtol=1e-6)
+    assert encode_search_vector(vector, "float32", 0) == {}
+
+
+def test_query_matches_the_indexed_field_type(vector):
+    assert isinstance(encode_query(vector, "int8"), Binary)
+    assert len(encode_query(vector, "float32", 16)) == 16
+    assert encode_query(vector, "array") == pytest.approx(vector)
+
+
+def test_unknown_encoding_is_rejected(vector):
+    with pytest.raises(ValueError):
+        encode_vector(vector, "bfloat16")
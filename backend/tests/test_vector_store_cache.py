@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.infrastructure import vector_store
+from config import settings
+
+
+class FakeVectorStore:
+    def __init__(self, collection, **_kwargs):
+        self._collection = collection
+
+
+@pytest.fixture
+def fake_stores(monkeypatch):
+    """Build handles without MongoDB; ``builds`` lists each collection built."""
+    builds: list[str] = []
+    monkeypatch.setattr(vector_store, "_vector_stores", vector_store.OrderedDict())
+    monkeypatch.setattr(vector_store, "_build_locks", {})
+    monkeypatch.setattr(vector_store, "MongoDBAtlasVectorSearch", FakeVectorStore)
+    monkeypatch.setattr(vector_store, "get_embeddings", lambda: None)
+    monkeypatch.setattr(
+        vector_store, "_get_mongo_collection",
+        lambda tenant_id=None: SimpleNamespace(name=vector_store._tenant_collection_name(
+            settings.mongo_collection_name, tenant_id)),
+    )
+    monkeypatch.setattr(vector_store, "ensure_indexes", lambda store: builds.append(store._collection.name))
+    return builds
+
+
+def test_handles_are_cached_per_collection(fake_stores):
+    first = vector_store.get_vector_store("acme")
+    assert vector_store.get_vector_store("acme") is first
+    assert vector_store.get_vector_store("other") is not first
+    assert fake_stores == [f"{settings.mongo_collection_name}__acme", f"{settings.mongo_collection_name}__other"]
+
+
+def test_slow_index_build_does_not_block_other_tenants(fake_stores, monkeypatch):
+    building, release = threading.Event(), threading.Event()
+
+    def slow_ensure(store):
+        if store._collection.name.endswith("__slow"):
+            building.set()
+            release.wait(5)
+        fake_stores.append(store._collection.name)
+
+    monkeypatch.setattr(vector_store, "ensure_indexes", slow_ensure)
+    worker = threading.Thread(target=vector_store.get_vector_store, args=("slow",))
+    worker.start()
+    try:
+        assert building.wait(5)
+        vector_store.get_vector_store("fast")  # must not wait for "slow"
+        assert fake_stores == [f"{settings.mongo_collection_name}__fast"]
+    finally:
+        release.set()
+        worker.join(5)
+    assert len(fake_stores) == 2
+
+
+def test_stale_handle_is_rebuilt_when_the_index_was_dropped(fake_stores, monkeypatch):
+    monkeypatch.setattr(settings, "tenant_cache_ttl", 0.0)
+    live = {"index": True}
+    monkeypatch.setattr(vector_store, "_live_index_fields", lambda _c: [] if live["index"] else None)
+
+    first = vector_store.get_vector_store("acme")
+    assert vector_store.get_vector_store("acme") is first
+    live["index"] = False  # archived by another worker
+    assert vector_store.get_vector_store("acme") is not first
+    assert len(fake_stores) == 2
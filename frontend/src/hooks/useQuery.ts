@@ -1,4 +1,4 @@
-import { useState, useCallback } from "react";
+import { useState, useCallback, useRef } from "react";
 import type { LLMProvider, QueryResponse } from "../types";
 
 const API_BASE = import.meta.env.VITE_API_URL ?? "";
@@ -12,6 +12,8 @@ interface UseQueryReturn {
 export function useQuery(): UseQueryReturn {
     const [loading, setLoading] = useState(false);
     const [error, setError] = useState<string | null>(null);
+    // One backend chat session per mounted chat, so follow-ups have context.
+    const sessionId = useRef(crypto.randomUUID());
 
     const askQuestion = useCallback(
         async (question: string, provider: LLMProvider): Promise<QueryResponse | null> => {
@@ -21,7 +23,7 @@ export function useQuery(): UseQueryReturn {
                 const res = await fetch(`${API_BASE}/api/query`, {
                     method: "POST",
                     headers: { "Content-Type": "application/json" },
-                    body: JSON.stringify({ question, provider }),
+                    body: JSON.stringify({ question, provider, session_id: sessionId.current }),
                 });
 
                 if (!res.ok) {
@@ -8,12 +8,22 @@ export interface SourceDocument {
     page: number | null;
 }
 
+/** Token accounting for a single generation call */
+export interface TokenUsage {
+    input_tokens: number;
+    output_tokens: number;
+    cache_read_tokens: number;
+    cache_write_tokens: number;
+}
+
 /** Response from POST /api/query */
 export interface QueryResponse {
     answer: string;
     provider: string;
     model: string;
     sources: SourceDocument[];
+    usage?: TokenUsage | null;
+    rewritten_question?: string | null;
 }
 
 /** Response from POST /api/documents/upload or /text */
@@ -22,6 +32,27 @@ export interface DocumentUploadResponse {
     chunks_stored: number;
     already_existed: boolean;
     message: string;
+    file_hash?: string | null;
+    chunks_unchanged?: number;
+    chunks_removed?: number;
+}
+
+/** Optional retrieval restrictions for POST /api/query */
+export interface RetrievalFilter {
+    file_hash?: string;
+    source?: string;
+    page_from?: number;
+    page_to?: number;
+}
+
+/** A single entry from GET /api/documents */
+export interface DocumentInfo {
+    file_hash: string;
+    source: string;
+    pages: number;
+    chunks: number;
+    summarized: boolean;
+    uploaded_at: string | null;
 }
 
 /** A single chat message in the conversation */